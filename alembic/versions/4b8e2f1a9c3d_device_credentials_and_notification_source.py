@@ -0,0 +1,34 @@
+"""device credentials and notification source device
+
+Revision ID: 4b8e2f1a9c3d
+Revises: c3522f4b0d27
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e2f1a9c3d'
+down_revision: Union[str, None] = 'c3522f4b0d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('devices', sa.Column('credential_version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('notifications', sa.Column('device_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_notifications_device_id'), 'notifications', ['device_id'], unique=False)
+    op.create_foreign_key('notifications_device_id_fkey', 'notifications', 'devices', ['device_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('notifications_device_id_fkey', 'notifications', type_='foreignkey')
+    op.drop_index(op.f('ix_notifications_device_id'), table_name='notifications')
+    op.drop_column('notifications', 'device_id')
+    op.drop_column('devices', 'credential_version')
@@ -0,0 +1,32 @@
+"""device payload format
+
+Revision ID: 7d41c0a5e8b2
+Revises: 4b8e2f1a9c3d
+Create Date: 2026-10-19 11:03:27.905112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d41c0a5e8b2'
+down_revision: Union[str, None] = '4b8e2f1a9c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+payloadformat = sa.Enum('JSON', 'COMPACT', name='payloadformat')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    payloadformat.create(op.get_bind(), checkfirst=True)
+    op.add_column('devices', sa.Column('payload_format', payloadformat, server_default='JSON', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('devices', 'payload_format')
+    payloadformat.drop(op.get_bind(), checkfirst=True)
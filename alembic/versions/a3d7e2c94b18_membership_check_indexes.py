@@ -0,0 +1,34 @@
+"""index membership and permission lookups
+
+Revision ID: a3d7e2c94b18
+Revises: f4b6d81c2a57
+Create Date: 2026-10-19 19:05:12.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7e2c94b18'
+down_revision: Union[str, None] = 'f4b6d81c2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_working_groups_creator_id'), 'working_groups', ['creator_id'], unique=False)
+    op.create_index(op.f('ix_devices_working_group_id'), 'devices', ['working_group_id'], unique=False)
+    op.create_index('ix_device_users_user_device', 'device_users', ['user_id', 'device_id'], unique=False)
+    op.create_index('ix_device_users_device_id', 'device_users', ['device_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_device_users_device_id', table_name='device_users')
+    op.drop_index('ix_device_users_user_device', table_name='device_users')
+    op.drop_index(op.f('ix_devices_working_group_id'), table_name='devices')
+    op.drop_index(op.f('ix_working_groups_creator_id'), table_name='working_groups')
@@ -0,0 +1,32 @@
+"""mark group members added explicitly by the admin
+
+Revision ID: a4c9e7d25f18
+Revises: f7c2d9e4a613
+Create Date: 2026-10-20 10:04:31.226815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e7d25f18'
+down_revision: Union[str, None] = 'f7c2d9e4a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('group_members', sa.Column('explicit', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    # No se sabe cómo se crearon las filas existentes: se conservan como explícitas
+    # para que quitar una asignación no expulse a nadie que ya era miembro
+    op.execute("UPDATE group_members SET explicit = TRUE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('group_members', 'explicit')
@@ -0,0 +1,35 @@
+"""store notification amounts as integer cents
+
+Revision ID: a93f6d27c1e4
+Revises: 7d41c0a5e8b2
+Create Date: 2026-10-19 12:20:54.118763
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93f6d27c1e4'
+down_revision: Union[str, None] = '7d41c0a5e8b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('amount_cents', sa.BigInteger(), nullable=True))
+    # El redondeo corrige los residuos de punto flotante de los montos existentes (25.499999 -> 2550)
+    op.execute('UPDATE notifications SET amount_cents = ROUND(amount::numeric * 100)')
+    op.alter_column('notifications', 'amount_cents', nullable=False)
+    op.drop_column('notifications', 'amount')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('notifications', sa.Column('amount', sa.Float(), nullable=True))
+    op.execute('UPDATE notifications SET amount = amount_cents / 100.0')
+    op.alter_column('notifications', 'amount', nullable=False)
+    op.drop_column('notifications', 'amount_cents')
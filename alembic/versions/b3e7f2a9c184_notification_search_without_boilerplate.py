@@ -0,0 +1,76 @@
+"""index notification search text without the Yape boilerplate
+
+Revision ID: b3e7f2a9c184
+Revises: c8d1f6a3e947
+Create Date: 2026-10-20 15:21:09.538217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e7f2a9c184'
+down_revision: Union[str, None] = 'c8d1f6a3e947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Palabras que trae toda notificación de Yape ("Yape! ... te envió S/ ... Cód. de
+# seguridad ..."): indexadas, cualquier búsqueda que las incluya coincide con todo el grupo
+BOILERPLATE = (
+    r'\m(yape|yaperon|yape[oó]|te|envi[oó]|un|pago|por|s|el|es|de|c[oó]d|c[oó]digo'
+    r'|seguridad|confirmaci[oó]n)\M'
+)
+
+
+def _create_search_vector(text_expression: str) -> None:
+    op.execute(
+        f"""
+        ALTER TABLE notifications ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS ({text_expression}) STORED
+        """
+    )
+    op.execute(
+        'CREATE INDEX ix_notifications_group_search_vector ON notifications '
+        'USING gin (working_group_id, search_vector)'
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_notifications_group_name_trgm ON notifications '
+        'USING gin (working_group_id, name gin_trgm_ops)'
+    )
+
+
+def _drop_search_vector() -> None:
+    # La migración c7e0d3a6b912 recreó notifications sin search_vector ni sus índices
+    op.execute('DROP INDEX IF EXISTS ix_notifications_group_search_vector')
+    op.execute('ALTER TABLE notifications DROP COLUMN IF EXISTS search_vector')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Misma limpieza para el texto indexado y para la consulta
+    # (NotificationRepository.search_notifications)
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION notification_search_text(value text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT regexp_replace(coalesce(value, ''), '{BOILERPLATE}', ' ', 'gi') $$
+        """
+    )
+    _drop_search_vector()
+    # El nombre pesa más (A) que el resto del texto sin las frases fijas (B)
+    _create_search_vector(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', notification_search_text(raw_notification)), 'B')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _drop_search_vector()
+    _create_search_vector(
+        "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(raw_notification, ''))"
+    )
+    op.execute('DROP FUNCTION notification_search_text(text)')
@@ -0,0 +1,55 @@
+"""hourly and daily notification rollups
+
+Revision ID: b5c82e914f07
+Revises: a93f6d27c1e4
+Create Date: 2026-10-19 13:41:09.552380
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5c82e914f07'
+down_revision: Union[str, None] = 'a93f6d27c1e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('working_group_id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.Enum('HOUR', 'DAY', name='rollupgranularity'), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('sum_amount_cents', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['working_group_id'], ['working_groups.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('working_group_id', 'granularity', 'bucket_start', 'device_id', name='_rollup_group_bucket_device_uc')
+    )
+    op.create_index(op.f('ix_notification_rollups_id'), 'notification_rollups', ['id'], unique=False)
+
+    # Backfill de los acumulados a partir de las notificaciones existentes
+    for granularity, unit in (('HOUR', 'hour'), ('DAY', 'day')):
+        op.execute(
+            f"""
+            INSERT INTO notification_rollups
+                (working_group_id, device_id, granularity, bucket_start, count, sum_amount_cents)
+            SELECT working_group_id, COALESCE(device_id, 0), '{granularity}',
+                   date_trunc('{unit}', notification_timestamp), COUNT(*), SUM(amount_cents)
+            FROM notifications
+            GROUP BY working_group_id, COALESCE(device_id, 0), date_trunc('{unit}', notification_timestamp)
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_notification_rollups_id'), table_name='notification_rollups')
+    op.drop_table('notification_rollups')
+    sa.Enum(name='rollupgranularity').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,52 @@
+"""add group_members table backfilled from device_users
+
+Revision ID: b9e4f1a7c360
+Revises: a3d7e2c94b18
+Create Date: 2026-10-19 20:12:47.903514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4f1a7c360'
+down_revision: Union[str, None] = 'a3d7e2c94b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('group_members',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('working_group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['working_group_id'], ['working_groups.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('working_group_id', 'user_id', name='_group_member_uc')
+    )
+    op.create_index(op.f('ix_group_members_id'), 'group_members', ['id'], unique=False)
+    op.create_index(op.f('ix_group_members_user_id'), 'group_members', ['user_id'], unique=False)
+
+    # Hasta ahora la pertenencia se deducía de device_users -> devices
+    op.execute(
+        """
+        INSERT INTO group_members (working_group_id, user_id, created_at)
+        SELECT d.working_group_id, du.user_id, CURRENT_TIMESTAMP
+        FROM device_users du
+        JOIN devices d ON d.id = du.device_id
+        GROUP BY d.working_group_id, du.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_group_members_user_id'), table_name='group_members')
+    op.drop_index(op.f('ix_group_members_id'), table_name='group_members')
+    op.drop_table('group_members')
@@ -0,0 +1,36 @@
+"""add recurrence rules to group and individual schedules
+
+Revision ID: c1f8a5d2e703
+Revises: b9e4f1a7c360
+Create Date: 2026-10-19 21:04:18.226190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f8a5d2e703'
+down_revision: Union[str, None] = 'b9e4f1a7c360'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('group_schedules', 'individual_schedules'):
+        op.add_column(table, sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+        op.add_column(table, sa.Column('recurrence_exceptions', sa.String(), nullable=True))
+        op.add_column(table, sa.Column('series_end', sa.DateTime(), nullable=True))
+        # Los horarios existentes no se repiten: su última ocurrencia es la única
+        op.execute(f'UPDATE {table} SET series_end = end_time')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('individual_schedules', 'group_schedules'):
+        op.drop_column(table, 'series_end')
+        op.drop_column(table, 'recurrence_exceptions')
+        op.drop_column(table, 'recurrence_rule')
@@ -0,0 +1,122 @@
+"""partition notifications by month on notification_timestamp
+
+Revision ID: c7e0d3a6b912
+Revises: b5c82e914f07
+Create Date: 2026-10-19 15:02:36.774015
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e0d3a6b912'
+down_revision: Union[str, None] = 'b5c82e914f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Meses a futuro que se crean de antemano; luego los mantiene scripts/manage_partitions.py
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    'id, working_group_id, device_id, raw_notification, name, amount_cents, '
+    'security_code, status, notification_timestamp, created_at'
+)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+    op.create_index(op.f('ix_notifications_device_id'), 'notifications', ['device_id'], unique=False)
+    op.create_index('ix_notifications_group_timestamp', 'notifications', ['working_group_id', 'notification_timestamp'], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # Una FK hacia una tabla particionada debe incluir la clave de partición;
+    # la integridad notification_id -> notifications.id queda a nivel de aplicación.
+    op.drop_constraint('device_users_notifications_notification_id_fkey', 'device_users_notifications', type_='foreignkey')
+    # La secuencia sobrevive al DROP de la tabla original
+    op.execute('ALTER SEQUENCE notifications_id_seq OWNED BY NONE')
+
+    op.execute(
+        """
+        CREATE TABLE notifications_partitioned (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            working_group_id INTEGER NOT NULL
+                CONSTRAINT notifications_working_group_id_fkey REFERENCES working_groups (id),
+            device_id INTEGER CONSTRAINT notifications_device_id_fkey REFERENCES devices (id),
+            raw_notification VARCHAR NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            security_code VARCHAR(255) NOT NULL,
+            status notificationstatus NOT NULL,
+            notification_timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, notification_timestamp)
+        ) PARTITION BY RANGE (notification_timestamp)
+        """
+    )
+    # Recoge filas fuera de los rangos mensuales creados (fechas erróneas del cliente)
+    op.execute('CREATE TABLE notifications_default PARTITION OF notifications_partitioned DEFAULT')
+
+    first_month = bind.execute(
+        sa.text("SELECT date_trunc('month', MIN(notification_timestamp))::date FROM notifications")
+    ).scalar()
+    current_month = date.today().replace(day=1)
+    month = min(first_month or current_month, current_month)
+    last_month = _add_months(current_month, MONTHS_AHEAD)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE notifications_p{month:%Y%m} PARTITION OF notifications_partitioned "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+    op.execute(f'INSERT INTO notifications_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM notifications')
+    op.drop_table('notifications')
+    op.execute('ALTER TABLE notifications_partitioned RENAME TO notifications')
+    op.execute('ALTER TABLE notifications RENAME CONSTRAINT notifications_partitioned_pkey TO notifications_pkey')
+    op.execute('ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id')
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('ALTER SEQUENCE notifications_id_seq OWNED BY NONE')
+    op.execute(
+        """
+        CREATE TABLE notifications_unpartitioned (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq') PRIMARY KEY,
+            working_group_id INTEGER NOT NULL
+                CONSTRAINT notifications_working_group_id_fkey REFERENCES working_groups (id),
+            device_id INTEGER CONSTRAINT notifications_device_id_fkey REFERENCES devices (id),
+            raw_notification VARCHAR NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            security_code VARCHAR(255) NOT NULL,
+            status notificationstatus NOT NULL,
+            notification_timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+        """
+    )
+    op.execute(f'INSERT INTO notifications_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM notifications')
+    # Borra también todas las particiones
+    op.drop_table('notifications')
+    op.execute('ALTER TABLE notifications_unpartitioned RENAME TO notifications')
+    op.execute('ALTER TABLE notifications RENAME CONSTRAINT notifications_unpartitioned_pkey TO notifications_pkey')
+    op.execute('ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id')
+    op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+    op.create_index(op.f('ix_notifications_device_id'), 'notifications', ['device_id'], unique=False)
+    op.create_foreign_key('device_users_notifications_notification_id_fkey', 'device_users_notifications', 'notifications', ['notification_id'], ['id'])
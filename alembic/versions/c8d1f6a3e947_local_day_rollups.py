@@ -0,0 +1,52 @@
+"""key daily rollups by each group's local day
+
+Revision ID: c8d1f6a3e947
+Revises: a4c9e7d25f18
+Create Date: 2026-10-20 11:37:52.614093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d1f6a3e947'
+down_revision: Union[str, None] = 'a4c9e7d25f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Medianoche local (zona del grupo) de cada hora UTC, expresada de nuevo en UTC naive
+LOCAL_DAY = (
+    "(date_trunc('day', (r.bucket_start AT TIME ZONE 'UTC') AT TIME ZONE g.time_zone)"
+    " AT TIME ZONE g.time_zone) AT TIME ZONE 'UTC'"
+)
+UTC_DAY = "date_trunc('day', r.bucket_start)"
+
+
+def _rebuild_days(day_expression: str) -> None:
+    op.execute("DELETE FROM notification_rollups WHERE granularity = 'DAY'")
+    op.execute(
+        f"""
+        INSERT INTO notification_rollups
+            (working_group_id, device_id, granularity, bucket_start, count, sum_amount_cents)
+        SELECT r.working_group_id, r.device_id, 'DAY', {day_expression},
+               SUM(r.count), SUM(r.sum_amount_cents)
+        FROM notification_rollups r
+        JOIN working_groups g ON g.id = r.working_group_id
+        WHERE r.granularity = 'HOUR'
+        GROUP BY r.working_group_id, r.device_id, {day_expression}
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los acumulados DAY eran días UTC; se recalculan desde los HOUR por día local
+    _rebuild_days(LOCAL_DAY)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild_days(UTC_DAY)
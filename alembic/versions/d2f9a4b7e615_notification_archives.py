@@ -0,0 +1,43 @@
+"""notification archive manifest
+
+Revision ID: d2f9a4b7e615
+Revises: c7e0d3a6b912
+Create Date: 2026-10-19 16:02:47.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f9a4b7e615'
+down_revision: Union[str, None] = 'c7e0d3a6b912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('working_group_id', sa.Integer(), nullable=False),
+    sa.Column('month_start', sa.DateTime(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('sum_amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('min_notification_id', sa.Integer(), nullable=False),
+    sa.Column('max_notification_id', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['working_group_id'], ['working_groups.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('working_group_id', 'month_start', name='_archive_group_month_uc')
+    )
+    op.create_index(op.f('ix_notification_archives_id'), 'notification_archives', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_notification_archives_id'), table_name='notification_archives')
+    op.drop_table('notification_archives')
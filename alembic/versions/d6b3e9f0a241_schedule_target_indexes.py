@@ -0,0 +1,34 @@
+"""index schedule targets for conflict detection
+
+Revision ID: d6b3e9f0a241
+Revises: c1f8a5d2e703
+Create Date: 2026-10-19 21:47:09.513822
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b3e9f0a241'
+down_revision: Union[str, None] = 'c1f8a5d2e703'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_group_schedules_working_group_id'), 'group_schedules', ['working_group_id'], unique=False)
+    op.create_index(op.f('ix_individual_schedules_device_user_id'), 'individual_schedules', ['device_user_id'], unique=False)
+    op.create_index(op.f('ix_individual_schedules_device_id'), 'individual_schedules', ['device_id'], unique=False)
+    op.create_index(op.f('ix_individual_schedules_user_id'), 'individual_schedules', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_individual_schedules_user_id'), table_name='individual_schedules')
+    op.drop_index(op.f('ix_individual_schedules_device_id'), table_name='individual_schedules')
+    op.drop_index(op.f('ix_individual_schedules_device_user_id'), table_name='individual_schedules')
+    op.drop_index(op.f('ix_group_schedules_working_group_id'), table_name='group_schedules')
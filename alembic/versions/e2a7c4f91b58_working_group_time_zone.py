@@ -0,0 +1,29 @@
+"""add time_zone to working groups
+
+Revision ID: e2a7c4f91b58
+Revises: d6b3e9f0a241
+Create Date: 2026-10-19 22:31:55.604127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c4f91b58'
+down_revision: Union[str, None] = 'd6b3e9f0a241'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los grupos existentes operan en Perú
+    op.add_column('working_groups', sa.Column('time_zone', sa.String(length=64), server_default='America/Lima', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('working_groups', 'time_zone')
@@ -0,0 +1,50 @@
+"""full-text and trigram search over notifications
+
+Revision ID: e8a1c5f30d94
+Revises: d2f9a4b7e615
+Create Date: 2026-10-19 16:48:12.402193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a1c5f30d94'
+down_revision: Union[str, None] = 'd2f9a4b7e615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # btree_gin permite incluir working_group_id en los índices GIN
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    # Columna generada (no mapeada en el ORM): nombre + texto crudo, configuración
+    # 'simple' para no aplicar stemming a nombres propios
+    op.execute(
+        """
+        ALTER TABLE notifications ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(raw_notification, ''))
+        ) STORED
+        """
+    )
+    op.execute(
+        'CREATE INDEX ix_notifications_group_search_vector ON notifications '
+        'USING gin (working_group_id, search_vector)'
+    )
+    op.execute(
+        'CREATE INDEX ix_notifications_group_name_trgm ON notifications '
+        'USING gin (working_group_id, name gin_trgm_ops)'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_group_name_trgm', table_name='notifications')
+    op.drop_index('ix_notifications_group_search_vector', table_name='notifications')
+    op.drop_column('notifications', 'search_vector')
@@ -0,0 +1,28 @@
+"""index notifications by group and security code
+
+Revision ID: f4b6d81c2a57
+Revises: e8a1c5f30d94
+Create Date: 2026-10-19 17:20:55.631874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b6d81c2a57'
+down_revision: Union[str, None] = 'e8a1c5f30d94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notifications_group_code_timestamp', 'notifications', ['working_group_id', 'security_code', 'notification_timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_group_code_timestamp', table_name='notifications')
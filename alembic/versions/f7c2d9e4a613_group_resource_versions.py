@@ -0,0 +1,38 @@
+"""per-group resource versions for list ETags
+
+Revision ID: f7c2d9e4a613
+Revises: e2a7c4f91b58
+Create Date: 2026-10-19 23:18:42.905317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2d9e4a613'
+down_revision: Union[str, None] = 'e2a7c4f91b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('group_resource_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('working_group_id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=32), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['working_group_id'], ['working_groups.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('working_group_id', 'resource', name='_group_resource_version_uc')
+    )
+    op.create_index(op.f('ix_group_resource_versions_id'), 'group_resource_versions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_group_resource_versions_id'), table_name='group_resource_versions')
+    op.drop_table('group_resource_versions')
@@ -1,4 +1,6 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import hmac
+from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
@@ -15,6 +17,8 @@ from app.models import (
 )  # Importa DBDeviceUser y DBDevice
 from app.schemas import TokenData
 from app.core.config import settings
+from app.services.device_registry import device_registry, DeviceEntry
+from app.services.authorization import AccessControl
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(
@@ -161,7 +165,36 @@ def get_current_admin(current_user: DBUser = Depends(get_current_user)):
     return current_user
 
 
-def get_current_active_user_in_group(current_user: DBUser = Depends(get_current_user)):
+def require_diagnostics_enabled():
+    # Si el diagnóstico está apagado, el endpoint no existe (404) para nadie, ni
+    # siquiera para llamadas anónimas: se comprueba antes de autenticar.
+    if not settings.DIAGNOSTICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+def get_diagnostics_admin(
+    _enabled: None = Depends(require_diagnostics_enabled),
+    current_user: DBUser = Depends(get_current_admin),
+):
+    # Diagnóstico del worker: además de admin, el username debe estar habilitado
+    # explícitamente. FastAPI resuelve las dependencias en orden, así que
+    # require_diagnostics_enabled corre antes que la autenticación.
+    allowed = {
+        username.strip()
+        for username in settings.DIAGNOSTICS_USERNAMES.split(",")
+        if username.strip()
+    }
+    if current_user.username not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos de diagnóstico.",
+        )
+    return current_user
+
+
+def get_current_active_user_in_group(
+    current_user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)
+):
     # Este se puede usar para cualquier usuario logueado en un grupo (admin o miembro)
     # Su working_group_id se obtiene del token via get_current_user
     # La pertenencia real al grupo se debería verificar si el usuario es `creator_id` de un grupo,
@@ -171,10 +204,46 @@ def get_current_active_user_in_group(current_user: DBUser = Depends(get_current_
     # Para el MEMBER, necesitamos asegurar que está asociado a un grupo.
     if current_user.role == UserRole.MEMBER:
         # Verificar si tiene al menos una asociación device_user
-        if not current_user.user_devices:
+        if not AccessControl.for_session(db).has_any_group(current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="El usuario no está asociado a un grupo de trabajo.",
             )
 
     return current_user
+
+
+# --- Credenciales de dispositivos (ESP32) ---
+# La clave de un dispositivo es un HMAC del device_uid y su versión de credencial,
+# así no se guarda ningún secreto por dispositivo y rotarla es solo incrementar la versión.
+def create_device_key(device_uid: str, credential_version: int) -> str:
+    message = f"{device_uid}:{credential_version}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def get_current_device(
+    device_uid: str = Header(..., alias="X-Device-UID"),
+    device_key: str = Header(..., alias="X-Device-Key"),
+    db: Session = Depends(get_db),
+) -> DeviceEntry:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales del dispositivo",
+    )
+
+    # Resolución en memoria: solo consulta la DB si el UID no está en el mapa
+    device = device_registry.resolve(db, device_uid)
+    if device is None:
+        raise credentials_exception
+
+    expected_key = create_device_key(device_uid, device.credential_version)
+    if not hmac.compare_digest(expected_key, device_key):
+        raise credentials_exception
+
+    if not device.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="El dispositivo está desactivado.",
+        )
+
+    return device
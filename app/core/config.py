@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +8,75 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     ALGORITHM: str
+    # Pool de conexiones: los endpoints usan la sesión de forma síncrona en el event
+    # loop, así que el pool debe cubrir las requests concurrentes de cada worker
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Segundos que una entrada del mapa device_uid -> grupo se considera válida
+    # (acota la inconsistencia entre workers cuando otro proceso modifica el dispositivo)
+    DEVICE_CACHE_TTL_SECONDS: int = 60
+    # Segundos que se reutiliza la lista de miembros de un grupo (se invalida al
+    # cambiar la membresía en este proceso; el TTL cubre los cambios en otros workers)
+    GROUP_ROSTER_TTL_SECONDS: int = 300
+    # Horarios recurrentes: días que cubre cada expansión de ocurrencias guardada en
+    # memoria y cuántas expansiones (una por horario) se conservan como máximo
+    SCHEDULE_WINDOW_DAYS: int = 35
+    SCHEDULE_OCCURRENCE_CACHE_SIZE: int = 10000
+
+    # Segundos máximos para entregar un mensaje a un WebSocket; el cliente que no lo
+    # recibe a tiempo se desconecta (no retrasa la recepción de notificaciones)
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = 2.0
+
+    # Puente MQTT hacia los dispositivos (desactivado por defecto)
+    MQTT_ENABLED: bool = False
+    MQTT_HOST: str = "localhost"
+    MQTT_PORT: int = 1883
+    MQTT_USERNAME: Optional[str] = None
+    MQTT_PASSWORD: Optional[str] = None
+    MQTT_TOPIC_PREFIX: str = "yape/devices"
+    # Prefijo del client id; cada proceso le añade host y pid para que los workers de
+    # uvicorn no se expulsen entre sí del broker
+    MQTT_CLIENT_ID: str = "tracking-yape-backend"
+    # Cada cuánto se vuelcan a la DB los acuses (PUBACK) recibidos del broker
+    MQTT_ACK_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # Publicaciones QoS 1 sin PUBACK que se mantienen como máximo (p. ej. con el broker
+    # caído); al llegar al límite las nuevas no se publican y quedan sin marcar SENT
+    MQTT_MAX_PENDING: int = 10000
+
+    # Almacenamiento en frío: las notificaciones de meses anteriores a
+    # ARCHIVE_AFTER_MONTHS se mueven a archivos comprimidos en ARCHIVE_DIR
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_AFTER_MONTHS: int = 12
+    # notification_timestamp viene del reloj del cliente (un ESP32 sin NTP manda 1970)
+    # y es la clave de partición: fuera de esta ventana alrededor de la hora del
+    # servidor se reemplaza por la hora de recepción
+    NOTIFICATION_MAX_DELAY_HOURS: int = 72
+    NOTIFICATION_MAX_AHEAD_MINUTES: int = 10
+    # Una búsqueda de texto sin `start` solo revisa estos últimos días: el ranking no
+    # recorre todo el historial del grupo
+    SEARCH_DEFAULT_DAYS: int = 90
+
+    # Horas que un código de seguridad recién recibido se mantiene en memoria
+    # para responder /notifications/verify sin ir a la DB; también es la ventana por
+    # defecto de la verificación (un código más antiguo no verifica un pago nuevo)
+    VERIFY_RECENT_HOURS: int = 6
+    # Últimas notificaciones por grupo guardadas ya serializadas para las primeras
+    # páginas de /notifications/group/{id}, y segundos que se reutilizan antes de
+    # releerlas (lo que reciben otros workers se detecta por la versión del grupo; el
+    # TTL cubre cambios hechos directamente en la DB)
+    NOTIFICATION_FEED_SIZE: int = 200
+    NOTIFICATION_FEED_TTL_SECONDS: float = 5.0
+
+    # Logging: nivel, formato ("json" o "text") y fracción de eventos por mensaje
+    # (envíos por WebSocket, acuses, etc.) que se registran
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_SAMPLE_RATE: float = 0.01
+
+    # Diagnóstico en producción (/diagnostics): desactivado por defecto y, aun activo,
+    # solo para administradores cuyo username esté en la lista (separada por comas)
+    DIAGNOSTICS_ENABLED: bool = False
+    DIAGNOSTICS_USERNAMES: str = ""
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,242 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+# Métricas en memoria del proceso, expuestas en formato de texto de Prometheus
+# (GET /metrics). Cada worker de uvicorn tiene sus propios valores: Prometheus
+# debe scrapear cada worker o agregarlos con la etiqueta de instancia.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # { etiquetas: (conteos por bucket (+Inf al final), suma) }
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                label_values, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[index] += 1
+            self._values[label_values] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        bucket_labels = self.labels + ("le",)
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    labels = _format_labels(bucket_labels, label_values + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Latencia de las requests HTTP por ruta",
+        ("method", "route", "status"),
+    )
+)
+http_requests_in_progress = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "Requests HTTP en curso por ruta",
+        ("method", "route"),
+    )
+)
+http_request_sql_queries = registry.register(
+    Histogram(
+        "http_request_sql_queries",
+        "Sentencias SQL ejecutadas por request",
+        ("method", "route"),
+        SQL_COUNT_BUCKETS,
+    )
+)
+http_request_sql_duration = registry.register(
+    Histogram(
+        "http_request_sql_duration_seconds",
+        "Tiempo total en la DB por request",
+        ("method", "route"),
+    )
+)
+db_queries_total = registry.register(
+    Counter("db_queries_total", "Sentencias SQL ejecutadas (incluye tareas de fondo)")
+)
+
+# Requests en curso de este worker, para el volcado de diagnóstico:
+# { id: (método, ruta real, inicio en perf_counter, [cantidad, segundos] de SQL) }
+in_flight_requests: Dict[int, Tuple[str, str, float, list]] = {}
+
+# [cantidad, segundos] de SQL de la request en curso. Es una lista mutable para que
+# las sentencias ejecutadas en el threadpool (dependencias síncronas) también sumen.
+_request_sql: ContextVar[Optional[list]] = ContextVar("request_sql", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _record_query(started: float):
+    elapsed = time.perf_counter() - started
+    db_queries_total.inc()
+    stats = _request_sql.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn.info["query_start_time"].pop())
+
+
+def _handle_error(exception_context):
+    # Una sentencia que falla no llega a after_cursor_execute: se saca aquí su inicio
+    # para que la pila de la conexión (que vuelve al pool) no crezca ni se desalinee.
+    conn = exception_context.connection
+    if conn is None:
+        return
+    starts = conn.info.get("query_start_time")
+    if starts:
+        _record_query(starts.pop())
+
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    # Middleware ASGI: latencia, requests en curso y SQL por request, etiquetados con
+    # la plantilla de la ruta (/notifications/group/{group_id}) y no con la URL real,
+    # para no crear una serie por id. Los WebSocket no se miden aquí.
+    def __init__(self, app):
+        self.app = app
+
+    def _route_template(self, scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        sql_stats = [0, 0.0]
+        token = _request_sql.set(sql_stats)
+        http_requests_in_progress.inc(method, route)
+        start = time.perf_counter()
+        request_key = id(scope)
+        in_flight_requests[request_key] = (method, scope["path"], start, sql_stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight_requests.pop(request_key, None)
+            http_requests_in_progress.dec(method, route)
+            _request_sql.reset(token)
+            http_request_duration.observe(elapsed, method, route, str(status_code[0]))
+            http_request_sql_queries.observe(sql_stats[0], method, route)
+            http_request_sql_duration.observe(sql_stats[1], method, route)
@@ -0,0 +1,23 @@
+from decimal import Decimal
+
+# Los montos se guardan como enteros en céntimos para que totales y conciliaciones
+# sean exactos; solo se convierten a soles en los bordes (entrada y salida de la API).
+
+# Tope de un monto: el formato compacto de los dispositivos lo envía como i32 en céntimos
+MAX_AMOUNT_CENTS = 2**31 - 1
+MAX_AMOUNT = Decimal(MAX_AMOUNT_CENTS) / 100
+
+
+def to_cents(amount: Decimal) -> int:
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def from_cents(amount_cents: int) -> float:
+    return amount_cents / 100
+
+
+def format_cents(amount_cents: int) -> str:
+    # Representación exacta en soles ("25.50"), sin pasar por float
+    sign = "-" if amount_cents < 0 else ""
+    amount_cents = abs(amount_cents)
+    return f"{sign}{amount_cents // 100}.{amount_cents % 100:02d}"
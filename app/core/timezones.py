@@ -0,0 +1,98 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Los horarios se guardan en hora local (naive) del grupo. Para convertir entre UTC y
+# hora local sin aritmética de zonas en cada evaluación, cada zona se resuelve una vez
+# por proceso a una tabla de transiciones (instante UTC desde el que rige cada offset)
+# y luego cada conversión es una búsqueda binaria.
+# zoneinfo lee la base IANA del sistema; donde no la hay (Windows) usa el paquete tzdata
+# de requirements.txt.
+
+DEFAULT_TIME_ZONE = "America/Lima"
+# Ninguna zona va más de 12 h por detrás de UTC: utcnow() - MAX_UTC_BEHIND es la hora
+# local más temprana posible cuando no se conoce la zona
+MAX_UTC_BEHIND = timedelta(hours=12)
+# Rango cubierto por las tablas; fuera de él se usa zoneinfo directamente
+TABLE_START = datetime(1970, 1, 1)
+TABLE_END = datetime(2100, 1, 1)
+
+
+def is_valid_time_zone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+class ZoneTable:
+    def __init__(self, name: str):
+        self.name = name
+        self._zone = ZoneInfo(name)
+        # _starts[i] (UTC naive) es desde cuándo rige _offsets[i]; _local_starts[i] es
+        # ese mismo instante en hora local
+        self._starts: List[datetime] = [datetime.min]
+        self._offsets: List[timedelta] = [self._offset_at(TABLE_START)]
+
+        # Recorre el rango por semanas y, donde cambia el offset, busca el segundo exacto.
+        # Ninguna zona cambia dos veces de offset en menos de una semana.
+        step = timedelta(days=7)
+        moment = TABLE_START
+        while moment < TABLE_END:
+            offset = self._offset_at(moment + step)
+            if offset != self._offsets[-1]:
+                low, high = 0, int(step.total_seconds())
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if self._offset_at(moment + timedelta(seconds=middle)) == offset:
+                        high = middle
+                    else:
+                        low = middle
+                self._starts.append(moment + timedelta(seconds=high))
+                self._offsets.append(offset)
+            moment += step
+        self._local_starts = [
+            start if start == datetime.min else start + offset
+            for start, offset in zip(self._starts, self._offsets)
+        ]
+
+    def _offset_at(self, utc: datetime) -> timedelta:
+        return utc.replace(tzinfo=timezone.utc).astimezone(self._zone).utcoffset()
+
+    @property
+    def transitions(self) -> int:
+        return len(self._starts) - 1
+
+    def utc_offset(self, utc: datetime) -> timedelta:
+        if not TABLE_START <= utc < TABLE_END:
+            return self._offset_at(utc)
+        return self._offsets[bisect_right(self._starts, utc) - 1]
+
+    def to_local(self, utc: datetime) -> datetime:
+        # UTC (naive o aware) -> hora local naive
+        if utc.tzinfo is not None:
+            utc = utc.astimezone(timezone.utc).replace(tzinfo=None)
+        return utc + self.utc_offset(utc)
+
+    def to_utc(self, local: datetime) -> datetime:
+        # Hora local naive -> UTC naive. Si la hora se repite (se atrasa el reloj) se toma
+        # la primera; si no existe (se adelanta) queda en el tramo previo y se usa su
+        # offset, igual que zoneinfo con fold=0.
+        if not TABLE_START <= local < TABLE_END:
+            aware = local.replace(tzinfo=self._zone)
+            return aware.astimezone(timezone.utc).replace(tzinfo=None)
+        index = bisect_right(self._local_starts, local) - 1
+        if index > 0:
+            previous_offset = self._offsets[index - 1]
+            if local - previous_offset < self._starts[index]:
+                # Aún dentro del tramo anterior (hora repetida): gana la primera
+                return local - previous_offset
+        return local - self._offsets[index]
+
+
+@lru_cache(maxsize=None)
+def zone_table(name: str) -> ZoneTable:
+    return ZoneTable(name)
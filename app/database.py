@@ -1,10 +1,22 @@
 from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
 
 # SQLAlchemy setup
-engine = create_engine(settings.DATABASE_URL)
+# SQLite (pruebas locales y benchmarks en modo smoke): las sesiones se crean en el
+# threadpool de FastAPI y se usan en el event loop, por eso check_same_thread=False
+connect_args = (
+    {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+)
+engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args=connect_args,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -15,3 +27,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(db: Session):
+    # insert() con soporte de ON CONFLICT para el motor de la sesión
+    # (PostgreSQL en producción, SQLite en pruebas locales)
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert
+    return postgresql_insert
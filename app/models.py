@@ -3,14 +3,18 @@ from sqlalchemy import (
     Integer,
     String,
     DateTime,
-    Float,
+    BigInteger,
     Boolean,
     Enum,
     ForeignKey,
+    Index,
     UniqueConstraint,
+    false,
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.core.money import from_cents
+from app.core.timezones import DEFAULT_TIME_ZONE
 from datetime import datetime
 from enum import Enum as PyEnum
 
@@ -27,23 +31,45 @@ class NotificationStatus(PyEnum):
     SENT = "sent"  # Cuando se envía por MQTT
 
 
+# Enum para el formato en que un dispositivo recibe las notificaciones
+class PayloadFormat(PyEnum):
+    JSON = "json"
+    COMPACT = "compact"  # Binario de tamaño reducido para ESP32 (ver device_payload.py)
+
+
+# Enum para la granularidad de los acumulados de ventas
+class RollupGranularity(PyEnum):
+    HOUR = "hour"
+    DAY = "day"
+
+
 # Tabla: working_groups
 class DBWorkingGroup(Base):
     __tablename__ = "working_groups"
     id = Column(Integer, primary_key=True, index=True)
     creator_id = Column(
-        Integer, ForeignKey("users.id"), nullable=False
+        Integer, ForeignKey("users.id"), nullable=False, index=True
     )  # El usuario que crea el grupo es el admin
     name = Column(String(50), unique=True, index=True, nullable=False)
     description = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Zona IANA del local: los horarios del grupo se guardan y evalúan en esta hora local
+    time_zone = Column(
+        String(64),
+        default=DEFAULT_TIME_ZONE,
+        server_default=DEFAULT_TIME_ZONE,
+        nullable=False,
+    )
 
     # Relaciones
     creator = relationship(
         "DBUser", back_populates="created_working_groups", foreign_keys=[creator_id]
     )
+    # La pertenencia se deriva de users -> device_users -> devices (solo lectura)
     members = relationship(
-        "DBUser", secondary="device_users", back_populates="member_of_working_groups"
+        "DBUser",
+        secondary="group_members",
+        viewonly=True,
     )
     devices = relationship("DBDevice", back_populates="working_group")
     group_schedules = relationship("DBGroupSchedule", back_populates="working_group")
@@ -88,7 +114,9 @@ class DBUser(Base):
         foreign_keys="[DBWorkingGroup.creator_id]",
     )
     member_of_working_groups = relationship(
-        "DBWorkingGroup", secondary="device_users", back_populates="members"
+        "DBWorkingGroup",
+        secondary="group_members",
+        viewonly=True,
     )
     # Dispositivos asociados directamente a este usuario (si aplica, o a través de device_users)
     user_devices = relationship("DBDeviceUser", back_populates="user")
@@ -100,7 +128,7 @@ class DBDevice(Base):
     __tablename__ = "devices"
     id = Column(Integer, primary_key=True, index=True)
     working_group_id = Column(
-        Integer, ForeignKey("working_groups.id"), nullable=False
+        Integer, ForeignKey("working_groups.id"), nullable=False, index=True
     )  # Un dispositivo pertenece a un grupo
     device_uid = Column(
         String(255), unique=True, index=True, nullable=False
@@ -110,6 +138,12 @@ class DBDevice(Base):
     last_seen = Column(DateTime, nullable=True)
     last_ip_address = Column(String(45), nullable=True)  # IPv6 podría ser más larga
     is_active = Column(Boolean, default=True, nullable=False)
+    # Versión de la credencial del dispositivo; incrementarla invalida la clave anterior
+    credential_version = Column(Integer, default=1, nullable=False)
+    # Formato de las notificaciones entregadas por MQTT/HTTP a este dispositivo
+    payload_format = Column(
+        Enum(PayloadFormat), default=PayloadFormat.JSON, nullable=False
+    )
 
     # Relaciones
     working_group = relationship("DBWorkingGroup", back_populates="devices")
@@ -132,19 +166,45 @@ class DBDeviceUser(Base):
     user = relationship("DBUser", back_populates="user_devices")
     device = relationship("DBDevice", back_populates="device_users")
 
+    # Chequeos de pertenencia (app/services/authorization.py): usuario -> dispositivo
+    # y dispositivo -> usuarios asignados
+    __table_args__ = (
+        Index("ix_device_users_user_device", "user_id", "device_id"),
+        Index("ix_device_users_device_id", "device_id"),
+    )
+
+
+# Tabla: group_members (pertenencia de los miembros a un grupo de trabajo)
+# Un miembro pertenece al grupo aunque todavía no tenga dispositivos asignados; asignarle
+# un dispositivo del grupo también lo registra aquí. Quitarle su última asignación en el
+# grupo solo elimina la fila si vino de una asignación (explicit = False); los miembros
+# creados por el admin (create-member) se quedan. El admin es el creator_id del grupo.
+class DBGroupMember(Base):
+    __tablename__ = "group_members"
+    id = Column(Integer, primary_key=True, index=True)
+    working_group_id = Column(Integer, ForeignKey("working_groups.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    explicit = Column(Boolean, default=False, server_default=false(), nullable=False)
+
+    # El índice único (grupo, usuario) sirve también para listar los miembros del grupo
+    __table_args__ = (
+        UniqueConstraint("working_group_id", "user_id", name="_group_member_uc"),
+    )
+
 
 # Tabla: individual_schedules (para horarios específicos de dispositivos/usuarios)
 class DBIndividualSchedule(Base):
     __tablename__ = "individual_schedules"
     id = Column(Integer, primary_key=True, index=True)
     device_user_id = Column(
-        Integer, ForeignKey("device_users.id"), nullable=True
+        Integer, ForeignKey("device_users.id"), nullable=True, index=True
     )  # Puede ser un horario para un dispositivo_usuario específico
     device_id = Column(
-        Integer, ForeignKey("devices.id"), nullable=True
+        Integer, ForeignKey("devices.id"), nullable=True, index=True
     )  # O solo para un dispositivo (si no está vinculado a un usuario en ese contexto)
     user_id = Column(
-        Integer, ForeignKey("users.id"), nullable=True
+        Integer, ForeignKey("users.id"), nullable=True, index=True
     )  # O solo para un usuario (si un usuario puede tener su propio horario sin un dispositivo específico)
 
     # Al menos uno de los tres Foreign Keys (device_user_id, device_id, user_id) debe ser NO NULO
@@ -156,6 +216,13 @@ class DBIndividualSchedule(Base):
     end_time = Column(DateTime, nullable=False)
     all_day = Column(Boolean, default=False, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Recurrencia (app/services/schedule_engine.py): start_time/end_time son la primera
+    # ocurrencia; la regla estilo RRULE y las fechas excluidas se expanden al consultar
+    recurrence_rule = Column(String(255), nullable=True)  # NULL = no se repite
+    recurrence_exceptions = Column(String, nullable=True)  # Fechas ISO separadas por comas
+    series_end = Column(
+        DateTime, nullable=True
+    )  # Fin de la última ocurrencia (NULL = se repite sin fin)
 
     # Relaciones
     device_user = relationship("DBDeviceUser")  # Si se asocia a un device_user
@@ -169,13 +236,22 @@ class DBIndividualSchedule(Base):
 class DBGroupSchedule(Base):
     __tablename__ = "group_schedules"
     id = Column(Integer, primary_key=True, index=True)
-    working_group_id = Column(Integer, ForeignKey("working_groups.id"), nullable=False)
+    working_group_id = Column(
+        Integer, ForeignKey("working_groups.id"), nullable=False, index=True
+    )
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
     all_day = Column(
         Boolean, default=True, nullable=False
     )  # Por defecto, todo el día para el grupo
     is_active = Column(Boolean, default=True, nullable=False)
+    # Recurrencia (app/services/schedule_engine.py): start_time/end_time son la primera
+    # ocurrencia; la regla estilo RRULE y las fechas excluidas se expanden al consultar
+    recurrence_rule = Column(String(255), nullable=True)  # NULL = no se repite
+    recurrence_exceptions = Column(String, nullable=True)  # Fechas ISO separadas por comas
+    series_end = Column(
+        DateTime, nullable=True
+    )  # Fin de la última ocurrencia (NULL = se repite sin fin)
 
     # Relaciones
     working_group = relationship("DBWorkingGroup", back_populates="group_schedules")
@@ -190,12 +266,15 @@ class DBNotification(Base):
     working_group_id = Column(
         Integer, ForeignKey("working_groups.id"), nullable=False
     )  # Notificación asociada a un grupo
+    device_id = Column(
+        Integer, ForeignKey("devices.id"), nullable=True, index=True
+    )  # Dispositivo que reportó la notificación (None si llegó con un token de usuario)
 
     raw_notification = Column(
         String, nullable=False
     )  # La notificación completa tal cual se recibe
     name = Column(String(255), nullable=False)  # Nombre extraído
-    amount = Column(Float, nullable=False)  # Monto extraído
+    amount_cents = Column(BigInteger, nullable=False)  # Monto extraído, en céntimos
     security_code = Column(String(255), nullable=False)  # Código de seguridad extraído
 
     # Estado de la notificación: received (por Kotlin), sent (por MQTT)
@@ -209,11 +288,36 @@ class DBNotification(Base):
         DateTime, default=datetime.utcnow, nullable=False
     )  # Fecha de registro en el backend
 
+    # Monto en soles, derivado de amount_cents (solo para serializar)
+    @property
+    def amount(self) -> float:
+        return from_cents(self.amount_cents)
+
     # Relaciones
     working_group = relationship("DBWorkingGroup", back_populates="notifications")
     # Relación inversa para saber qué device_users_notifications están vinculadas a esta notificación
     device_user_notifications = relationship(
-        "DBDeviceUserNotification", back_populates="notification"
+        "DBDeviceUserNotification",
+        primaryjoin="DBNotification.id == foreign(DBDeviceUserNotification.notification_id)",
+        back_populates="notification",
+    )
+
+    # En PostgreSQL la tabla está particionada por mes sobre notification_timestamp
+    # (ver migración c7e0d3a6b912 y scripts/manage_partitions.py). Este índice permite
+    # que las consultas recientes de un grupo lean solo las particiones más nuevas.
+    __table_args__ = (
+        Index(
+            "ix_notifications_group_timestamp",
+            "working_group_id",
+            "notification_timestamp",
+        ),
+        # Verificación de pagos por código de seguridad dentro del grupo
+        Index(
+            "ix_notifications_group_code_timestamp",
+            "working_group_id",
+            "security_code",
+            "notification_timestamp",
+        ),
     )
 
 
@@ -224,7 +328,8 @@ class DBDeviceUserNotification(Base):
         Integer, primary_key=True, index=True, autoincrement=True
     )  # BigInteger para IDs
 
-    notification_id = Column(Integer, ForeignKey("notifications.id"), nullable=False)
+    # Sin FK: notifications está particionada y su clave primaria incluye el timestamp
+    notification_id = Column(Integer, nullable=False)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
     user_id = Column(
         Integer, ForeignKey("users.id"), nullable=False
@@ -239,7 +344,9 @@ class DBDeviceUserNotification(Base):
 
     # Relaciones
     notification = relationship(
-        "DBNotification", back_populates="device_user_notifications"
+        "DBNotification",
+        primaryjoin="foreign(DBDeviceUserNotification.notification_id) == DBNotification.id",
+        back_populates="device_user_notifications",
     )
     device = relationship("DBDevice", back_populates="device_notifications")
     user = relationship("DBUser", back_populates="user_notifications")
@@ -254,3 +361,68 @@ class DBDeviceUserNotification(Base):
             name="_notification_device_user_uc",
         ),
     )
+
+
+# Tabla: notification_rollups (acumulados por grupo/dispositivo y hora o día)
+# Se actualiza en la misma transacción que la inserción de cada notificación,
+# así los totales del dashboard son lecturas puntuales en vez de recorrer notifications.
+class DBNotificationRollup(Base):
+    __tablename__ = "notification_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    working_group_id = Column(Integer, ForeignKey("working_groups.id"), nullable=False)
+    # Dispositivo que reportó las notificaciones; 0 = recibidas con token de usuario.
+    # No es FK para que la restricción única funcione sin NULLs.
+    device_id = Column(Integer, default=0, nullable=False)
+    granularity = Column(Enum(RollupGranularity), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)  # Inicio de la hora/día (UTC)
+    count = Column(Integer, default=0, nullable=False)
+    sum_amount_cents = Column(BigInteger, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "working_group_id",
+            "granularity",
+            "bucket_start",
+            "device_id",
+            name="_rollup_group_bucket_device_uc",
+        ),
+    )
+
+
+# Tabla: notification_archives (manifiesto del almacenamiento en frío)
+# Cada fila describe un archivo NDJSON comprimido con las notificaciones de un grupo
+# en un mes calendario, ya eliminadas de la tabla notifications.
+class DBNotificationArchive(Base):
+    __tablename__ = "notification_archives"
+    id = Column(Integer, primary_key=True, index=True)
+    working_group_id = Column(Integer, ForeignKey("working_groups.id"), nullable=False)
+    month_start = Column(DateTime, nullable=False)  # Primer día del mes archivado (UTC)
+    path = Column(String, nullable=False)  # Relativo a ARCHIVE_DIR
+    row_count = Column(Integer, nullable=False)
+    sum_amount_cents = Column(BigInteger, nullable=False)
+    min_notification_id = Column(Integer, nullable=False)
+    max_notification_id = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "working_group_id", "month_start", name="_archive_group_month_uc"
+        ),
+    )
+
+
+# Tabla: group_resource_versions (contador de cambios por grupo y recurso)
+# Cada escritura sobre las notificaciones, dispositivos u horarios de un grupo incrementa
+# su versión en la misma transacción; los listados la usan como ETag.
+class DBGroupResourceVersion(Base):
+    __tablename__ = "group_resource_versions"
+    id = Column(Integer, primary_key=True, index=True)
+    working_group_id = Column(Integer, ForeignKey("working_groups.id"), nullable=False)
+    resource = Column(String(32), nullable=False)  # "notifications", "devices", ...
+    version = Column(BigInteger, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "working_group_id", "resource", name="_group_resource_version_uc"
+        ),
+    )
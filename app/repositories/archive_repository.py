@@ -0,0 +1,49 @@
+from sqlalchemy.orm import Session
+from app.models import DBNotificationArchive
+from typing import Optional, List
+from datetime import datetime
+
+
+class NotificationArchiveRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_archive(
+        self, group_id: int, month_start: datetime
+    ) -> Optional[DBNotificationArchive]:
+        return (
+            self.db.query(DBNotificationArchive)
+            .filter(
+                DBNotificationArchive.working_group_id == group_id,
+                DBNotificationArchive.month_start == month_start,
+            )
+            .first()
+        )
+
+    def get_archives(
+        self,
+        group_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        newest_first: bool = False,
+    ) -> List[DBNotificationArchive]:
+        # Meses archivados del grupo que se solapan con [start, end)
+        query = self.db.query(DBNotificationArchive).filter(
+            DBNotificationArchive.working_group_id == group_id
+        )
+        if start is not None:
+            # El mes que contiene `start` empieza antes que `start`
+            query = query.filter(
+                DBNotificationArchive.month_start
+                >= start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            )
+        if end is not None:
+            query = query.filter(DBNotificationArchive.month_start < end)
+        order = DBNotificationArchive.month_start
+        return query.order_by(order.desc() if newest_first else order).all()
+
+    def save_archive(self, archive: DBNotificationArchive) -> DBNotificationArchive:
+        # Sin commit: se confirma junto con el borrado de las filas archivadas
+        self.db.add(archive)
+        self.db.flush()
+        return archive
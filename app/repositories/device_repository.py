@@ -1,6 +1,7 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.models import DBDevice, DBDeviceUser
-from typing import Optional, List
+from typing import Optional, List, Set, Dict
 
 
 class DeviceRepository:
@@ -18,12 +19,52 @@ class DeviceRepository:
             self.db.query(DBDevice).filter(DBDevice.working_group_id == group_id).all()
         )
 
+    def get_delivery_targets(self, group_id: int) -> List[tuple]:
+        # Filas (device_id, device_uid, payload_format, user_id) de los dispositivos activos
+        # del grupo. user_id es None si el dispositivo no tiene usuarios activos asignados.
+        return (
+            self.db.query(
+                DBDevice.id,
+                DBDevice.device_uid,
+                DBDevice.payload_format,
+                DBDeviceUser.user_id,
+            )
+            .outerjoin(
+                DBDeviceUser,
+                (DBDeviceUser.device_id == DBDevice.id)
+                & (DBDeviceUser.is_active.is_(True)),
+            )
+            .filter(DBDevice.working_group_id == group_id, DBDevice.is_active.is_(True))
+            .all()
+        )
+
     def create_device(self, device: DBDevice) -> DBDevice:
         self.db.add(device)
         self.db.commit()
         self.db.refresh(device)
         return device
 
+    def get_existing_uids(self, device_uids: List[str]) -> Set[str]:
+        # Un solo IN para todo el lote (usa el índice único de device_uid)
+        if not device_uids:
+            return set()
+        rows = (
+            self.db.query(DBDevice.device_uid)
+            .filter(DBDevice.device_uid.in_(device_uids))
+            .all()
+        )
+        return {device_uid for (device_uid,) in rows}
+
+    def bulk_create_devices(self, rows: List[dict]) -> Dict[str, DBDevice]:
+        # INSERT multi-fila con RETURNING; no hace commit. El orden de RETURNING no está
+        # garantizado en todos los motores, así que se devuelve indexado por device_uid.
+        if not rows:
+            return {}
+        return {
+            device.device_uid: device
+            for device in self.db.scalars(insert(DBDevice).returning(DBDevice), rows)
+        }
+
     def update_device(self, device: DBDevice) -> DBDevice:
         self.db.commit()
         self.db.refresh(device)
@@ -39,6 +80,64 @@ class DeviceRepository:
         self.db.refresh(device_user)
         return device_user
 
+    def bulk_create_device_user_associations(
+        self, rows: List[dict]
+    ) -> List[DBDeviceUser]:
+        # INSERT multi-fila con RETURNING. No hace commit: se confirma junto con la
+        # operación que la origina
+        if not rows:
+            return []
+        return list(self.db.scalars(insert(DBDeviceUser).returning(DBDeviceUser), rows))
+
+    def get_group_device_ids(self, group_id: int, device_ids: List[int]) -> Set[int]:
+        # Cuáles de `device_ids` pertenecen al grupo (un solo IN)
+        if not device_ids:
+            return set()
+        rows = (
+            self.db.query(DBDevice.id)
+            .filter(DBDevice.working_group_id == group_id, DBDevice.id.in_(device_ids))
+            .all()
+        )
+        return {device_id for (device_id,) in rows}
+
+    def get_group_device_users_by_id(
+        self, group_id: int, device_user_ids: List[int]
+    ) -> Dict[int, DBDeviceUser]:
+        # Cuáles de `device_user_ids` son asignaciones de dispositivos del grupo (un solo IN)
+        if not device_user_ids:
+            return {}
+        rows = (
+            self.db.query(DBDeviceUser)
+            .join(DBDevice, DBDevice.id == DBDeviceUser.device_id)
+            .filter(
+                DBDevice.working_group_id == group_id,
+                DBDeviceUser.id.in_(device_user_ids),
+            )
+            .all()
+        )
+        return {association.id: association for association in rows}
+
+    def get_device_users_for_devices(self, device_ids: List[int]) -> List[DBDeviceUser]:
+        return (
+            self.db.query(DBDeviceUser)
+            .filter(DBDeviceUser.device_id.in_(device_ids))
+            .all()
+        )
+
+    def delete_device_users_by_ids(self, device_user_ids: List[int]):
+        # No hace commit
+        if device_user_ids:
+            self.db.query(DBDeviceUser).filter(
+                DBDeviceUser.id.in_(device_user_ids)
+            ).delete(synchronize_session=False)
+
+    def activate_device_users_by_ids(self, device_user_ids: List[int]):
+        # No hace commit
+        if device_user_ids:
+            self.db.query(DBDeviceUser).filter(
+                DBDeviceUser.id.in_(device_user_ids)
+            ).update({DBDeviceUser.is_active: True}, synchronize_session=False)
+
     def get_device_user_association(
         self, user_id: int, device_id: int
     ) -> Optional[DBDeviceUser]:
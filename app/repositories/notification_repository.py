@@ -1,6 +1,8 @@
+from sqlalchemy import select, update, delete, func, or_, literal, literal_column
 from sqlalchemy.orm import Session
-from app.models import DBNotification, DBDeviceUserNotification
-from typing import Optional, List
+from app.database import dialect_insert
+from app.models import DBNotification, DBDeviceUserNotification, NotificationStatus
+from typing import Optional, List, Iterator, Set
 from datetime import datetime
 
 
@@ -27,12 +29,195 @@ class NotificationRepository:
         return (
             self.db.query(DBNotification)
             .filter(DBNotification.working_group_id == group_id)
-            .order_by(DBNotification.notification_timestamp.desc())
+            # id desempata: mismo orden que el feed en memoria y páginas estables
+            .order_by(
+                DBNotification.notification_timestamp.desc(), DBNotification.id.desc()
+            )
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_notifications_after(
+        self, group_id: int, after_id: int, limit: int = 20
+    ) -> List[DBNotification]:
+        # Notificaciones nuevas del grupo en orden de llegada (para sondeo de dispositivos)
+        return (
+            self.db.query(DBNotification)
+            .filter(
+                DBNotification.working_group_id == group_id,
+                DBNotification.id > after_id,
+            )
+            .order_by(DBNotification.id)
+            .limit(limit)
+            .all()
+        )
+
+    def iter_notifications(
+        self,
+        group_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device_id: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[tuple]:
+        # Recorre las notificaciones del grupo en orden cronológico con un cursor del
+        # lado del servidor: solo `batch_size` filas en memoria a la vez.
+        query = select(
+            DBNotification.id,
+            DBNotification.notification_timestamp,
+            DBNotification.created_at,
+            DBNotification.device_id,
+            DBNotification.name,
+            DBNotification.amount_cents,
+            DBNotification.security_code,
+            DBNotification.status,
+            DBNotification.raw_notification,
+        ).where(DBNotification.working_group_id == group_id)
+        if start is not None:
+            query = query.where(DBNotification.notification_timestamp >= start)
+        if end is not None:
+            query = query.where(DBNotification.notification_timestamp < end)
+        if device_id is not None:
+            query = query.where(DBNotification.device_id == device_id)
+        query = query.order_by(
+            DBNotification.notification_timestamp, DBNotification.id
+        ).execution_options(stream_results=True, yield_per=batch_size)
+        return iter(self.db.execute(query))
+
+    def search_notifications(
+        self,
+        group_id: int,
+        text_query: str,
+        min_amount_cents: Optional[int] = None,
+        max_amount_cents: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+    ) -> List[tuple]:
+        # Devuelve (DBNotification, rank) ordenado por relevancia y luego por fecha.
+        if self.db.get_bind().dialect.name == "postgresql":
+            # Índices GIN de la migración b3e7f2a9c184: columna generada search_vector
+            # (nombre + texto crudo sin las frases fijas de Yape) y trigramas sobre name
+            # para nombres incompletos o con errores ("Juan P.", "Jaun"). La consulta se
+            # limpia con la misma función: "yape" o "pago" no deben coincidir con todo.
+            search_vector = literal_column("notifications.search_vector")
+            ts_query = func.websearch_to_tsquery(
+                "simple", func.notification_search_text(text_query)
+            )
+            rank = func.ts_rank(search_vector, ts_query) + func.similarity(
+                DBNotification.name, text_query
+            )
+            matches = or_(
+                search_vector.op("@@")(ts_query),
+                DBNotification.name.op("%")(text_query),
+            )
+        else:
+            # Otros motores (SQLite en pruebas locales): coincidencia por subcadena
+            pattern = f"%{text_query}%"
+            rank = literal(0.0)
+            matches = or_(
+                DBNotification.name.ilike(pattern),
+                DBNotification.raw_notification.ilike(pattern),
+            )
+
+        query = self.db.query(DBNotification, rank.label("rank")).filter(
+            DBNotification.working_group_id == group_id, matches
+        )
+        if min_amount_cents is not None:
+            query = query.filter(DBNotification.amount_cents >= min_amount_cents)
+        if max_amount_cents is not None:
+            query = query.filter(DBNotification.amount_cents <= max_amount_cents)
+        if start is not None:
+            query = query.filter(DBNotification.notification_timestamp >= start)
+        if end is not None:
+            query = query.filter(DBNotification.notification_timestamp < end)
+        return (
+            query.order_by(
+                rank.desc(),
+                DBNotification.notification_timestamp.desc(),
+                DBNotification.id.desc(),
+            )
+            .limit(limit)
+            .all()
+        )
+
+    def find_by_security_code(
+        self,
+        group_id: int,
+        security_code: str,
+        amount_cents: Optional[int] = None,
+        limit: int = 5,
+        since: Optional[datetime] = None,
+    ) -> List[DBNotification]:
+        # Usa ix_notifications_group_code_timestamp; las más recientes primero. `since`
+        # acota el rango del índice (y las particiones que se leen)
+        query = self.db.query(DBNotification).filter(
+            DBNotification.working_group_id == group_id,
+            DBNotification.security_code == security_code,
+        )
+        if since is not None:
+            query = query.filter(DBNotification.notification_timestamp >= since)
+        if amount_cents is not None:
+            query = query.filter(DBNotification.amount_cents == amount_cents)
+        return (
+            query.order_by(
+                DBNotification.notification_timestamp.desc(), DBNotification.id.desc()
+            )
+            .limit(limit)
+            .all()
+        )
+
+    def count_notifications_by_group(self, group_id: int) -> int:
+        return (
+            self.db.query(func.count(DBNotification.id))
+            .filter(DBNotification.working_group_id == group_id)
+            .scalar()
+        )
+
+    def get_oldest_timestamps_before(self, before: datetime) -> List[tuple]:
+        # (working_group_id, notificación más antigua) de los grupos con filas anteriores a `before`
+        return (
+            self.db.query(
+                DBNotification.working_group_id,
+                func.min(DBNotification.notification_timestamp),
+            )
+            .filter(DBNotification.notification_timestamp < before)
+            .group_by(DBNotification.working_group_id)
+            .all()
+        )
+
+    def delete_notifications_by_ids(
+        self,
+        group_id: int,
+        start: datetime,
+        end: datetime,
+        notification_ids: List[int],
+        batch_size: int = 1000,
+    ) -> int:
+        # Borra exactamente las notificaciones indicadas (y sus registros de envío), por
+        # lotes. Grupo y rango [start, end) acotan la búsqueda a la partición del mes.
+        # Sin commit: va en la misma transacción que el manifiesto. Las filas que se
+        # confirman después de leer el rango (aunque tengan ids menores) no se tocan.
+        deleted = 0
+        for i in range(0, len(notification_ids), batch_size):
+            batch = notification_ids[i : i + batch_size]
+            self.db.execute(
+                delete(DBDeviceUserNotification).where(
+                    DBDeviceUserNotification.notification_id.in_(batch)
+                )
+            )
+            result = self.db.execute(
+                delete(DBNotification).where(
+                    DBNotification.working_group_id == group_id,
+                    DBNotification.notification_timestamp >= start,
+                    DBNotification.notification_timestamp < end,
+                    DBNotification.id.in_(batch),
+                )
+            )
+            deleted += result.rowcount
+        return deleted
+
     def update_notification(self, notification: DBNotification) -> DBNotification:
         self.db.commit()
         self.db.refresh(notification)
@@ -58,3 +243,33 @@ class NotificationRepository:
         self.db.commit()
         self.db.refresh(device_user_notification)
         return device_user_notification
+
+    def record_deliveries(
+        self, deliveries: List[dict], notification_ids: List[int]
+    ) -> Set[int]:
+        # Registra en lote los envíos confirmados y marca las notificaciones como SENT.
+        # Los duplicados (mismo notification/device/user) se ignoran por la restricción única.
+        # Devuelve los grupos con notificaciones que cambiaron de estado. No hace commit.
+        changed_groups: Set[int] = set()
+        if deliveries:
+            insert = dialect_insert(self.db)
+            self.db.execute(
+                insert(DBDeviceUserNotification)
+                .values(deliveries)
+                .on_conflict_do_nothing(
+                    index_elements=["notification_id", "device_id", "user_id"]
+                )
+            )
+        if notification_ids:
+            changed_groups.update(
+                self.db.scalars(
+                    update(DBNotification)
+                    .where(
+                        DBNotification.id.in_(notification_ids),
+                        DBNotification.status != NotificationStatus.SENT,
+                    )
+                    .values(status=NotificationStatus.SENT)
+                    .returning(DBNotification.working_group_id)
+                )
+            )
+        return changed_groups
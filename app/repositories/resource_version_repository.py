@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models import DBGroupResourceVersion
+
+
+class ResourceVersionRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_version(self, group_id: int, resource: str) -> int:
+        # 0 si el recurso del grupo nunca se modificó desde que existe la tabla
+        version = (
+            self.db.query(DBGroupResourceVersion.version)
+            .filter(
+                DBGroupResourceVersion.working_group_id == group_id,
+                DBGroupResourceVersion.resource == resource,
+            )
+            .scalar()
+        )
+        return version or 0
+
+    def bump(self, group_id: int, resource: str) -> int:
+        # Upsert version = version + 1 y devuelve la nueva versión. No hace commit:
+        # se confirma junto con la escritura que cambia el listado.
+        insert = dialect_insert(self.db)
+        stmt = insert(DBGroupResourceVersion).values(
+            working_group_id=group_id, resource=resource, version=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["working_group_id", "resource"],
+            set_={"version": DBGroupResourceVersion.version + 1},
+        ).returning(DBGroupResourceVersion.version)
+        return self.db.execute(stmt).scalar_one()
@@ -0,0 +1,141 @@
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+from app.core.timezones import ZoneTable, zone_table
+from app.database import dialect_insert
+from app.models import DBNotification, DBNotificationRollup, RollupGranularity
+from typing import Dict, List, Tuple
+from datetime import datetime, time, timezone
+
+
+def local_day_start(utc: datetime, table: ZoneTable) -> datetime:
+    # Medianoche local (en la zona de `table`) del día que contiene `utc`, en UTC
+    return table.to_utc(datetime.combine(table.to_local(utc).date(), time.min))
+
+
+def bucket_starts(timestamp: datetime, time_zone: str) -> dict:
+    # Inicio de la hora UTC y del día local del grupo, ambos en UTC sin tzinfo como el
+    # resto de columnas DateTime. Un día local dura 23-25 horas con horario de verano;
+    # con offsets de media hora, cada hora UTC cuenta en el día local en que empieza.
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    hour = timestamp.replace(minute=0, second=0, microsecond=0)
+    return {
+        RollupGranularity.HOUR: hour,
+        RollupGranularity.DAY: local_day_start(hour, zone_table(time_zone)),
+    }
+
+
+class RollupRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def increment(self, notification: DBNotification, time_zone: str):
+        # Upsert de los acumulados hora/día (día local en `time_zone`, la zona del
+        # grupo) de la notificación. No hace commit: se confirma con la inserción.
+        insert = dialect_insert(self.db)
+        stmt = insert(DBNotificationRollup).values(
+            [
+                {
+                    "working_group_id": notification.working_group_id,
+                    "device_id": notification.device_id or 0,
+                    "granularity": granularity,
+                    "bucket_start": bucket_start,
+                    "count": 1,
+                    "sum_amount_cents": notification.amount_cents,
+                }
+                for granularity, bucket_start in bucket_starts(
+                    notification.notification_timestamp, time_zone
+                ).items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["working_group_id", "granularity", "bucket_start", "device_id"],
+            set_={
+                "count": DBNotificationRollup.count + stmt.excluded.count,
+                "sum_amount_cents": DBNotificationRollup.sum_amount_cents
+                + stmt.excluded.sum_amount_cents,
+            },
+        )
+        self.db.execute(stmt)
+
+    def rebuild_day_buckets(self, group_id: int, time_zone: str) -> int:
+        # Recalcula los acumulados DAY del grupo en `time_zone` a partir de los HOUR (p.
+        # ej. al cambiar la zona del grupo). No hace commit.
+        table = zone_table(time_zone)
+        hours = (
+            self.db.query(
+                DBNotificationRollup.device_id,
+                DBNotificationRollup.bucket_start,
+                DBNotificationRollup.count,
+                DBNotificationRollup.sum_amount_cents,
+            )
+            .filter(
+                DBNotificationRollup.working_group_id == group_id,
+                DBNotificationRollup.granularity == RollupGranularity.HOUR,
+            )
+            .all()
+        )
+        days: Dict[Tuple[int, datetime], List[int]] = {}
+        for device_id, bucket_start, count, sum_amount_cents in hours:
+            totals = days.setdefault(
+                (device_id, local_day_start(bucket_start, table)), [0, 0]
+            )
+            totals[0] += count
+            totals[1] += sum_amount_cents
+
+        self.db.execute(
+            delete(DBNotificationRollup).where(
+                DBNotificationRollup.working_group_id == group_id,
+                DBNotificationRollup.granularity == RollupGranularity.DAY,
+            )
+        )
+        if days:
+            self.db.execute(
+                insert(DBNotificationRollup),
+                [
+                    {
+                        "working_group_id": group_id,
+                        "device_id": device_id,
+                        "granularity": RollupGranularity.DAY,
+                        "bucket_start": bucket_start,
+                        "count": totals[0],
+                        "sum_amount_cents": totals[1],
+                    }
+                    for (device_id, bucket_start), totals in days.items()
+                ],
+            )
+        return len(days)
+
+    def get_buckets(
+        self,
+        group_id: int,
+        granularity: RollupGranularity,
+        start: datetime,
+        end: datetime,
+        by_device: bool = False,
+    ) -> List[tuple]:
+        # Filas (bucket_start, device_id, count, sum_amount_cents) de los buckets que
+        # empiezan en [start, end). device_id es None cuando se suman todos los dispositivos.
+        group_columns = [DBNotificationRollup.bucket_start]
+        if by_device:
+            group_columns.append(DBNotificationRollup.device_id)
+
+        rows = (
+            self.db.query(
+                *group_columns,
+                func.sum(DBNotificationRollup.count),
+                func.sum(DBNotificationRollup.sum_amount_cents),
+            )
+            .filter(
+                DBNotificationRollup.working_group_id == group_id,
+                DBNotificationRollup.granularity == granularity,
+                DBNotificationRollup.bucket_start >= start,
+                DBNotificationRollup.bucket_start < end,
+            )
+            .group_by(*group_columns)
+            .order_by(*group_columns)
+            .all()
+        )
+        if by_device:
+            return [tuple(row) for row in rows]
+        return [(bucket_start, None, count, total) for bucket_start, count, total in rows]
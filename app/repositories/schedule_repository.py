@@ -1,7 +1,14 @@
+from sqlalchemy import and_, insert, or_, select
 from sqlalchemy.orm import Session
-from app.models import DBGroupSchedule, DBIndividualSchedule
-from typing import Optional, List
-from datetime import datetime
+from app.models import (
+    DBDevice,
+    DBDeviceUser,
+    DBGroupMember,
+    DBGroupSchedule,
+    DBIndividualSchedule,
+)
+from typing import Optional, List, Tuple
+from datetime import datetime, timedelta
 
 
 class ScheduleRepository:
@@ -22,6 +29,18 @@ class ScheduleRepository:
             .all()
         )
 
+    def get_group_schedules_in_window(
+        self, group_id: int, start: datetime, end: datetime
+    ) -> List[DBGroupSchedule]:
+        return (
+            self.db.query(DBGroupSchedule)
+            .filter(
+                DBGroupSchedule.working_group_id == group_id,
+                self._in_window(DBGroupSchedule, start, end),
+            )
+            .all()
+        )
+
     def get_group_schedule_by_id(self, schedule_id: int) -> Optional[DBGroupSchedule]:
         return (
             self.db.query(DBGroupSchedule)
@@ -38,7 +57,48 @@ class ScheduleRepository:
         self.db.delete(schedule)
         self.db.commit()
 
+    def delete_group_schedules_by_group(self, group_id: int) -> int:
+        # No hace commit
+        return (
+            self.db.query(DBGroupSchedule)
+            .filter(DBGroupSchedule.working_group_id == group_id)
+            .delete(synchronize_session=False)
+        )
+
+    def bulk_create_group_schedules(self, rows: List[dict]) -> List[DBGroupSchedule]:
+        # INSERT multi-fila con RETURNING. No hace commit.
+        if not rows:
+            return []
+        return list(
+            self.db.scalars(insert(DBGroupSchedule).returning(DBGroupSchedule), rows)
+        )
+
     # --- Individual Schedules ---
+    def get_individual_schedule_ids_for_device_users(
+        self, device_user_ids: List[int]
+    ) -> List[int]:
+        if not device_user_ids:
+            return []
+        rows = (
+            self.db.query(DBIndividualSchedule.id)
+            .filter(DBIndividualSchedule.device_user_id.in_(device_user_ids))
+            .order_by(DBIndividualSchedule.id)
+            .all()
+        )
+        return [row.id for row in rows]
+
+    def delete_individual_schedules_for_device_users(
+        self, device_user_ids: List[int]
+    ) -> int:
+        # Horarios ligados a asignaciones que se van a eliminar. No hace commit.
+        if not device_user_ids:
+            return 0
+        return (
+            self.db.query(DBIndividualSchedule)
+            .filter(DBIndividualSchedule.device_user_id.in_(device_user_ids))
+            .delete(synchronize_session=False)
+        )
+
     def create_individual_schedule(
         self, schedule: DBIndividualSchedule
     ) -> DBIndividualSchedule:
@@ -47,6 +107,101 @@ class ScheduleRepository:
         self.db.refresh(schedule)
         return schedule
 
+    @staticmethod
+    def _individual_in_group(group_id: int):
+        # Horarios individuales ligados a dispositivos del grupo o a asignaciones de
+        # esos dispositivos
+        group_devices = select(DBDevice.id).where(DBDevice.working_group_id == group_id)
+        group_device_users = select(DBDeviceUser.id).where(
+            DBDeviceUser.device_id.in_(group_devices)
+        )
+        return or_(
+            DBIndividualSchedule.device_id.in_(group_devices),
+            DBIndividualSchedule.device_user_id.in_(group_device_users),
+        )
+
+    @staticmethod
+    def _in_window(model, start: datetime, end: datetime):
+        # Horarios (recurrentes o no) con alguna ocurrencia posible en [start, end).
+        # Un día de margen: los all_day se extienden a días locales completos.
+        margin = timedelta(days=1)
+        return and_(
+            model.is_active.is_(True),
+            model.start_time < end + margin,
+            or_(model.series_end.is_(None), model.series_end > start - margin),
+        )
+
+    def delete_individual_schedules_for_group(self, group_id: int) -> int:
+        # No hace commit
+        return (
+            self.db.query(DBIndividualSchedule)
+            .filter(self._individual_in_group(group_id))
+            .delete(synchronize_session=False)
+        )
+
+    def get_individual_schedules_for_group_in_window(
+        self, group_id: int, start: datetime, end: datetime
+    ) -> List[DBIndividualSchedule]:
+        return (
+            self.db.query(DBIndividualSchedule)
+            .filter(
+                self._individual_in_group(group_id),
+                self._in_window(DBIndividualSchedule, start, end),
+            )
+            .all()
+        )
+
+    def get_member_schedules_in_window(
+        self, group_id: int, start: datetime, end: datetime
+    ) -> List[DBIndividualSchedule]:
+        # Horarios personales (solo user_id) de los miembros del grupo
+        members = select(DBGroupMember.user_id).where(
+            DBGroupMember.working_group_id == group_id
+        )
+        return (
+            self.db.query(DBIndividualSchedule)
+            .filter(
+                DBIndividualSchedule.device_user_id.is_(None),
+                DBIndividualSchedule.device_id.is_(None),
+                DBIndividualSchedule.user_id.in_(members),
+                self._in_window(DBIndividualSchedule, start, end),
+            )
+            .all()
+        )
+
+    def get_individual_schedules_for_targets_in_window(
+        self, targets: List[Tuple[str, int]], start: datetime, end: datetime
+    ) -> List[DBIndividualSchedule]:
+        # Horarios que ocupan alguno de los objetivos, directamente o por una
+        # asignación (ver schedule_conflicts.individual_targets)
+        schedule = DBIndividualSchedule
+        conditions = []
+        for kind, target_id in targets:
+            column = DBDeviceUser.device_id if kind == "device" else DBDeviceUser.user_id
+            direct = schedule.device_id if kind == "device" else schedule.user_id
+            conditions += [
+                direct == target_id,
+                schedule.device_user_id.in_(
+                    select(DBDeviceUser.id).where(column == target_id)
+                ),
+            ]
+        if not conditions:
+            return []
+        return (
+            self.db.query(schedule)
+            .filter(or_(*conditions), self._in_window(schedule, start, end))
+            .all()
+        )
+
+    def bulk_create_individual_schedules(
+        self, rows: List[dict]
+    ) -> List[DBIndividualSchedule]:
+        # INSERT multi-fila con RETURNING. No hace commit.
+        if not rows:
+            return []
+        stmt = insert(DBIndividualSchedule).returning(DBIndividualSchedule)
+        return list(self.db.scalars(stmt, rows))
+
     def get_individual_schedule_by_id(
         self, schedule_id: int
     ) -> Optional[DBIndividualSchedule]:
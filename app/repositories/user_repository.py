@@ -1,6 +1,16 @@
+from sqlalchemy import delete, exists
 from sqlalchemy.orm import Session
-from app.models import DBUser, UserRole, DBWorkingGroup, DBDeviceUser
-from typing import Optional, List
+from app.models import (
+    DBDevice,
+    DBDeviceUser,
+    DBUser,
+    UserRole,
+    DBWorkingGroup,
+    DBGroupMember,
+)
+from app.database import dialect_insert
+from typing import Optional, List, Set
+from datetime import datetime
 
 
 class UserRepository:
@@ -29,17 +39,99 @@ class UserRepository:
         self.db.commit()
 
     def get_users_by_group(self, group_id: int) -> List[DBUser]:
-        # Obtener usuarios que son miembros de este grupo (a través de device_users)
-        # Esto requiere un join con DBDeviceUser y DBDevice para encontrar el working_group_id
+        # Miembros del grupo (tabla group_members; el admin es el creator_id del grupo)
         return (
             self.db.query(DBUser)
-            .join(DBDeviceUser)
-            .join(DBDeviceUser.device)
-            .filter(DBDeviceUser.device.has(working_group_id=group_id))
-            .distinct()
+            .join(DBGroupMember, DBGroupMember.user_id == DBUser.id)
+            .filter(DBGroupMember.working_group_id == group_id)
+            .order_by(DBUser.id)
             .all()
         )
 
+    def get_group_member_ids(self, group_id: int, user_ids: List[int]) -> Set[int]:
+        # Cuáles de `user_ids` son miembros del grupo (un solo IN)
+        if not user_ids:
+            return set()
+        rows = (
+            self.db.query(DBGroupMember.user_id)
+            .filter(
+                DBGroupMember.working_group_id == group_id,
+                DBGroupMember.user_id.in_(user_ids),
+            )
+            .all()
+        )
+        return {user_id for (user_id,) in rows}
+
+    def get_group_ids_for_user(self, user_id: int) -> List[int]:
+        rows = (
+            self.db.query(DBGroupMember.working_group_id)
+            .filter(DBGroupMember.user_id == user_id)
+            .all()
+        )
+        return [group_id for (group_id,) in rows]
+
+    def add_group_member(self, group_id: int, user_id: int, explicit: bool = False):
+        self.add_group_members(group_id, [user_id], explicit)
+
+    def add_group_members(
+        self, group_id: int, user_ids: List[int], explicit: bool = False
+    ):
+        # Idempotente; no hace commit (se confirma con la operación que la origina).
+        # explicit = True (alta por el admin) marca la fila aunque ya existiera por una
+        # asignación; una asignación nunca le quita la marca.
+        if not user_ids:
+            return
+        insert = dialect_insert(self.db)
+        now = datetime.utcnow()
+        stmt = insert(DBGroupMember).values(
+            [
+                {
+                    "working_group_id": group_id,
+                    "user_id": user_id,
+                    "created_at": now,
+                    "explicit": explicit,
+                }
+                for user_id in user_ids
+            ]
+        )
+        index_elements = ["working_group_id", "user_id"]
+        if explicit:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements, set_={"explicit": True}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        self.db.execute(stmt)
+
+    def remove_unassigned_group_members(self, group_id: int, user_ids: List[int]) -> int:
+        # Quita del grupo a los usuarios indicados que entraron por una asignación y ya no
+        # tienen ninguna en dispositivos del grupo (pierden el acceso). Los miembros
+        # dados de alta por el admin no se tocan. No hace commit.
+        if not user_ids:
+            return 0
+        still_assigned = exists().where(
+            DBDeviceUser.user_id == DBGroupMember.user_id,
+            DBDevice.id == DBDeviceUser.device_id,
+            DBDevice.working_group_id == group_id,
+        )
+        result = self.db.execute(
+            delete(DBGroupMember)
+            .where(
+                DBGroupMember.working_group_id == group_id,
+                DBGroupMember.user_id.in_(user_ids),
+                DBGroupMember.explicit.is_(False),
+                ~still_assigned,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def get_existing_user_ids(self, user_ids: List[int]) -> Set[int]:
+        if not user_ids:
+            return set()
+        rows = self.db.query(DBUser.id).filter(DBUser.id.in_(user_ids)).all()
+        return {user_id for (user_id,) in rows}
+
     def get_admin_by_group_id(self, group_id: int) -> Optional[DBUser]:
         return (
             self.db.query(DBUser)
@@ -8,10 +8,10 @@ from app.schemas import (
     UserOut,
     Token,
     UserUpdate,
-    UserRole,
-    DBUser,
 )
+from app.models import UserRole, DBUser
 from app.services.user_service import UserService
+from app.services.authorization import AccessControl
 from app.auth import (
     create_access_token,
     get_current_admin,
@@ -124,21 +124,14 @@ async def update_user_profile(
                 detail="Usuario a actualizar no encontrado.",
             )
 
-        admin_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else None
-        )
-
-        # Verificar si el target_user pertenece al mismo grupo que el admin
-        # (Esto es complejo ya que la pertenencia de MEMBERs es via DeviceUser)
-        # Por simplicidad, un admin puede actualizar cualquier usuario de su grupo.
-        # Una validación más robusta aquí podría ser que el target_user esté asociado a un device que pertenezca al grupo del admin.
-
-        # Para evitar complejidad excesiva aquí, asumiremos que el admin solo interactúa con usuarios lógicos de su grupo.
-        # Si se necesita una validación estricta de pertenencia al grupo para la actualización,
-        # se debe añadir aquí una consulta que verifique DBDeviceUser.
-        pass  # La validación se hace en el servicio si se requiere.
+        # El target_user debe estar asociado a un dispositivo de un grupo del admin
+        if not AccessControl.for_session(db).is_member_of_admin_group(
+            current_user, target_user.id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No puedes actualizar usuarios fuera de tu grupo.",
+            )
 
     user_service = UserService(db)
     updated_user = user_service.update_user_profile(user_id, user_data)
@@ -1,18 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    File,
+    Form,
+    Header,
+    Response,
+    UploadFile,
+)
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas import (
     DeviceCreate,
     DeviceOut,
     DeviceUpdate,
+    DeviceCredentialsOut,
+    DeviceBatchCreate,
+    DeviceBatchOut,
     DeviceUserCreate,
     DeviceUserOut,
+    DeviceAssignmentsUpdate,
+    DeviceAssignmentsOut,
     UserOut,
 )
-from app.services.device_service import DeviceService
+from app.services.device_service import DeviceService, parse_device_csv
+from app.services.resource_versions import etag_matches
 from app.auth import get_current_admin, get_current_active_user_in_group
 from app.models import DBUser
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix="/devices", tags=["Devices"])
 
@@ -31,6 +47,47 @@ async def create_device(
     return new_device
 
 
+@router.post("/batch", response_model=DeviceBatchOut)
+async def create_devices_batch(
+    batch_data: DeviceBatchCreate,
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Registra un lote de dispositivos (y opcionalmente sus usuarios asignados) en un solo paso.
+    Devuelve el resultado de cada fila; las que fallan no impiden crear las demás.
+    """
+    device_service = DeviceService(db)
+    return device_service.create_devices_batch(
+        batch_data.working_group_id, batch_data.devices, current_admin
+    )
+
+
+@router.post("/batch/csv", response_model=DeviceBatchOut)
+async def create_devices_batch_csv(
+    working_group_id: int = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Igual que /devices/batch, a partir de un CSV con columnas device_uid, alias, description,
+    is_active, payload_format y user_ids (separados por ";").
+    """
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El CSV debe estar codificado en UTF-8.",
+        )
+    items, errors = parse_device_csv(content)
+    device_service = DeviceService(db)
+    return device_service.create_devices_batch(
+        working_group_id, items, current_admin, invalid=errors
+    )
+
+
 @router.get("/{device_id}", response_model=DeviceOut)
 async def get_device_by_id(
     device_id: int,
@@ -53,14 +110,21 @@ async def get_device_by_id(
 @router.get("/group/{group_id}", response_model=List[DeviceOut])
 async def get_devices_for_group(
     group_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: DBUser = Depends(get_current_active_user_in_group),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Obtiene todos los dispositivos asociados a un grupo de trabajo.
     Solo accesible para usuarios que pertenecen o son administradores de ese grupo.
+    La respuesta lleva un ETag; con `If-None-Match` igual se responde 304 sin leer filas.
     """
     device_service = DeviceService(db)
+    etag = device_service.get_group_devices_etag(group_id, current_user)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     devices = device_service.get_devices_for_group(group_id, current_user)
     return devices
 
@@ -94,6 +158,34 @@ async def deactivate_device(
     return deactivated_device
 
 
+@router.get("/{device_id}/credentials", response_model=DeviceCredentialsOut)
+async def get_device_credentials(
+    device_id: int,
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Obtiene la credencial (X-Device-UID / X-Device-Key) que el ESP32 usa para autenticarse.
+    Solo accesible para el administrador del grupo del dispositivo.
+    """
+    device_service = DeviceService(db)
+    return device_service.get_device_credentials(device_id, current_admin)
+
+
+@router.post("/{device_id}/credentials/rotate", response_model=DeviceCredentialsOut)
+async def rotate_device_credentials(
+    device_id: int,
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Genera una nueva credencial para el dispositivo e invalida la anterior.
+    Solo accesible para el administrador del grupo del dispositivo.
+    """
+    device_service = DeviceService(db)
+    return device_service.get_device_credentials(device_id, current_admin, rotate=True)
+
+
 @router.post("/assign-user", response_model=DeviceUserOut)
 async def assign_user_to_device(
     device_user_data: DeviceUserCreate,
@@ -110,6 +202,28 @@ async def assign_user_to_device(
     return new_association
 
 
+@router.put("/group/{group_id}/assignments", response_model=DeviceAssignmentsOut)
+async def replace_group_assignments(
+    group_id: int,
+    assignments_data: DeviceAssignmentsUpdate,
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Reasigna en un solo paso los usuarios de varios dispositivos del grupo: cada dispositivo
+    listado queda con exactamente los usuarios indicados. Si alguna asignación eliminada tiene
+    horarios individuales responde 409, salvo que delete_schedules sea true. Solo accesible para
+    el administrador del grupo.
+    """
+    device_service = DeviceService(db)
+    return device_service.replace_group_assignments(
+        group_id,
+        assignments_data.assignments,
+        current_admin,
+        delete_schedules=assignments_data.delete_schedules,
+    )
+
+
 @router.get("/{device_id}/assigned-users", response_model=List[UserOut])
 async def get_users_assigned_to_device(
     device_id: int,
@@ -0,0 +1,45 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from app.auth import get_diagnostics_admin
+from app.models import DBUser
+from app.services.diagnostics import sample_stacks, format_collapsed, dump_tasks
+
+router = APIRouter(prefix="/diagnostics", tags=["Diagnostics"])
+
+# Un solo perfil a la vez por worker
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/profile")
+async def capture_profile(
+    seconds: float = Query(5.0, gt=0, le=30),
+    interval_ms: float = Query(5.0, ge=1, le=100),
+    current_admin: DBUser = Depends(get_diagnostics_admin),
+):
+    """
+    Captura un perfil por muestreo de este worker durante `seconds` segundos y lo
+    devuelve en formato collapsed-stack (una pila por línea con su cantidad de
+    muestras), para generar un flamegraph. Requiere DIAGNOSTICS_ENABLED.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay un perfil en curso en este worker.",
+        )
+    async with _profile_lock:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    return Response(
+        content=format_collapsed(stacks),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
+    )
+
+
+@router.get("/tasks")
+async def get_task_dump(current_admin: DBUser = Depends(get_diagnostics_admin)):
+    """
+    Volcado de las tareas asyncio pendientes del worker (con su pila), las requests
+    en curso con su tiempo y SQL acumulado, y las conexiones WebSocket por grupo.
+    Requiere DIAGNOSTICS_ENABLED.
+    """
+    return dump_tasks()
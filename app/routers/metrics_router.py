@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import registry
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Métricas del worker en formato de texto de Prometheus: latencia y requests en
+    curso por ruta, y cantidad/tiempo de sentencias SQL por request.
+    """
+    return Response(content=registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas import (
@@ -7,11 +8,21 @@ from app.schemas import (
     NotificationUpdateStatus,
     DeviceUserNotificationCreate,
     DeviceUserNotificationOut,
+    NotificationSummaryOut,
+    NotificationSearchOut,
+    NotificationVerifyOut,
 )
 from app.services.notification_service import NotificationService
-from app.auth import get_current_active_user_in_group
-from app.models import DBUser
-from typing import List
+from app.auth import get_current_active_user_in_group, get_current_device
+from app.services.device_registry import DeviceEntry
+from app.services.device_payload import try_encode_notification, COMPACT_MEDIA_TYPE
+from app.services.websocket_manager import manager
+from app.services.notification_export import EXPORT_MEDIA_TYPES
+from app.services.resource_versions import etag_matches
+from app.models import DBUser, PayloadFormat, RollupGranularity
+from typing import List, Optional
+from datetime import date, datetime
+from decimal import Decimal
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -29,7 +40,7 @@ async def receive_notification_from_client(
     # Para el servicio de Kotlin, el `working_group_id` debería ser parte del payload o de un token específico.
     # Por ahora, lo recibiremos en el payload para simplificar la integración con Kotlin,
     # o si el token del servicio Android tiene el `working_group_id`.
-    # Si se envía desde un ESP32, se enviaría el device_uid, y el backend lo mapearía al group_id.
+    # Si se envía desde un ESP32, se usa /notifications/device/incoming (ver abajo).
     # Para la integración con el servicio Kotlin, necesitamos que el token del servicio Kotlin
     # contenga el working_group_id. Así que lo obtendremos de un usuario autenticado.
     current_user: DBUser = Depends(
@@ -42,13 +53,7 @@ async def receive_notification_from_client(
     notification_service = NotificationService(db)
 
     # Obtener el working_group_id del usuario autenticado del servicio Kotlin
-    user_group_id = (
-        current_user.created_working_groups[0].id
-        if current_user.created_working_groups
-        else None
-    )
-    if user_group_id is None and current_user.user_devices:
-        user_group_id = current_user.user_devices[0].device.working_group.id
+    user_group_id = notification_service.access.get_primary_group_id(current_user.id)
 
     if user_group_id is None:
         raise HTTPException(
@@ -59,28 +64,210 @@ async def receive_notification_from_client(
     new_notification = notification_service.create_notification(
         notification_data, user_group_id
     )
+    await manager.broadcast_notification(user_group_id, new_notification)
     return new_notification
 
 
+@router.post("/device/incoming", response_model=NotificationOut)
+async def receive_notification_from_device(
+    notification_data: NotificationCreate,
+    db: Session = Depends(get_db),
+    current_device: DeviceEntry = Depends(get_current_device),
+):
+    """
+    Recibe una notificación de YAPE enviada directamente por un dispositivo (ESP32).
+    El dispositivo se autentica con los headers X-Device-UID y X-Device-Key, y su
+    working_group_id se resuelve desde el mapa en memoria de dispositivos.
+    """
+    notification_service = NotificationService(db)
+    new_notification = notification_service.create_notification(
+        notification_data,
+        current_device.working_group_id,
+        device_id=current_device.device_id,
+        time_zone=current_device.time_zone,
+    )
+    await manager.broadcast_notification(
+        current_device.working_group_id, new_notification
+    )
+    return new_notification
+
+
+@router.get("/device/pending", response_model=List[NotificationOut])
+async def get_notifications_for_device(
+    db: Session = Depends(get_db),
+    current_device: DeviceEntry = Depends(get_current_device),
+    after_id: int = 0,
+    limit: int = Query(20, le=100),
+    payload_format: Optional[PayloadFormat] = Query(None, alias="format"),
+):
+    """
+    Devuelve las notificaciones del grupo del dispositivo con id mayor a `after_id`,
+    en orden de llegada. Por defecto usa el formato configurado para el dispositivo;
+    con `format=compact` responde los registros binarios concatenados.
+    """
+    notification_service = NotificationService(db)
+    notifications = notification_service.get_notifications_for_device(
+        current_device.working_group_id, after_id, limit
+    )
+    if (payload_format or current_device.payload_format) == PayloadFormat.COMPACT:
+        # Las que no caben en el formato compacto se omiten (se registran en el log)
+        records = (
+            try_encode_notification(n, PayloadFormat.COMPACT) for n in notifications
+        )
+        return Response(
+            content=b"".join(record for record in records if record is not None),
+            media_type=COMPACT_MEDIA_TYPE,
+        )
+    return notifications
+
+
+@router.get("/verify", response_model=NotificationVerifyOut)
+async def verify_payment(
+    security_code: str = Query(..., min_length=1, max_length=255),
+    amount: Optional[Decimal] = Query(None, ge=0),
+    since: Optional[datetime] = None,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user_in_group),
+):
+    """
+    Verifica en caja que un pago con ese código de seguridad (y monto, si se indica)
+    llegó al grupo de trabajo del usuario desde `since` (por defecto, las últimas
+    VERIFY_RECENT_HOURS horas). Devuelve a lo sumo `limit` coincidencias, las más
+    recientes primero. Los códigos recientes se responden desde memoria; los demás,
+    desde el índice por grupo y código.
+    """
+    notification_service = NotificationService(db)
+    return notification_service.verify_payment(
+        current_user.id, security_code, amount, since, limit
+    )
+
+
 @router.get("/group/{group_id}", response_model=List[NotificationOut])
 async def get_notifications_for_group(
     group_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: DBUser = Depends(get_current_active_user_in_group),
     skip: int = 0,
     limit: int = 100,
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Obtiene todas las notificaciones para un grupo de trabajo específico.
     Solo accesible para usuarios que pertenecen o son administradores de ese grupo.
+    Con `include_archived=true` la paginación continúa con los meses archivados.
+    Las primeras páginas se sirven ya serializadas desde el feed en memoria del grupo.
+    La respuesta lleva un ETag; con `If-None-Match` igual se responde 304 sin leer filas.
     """
     notification_service = NotificationService(db)
+    version = notification_service.get_group_version(group_id, current_user.id)
+    etag = notification_service.group_page_etag(
+        group_id, version, skip, limit, include_archived
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    if not include_archived:
+        page = notification_service.get_cached_group_page(group_id, version, skip, limit)
+        if page is not None:
+            return Response(
+                content=page, media_type="application/json", headers={"ETag": etag}
+            )
+    response.headers["ETag"] = etag
     notifications = notification_service.get_notifications_for_group(
-        group_id, current_user.id, skip, limit
+        group_id, current_user.id, skip, limit, include_archived
     )
     return notifications
 
 
+@router.get("/group/{group_id}/search", response_model=List[NotificationSearchOut])
+async def search_notifications(
+    group_id: int,
+    q: str = Query(..., min_length=2, max_length=100),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user_in_group),
+    amount: Optional[Decimal] = Query(None, ge=0),
+    min_amount: Optional[Decimal] = Query(None, ge=0),
+    max_amount: Optional[Decimal] = Query(None, ge=0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, le=100),
+):
+    """
+    Busca notificaciones del grupo por nombre del pagador o texto de la notificación
+    (tolerante a nombres incompletos o con errores), filtrando opcionalmente por monto
+    exacto (`amount`) o rango (`min_amount`/`max_amount`) y por rango de fechas (sin
+    `start`, los últimos SEARCH_DEFAULT_DAYS días). Los resultados vienen ordenados por
+    relevancia y luego por fecha.
+    """
+    notification_service = NotificationService(db)
+    return notification_service.search_notifications(
+        group_id,
+        current_user.id,
+        q,
+        amount,
+        min_amount,
+        max_amount,
+        start,
+        end,
+        limit,
+    )
+
+
+@router.get("/group/{group_id}/summary", response_model=NotificationSummaryOut)
+async def get_group_summary(
+    group_id: int,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user_in_group),
+    granularity: RollupGranularity = RollupGranularity.HOUR,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    by_device: bool = False,
+    day: Optional[date] = None,
+):
+    """
+    Devuelve cuántos pagos y cuánto se recibió por hora o por día (y opcionalmente por
+    dispositivo; device_id 0 = recibidos sin dispositivo) entre `start` y `end` (UTC si
+    no traen zona). Sin `start`, el día local `day` del grupo (hoy por defecto). Los
+    buckets diarios son días locales del grupo; todos los bucket_start se dan en UTC.
+    Se lee de los acumulados, no de notifications.
+    """
+    notification_service = NotificationService(db)
+    return notification_service.get_group_summary(
+        group_id, current_user.id, granularity, start, end, by_device, day
+    )
+
+
+@router.get("/group/{group_id}/export")
+async def export_notifications(
+    group_id: int,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user_in_group),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    device_id: Optional[int] = None,
+    include_archived: bool = False,
+):
+    """
+    Exporta el historial de notificaciones del grupo en CSV o NDJSON, en orden
+    cronológico y filtrado opcionalmente por rango de fechas y dispositivo.
+    La respuesta se envía por bloques con memoria constante, sin importar el volumen.
+    Con `include_archived=true` incluye también los meses archivados.
+    """
+    notification_service = NotificationService(db)
+    chunks = notification_service.export_notifications(
+        group_id, current_user.id, export_format, start, end, device_id, include_archived
+    )
+    filename = f"notificaciones_grupo_{group_id}.{export_format}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.patch("/{notification_id}/status", response_model=NotificationOut)
 async def update_notification_status(
     notification_id: int,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas import (
@@ -6,12 +6,18 @@ from app.schemas import (
     GroupScheduleOut,
     IndividualScheduleCreate,
     IndividualScheduleOut,
+    ScheduleBulkReplace,
+    ScheduleBulkOut,
+    ScheduleConflictOut,
+    ScheduleOccurrenceOut,
     ScheduleUpdate,
 )
 from app.services.schedule_service import ScheduleService
+from app.services.resource_versions import etag_matches
 from app.auth import get_current_admin, get_current_active_user_in_group
-from app.models import DBUser
-from typing import List
+from app.models import DBUser, UserRole
+from typing import List, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/schedules", tags=["Schedules"])
 
@@ -39,18 +45,93 @@ async def create_group_schedule(
 @router.get("/group/{group_id}", response_model=List[GroupScheduleOut])
 async def get_group_schedules(
     group_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: DBUser = Depends(get_current_active_user_in_group),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Obtiene todos los horarios para un grupo de trabajo.
     Accesible para usuarios (admin o miembro) que pertenecen a ese grupo.
+    La respuesta lleva un ETag; con `If-None-Match` igual se responde 304 sin leer filas.
     """
     schedule_service = ScheduleService(db)
+    etag = schedule_service.get_group_schedules_etag(group_id, current_user)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     schedules = schedule_service.get_group_schedules(group_id, current_user)
     return schedules
 
 
+@router.get(
+    "/group/{group_id}/occurrences", response_model=List[ScheduleOccurrenceOut]
+)
+async def get_group_occurrences(
+    group_id: int,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user_in_group),
+):
+    """
+    Obtiene las ocurrencias concretas (con las reglas de recurrencia ya expandidas) de los
+    horarios del grupo y de sus dispositivos en [start, end), en hora local del grupo y en
+    UTC. start/end sin zona se toman como hora local; por defecto, los próximos 7 días.
+    Accesible para usuarios (admin o miembro) que pertenecen a ese grupo.
+    """
+    schedule_service = ScheduleService(db)
+    return schedule_service.get_group_occurrences(group_id, start, end, current_user)
+
+
+@router.get("/group/{group_id}/active", response_model=List[ScheduleOccurrenceOut])
+async def get_active_occurrences(
+    group_id: int,
+    at: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user_in_group),
+):
+    """
+    Obtiene las ocurrencias vigentes en el instante `at` (UTC si no trae zona; por
+    defecto, ahora), evaluadas en la zona horaria del grupo.
+    Accesible para usuarios (admin o miembro) que pertenecen a ese grupo.
+    """
+    schedule_service = ScheduleService(db)
+    return schedule_service.get_active_occurrences(group_id, at, current_user)
+
+
+@router.get("/group/{group_id}/conflicts", response_model=List[ScheduleConflictOut])
+async def audit_group_conflicts(
+    group_id: int,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Lista los horarios activos que se superponen (del grupo y de sus dispositivos,
+    asignaciones y miembros) en [start, end), en hora local del grupo. Por defecto, los
+    próximos 31 días desde hoy. Solo accesible para el administrador del grupo.
+    """
+    schedule_service = ScheduleService(db)
+    return schedule_service.audit_group_conflicts(group_id, start, end, current_admin)
+
+
+@router.put("/group/{group_id}/bulk", response_model=ScheduleBulkOut)
+async def replace_group_schedules(
+    group_id: int,
+    bulk_data: ScheduleBulkReplace,
+    db: Session = Depends(get_db),
+    current_admin: DBUser = Depends(get_current_admin),
+):
+    """
+    Reemplaza de una vez los horarios del grupo (p. ej. el rol de la semana). Valida todo
+    el lote y rechaza horarios superpuestos (409). Solo accesible para el administrador del grupo.
+    """
+    schedule_service = ScheduleService(db)
+    return schedule_service.replace_group_schedules(group_id, bulk_data, current_admin)
+
+
 @router.put("/group/{schedule_id}", response_model=GroupScheduleOut)
 async def update_group_schedule(
     schedule_id: int,
@@ -165,7 +246,7 @@ async def get_individual_schedules_for_user(
     Obtiene los horarios individuales para un usuario específico.
     Accesible para el propio usuario o un administrador de su grupo.
     """
-    if user_id != current_user.id and current_user.role != DBUser.role.ADMIN:
+    if user_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para ver los horarios de este usuario.",
@@ -201,12 +282,11 @@ async def get_individual_schedules_for_device(
         )
 
     # Verificar si el usuario actual es admin del grupo del dispositivo, o un miembro de ese grupo.
-    is_admin_of_group = current_user.role == DBUser.role.ADMIN and any(
-        g.id == device.working_group_id for g in current_user.created_working_groups
+    is_admin_of_group = schedule_service.access.is_group_admin(
+        current_user, device.working_group_id
     )
-    is_member_of_group = any(
-        du.device_id == device_id and du.user_id == current_user.id
-        for du in current_user.user_devices
+    is_member_of_group = schedule_service.access.is_device_user(
+        current_user.id, device_id
     )
 
     if not (is_admin_of_group or is_member_of_group):
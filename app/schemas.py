@@ -1,8 +1,16 @@
 # --- Archivo: tracking-yape-backend/app/schemas.py ---
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
-from app.models import UserRole, NotificationStatus  # Importa los Enums
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from app.core.money import MAX_AMOUNT
+from app.core.timezones import DEFAULT_TIME_ZONE, is_valid_time_zone
+from app.models import (
+    UserRole,
+    NotificationStatus,
+    PayloadFormat,
+    RollupGranularity,
+)  # Importa los Enums
 
 
 # --- Esquemas para WorkingGroup ---
@@ -10,6 +18,15 @@ class WorkingGroupBase(BaseModel):
     name: str = Field(..., max_length=50)
     description: Optional[str] = Field(None, max_length=255)
     is_active: bool = True
+    # Zona IANA, p. ej. "America/Lima"; los horarios del grupo están en esta hora local
+    time_zone: str = Field(DEFAULT_TIME_ZONE, max_length=64)
+
+    @field_validator("time_zone")
+    @classmethod
+    def check_time_zone(cls, value):
+        if not is_valid_time_zone(value):
+            raise ValueError(f"Zona horaria desconocida: {value}")
+        return value
 
 
 class WorkingGroupCreate(WorkingGroupBase):
@@ -99,6 +116,7 @@ class DeviceBase(BaseModel):
     alias: Optional[str] = Field(None, max_length=50)
     description: Optional[str] = Field(None, max_length=255)
     is_active: bool = True
+    payload_format: PayloadFormat = PayloadFormat.JSON
 
 
 class DeviceCreate(DeviceBase):
@@ -119,6 +137,43 @@ class DeviceUpdate(BaseModel):
     alias: Optional[str] = Field(None, max_length=50)
     description: Optional[str] = Field(None, max_length=255)
     is_active: Optional[bool] = None
+    payload_format: Optional[PayloadFormat] = None
+
+
+class DeviceCredentialsOut(BaseModel):
+    # Credencial que el ESP32 envía en los headers X-Device-UID / X-Device-Key
+    device_uid: str
+    device_key: str
+    credential_version: int
+
+
+# --- Alta masiva de dispositivos ---
+MAX_DEVICE_BATCH = 1000
+
+
+class DeviceBatchItem(DeviceBase):
+    # Usuarios a asignar al dispositivo recién creado (opcional)
+    user_ids: List[int] = []
+
+
+class DeviceBatchCreate(BaseModel):
+    working_group_id: int
+    devices: List[DeviceBatchItem] = Field(..., min_length=1, max_length=MAX_DEVICE_BATCH)
+
+
+class DeviceBatchResultOut(BaseModel):
+    index: int  # Posición en la lista (o fila de datos del CSV, desde 0)
+    device_uid: Optional[str] = None
+    status: str  # "created", "conflict" o "invalid"
+    detail: Optional[str] = None
+    device: Optional[DeviceOut] = None
+    assigned_user_ids: List[int] = []
+
+
+class DeviceBatchOut(BaseModel):
+    created: int
+    failed: int
+    results: List[DeviceBatchResultOut]
 
 
 # --- Esquemas para DeviceUser (Tabla de unión) ---
@@ -143,12 +198,50 @@ class DeviceUserUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
+# --- Reasignación masiva de usuarios a dispositivos ---
+class DeviceAssignmentItem(BaseModel):
+    device_id: int
+    user_ids: List[int] = []  # Lista vacía = el dispositivo queda sin usuarios
+
+
+class DeviceAssignmentsUpdate(BaseModel):
+    # Asignaciones deseadas; los dispositivos del grupo que no aparecen no se tocan
+    assignments: List[DeviceAssignmentItem] = Field(
+        ..., min_length=1, max_length=MAX_DEVICE_BATCH
+    )
+    # Confirma el borrado de los horarios individuales de las asignaciones eliminadas;
+    # sin él, la reasignación se rechaza (409) si alguna tiene horarios
+    delete_schedules: bool = False
+
+
+class DeviceAssignmentsOut(BaseModel):
+    added: List[DeviceUserOut]
+    removed: List[DeviceUserOut]
+    reactivated: List[DeviceUserOut]
+    unchanged: int
+    removed_schedules: int  # Horarios individuales de las asignaciones eliminadas
+
+
 # --- Esquemas para Horarios (Individual y Grupo) ---
 class ScheduleBase(BaseModel):
+    # Si hay recurrence_rule, start_time/end_time son la primera ocurrencia
     start_time: datetime
     end_time: datetime
     all_day: bool = False
     is_active: bool = True
+    # Regla estilo RRULE, p. ej. "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SA" (None = no se repite)
+    recurrence_rule: Optional[str] = Field(None, max_length=255)
+    recurrence_exceptions: List[date] = []  # Días en que no aplica la regla
+
+    @field_validator("recurrence_exceptions", mode="before")
+    @classmethod
+    def split_exceptions(cls, value):
+        # En la DB las fechas excluidas se guardan como texto "AAAA-MM-DD,AAAA-MM-DD"
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [item for item in value.split(",") if item]
+        return value
 
 
 class IndividualScheduleCreate(ScheduleBase):
@@ -173,6 +266,19 @@ class GroupScheduleCreate(ScheduleBase):
     pass
 
 
+MAX_SCHEDULE_BATCH = 1000
+
+
+class ScheduleBulkReplace(BaseModel):
+    # Reemplaza todos los horarios de grupo; los individuales solo si se envía la lista
+    # (None = no se tocan). En el reemplazo, cada horario individual debe indicar
+    # device_user_id o device_id de un dispositivo del grupo.
+    group_schedules: List[GroupScheduleCreate] = Field([], max_length=MAX_SCHEDULE_BATCH)
+    individual_schedules: Optional[List[IndividualScheduleCreate]] = Field(
+        None, max_length=MAX_SCHEDULE_BATCH
+    )
+
+
 class GroupScheduleOut(ScheduleBase):
     id: int
     working_group_id: int
@@ -181,29 +287,84 @@ class GroupScheduleOut(ScheduleBase):
         from_attributes = True
 
 
+class ScheduleBulkOut(BaseModel):
+    group_schedules: List[GroupScheduleOut]
+    individual_schedules: List[IndividualScheduleOut]
+    removed_group_schedules: int
+    removed_individual_schedules: int
+
+
 class ScheduleUpdate(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     all_day: Optional[bool] = None
     is_active: Optional[bool] = None
+    recurrence_rule: Optional[str] = Field(None, max_length=255)  # "" = deja de repetirse
+    recurrence_exceptions: Optional[List[date]] = None
+
+
+class ScheduleOccurrenceOut(BaseModel):
+    # Una ocurrencia concreta de un horario (expandida si es recurrente). start_time y
+    # end_time están en hora local del grupo; los all_day cubren días locales completos.
+    schedule_id: int
+    kind: str  # "group" o "individual"
+    start_time: datetime
+    end_time: datetime
+    start_utc: datetime
+    end_utc: datetime
+    all_day: bool
+    device_user_id: Optional[int] = None
+    device_id: Optional[int] = None
+    user_id: Optional[int] = None
+
+
+class ScheduleConflictOut(BaseModel):
+    # Dos horarios activos del mismo objetivo que se superponen
+    target: str  # "group", "device" o "user"
+    target_id: int
+    kind: str  # "group" o "individual"
+    schedule_ids: List[int]
+    first_overlap_start: datetime  # Primer tramo superpuesto dentro del rango revisado
+    first_overlap_end: datetime
+    overlaps: int  # Ocurrencias superpuestas dentro del rango revisado
 
 
 # --- Esquemas para Notification ---
 class NotificationBase(BaseModel):
     raw_notification: str
     name: str = Field(..., max_length=255)
-    amount: float
     security_code: str = Field(..., max_length=255)
     notification_timestamp: datetime  # Fecha y hora de detección en el cliente
 
 
+# Rango de notification_timestamp que cabe en el u32 (epoch) del formato compacto
+MIN_NOTIFICATION_TIMESTAMP = datetime(1970, 1, 1)
+MAX_NOTIFICATION_TIMESTAMP = datetime(2106, 2, 7, 6, 28, 15)
+
+
 class NotificationCreate(NotificationBase):
     # working_group_id se obtiene del token del servicio de notificaciones
-    pass
+    # Monto en soles con a lo sumo 2 decimales; se guarda exacto en céntimos
+    amount: Decimal = Field(..., ge=0, le=MAX_AMOUNT, decimal_places=2)
+
+    @field_validator("notification_timestamp")
+    @classmethod
+    def check_notification_timestamp(cls, value):
+        # Se guarda en UTC sin tzinfo, como el resto de columnas DateTime
+        if value.tzinfo is not None:
+            try:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            except OverflowError:
+                raise ValueError("notification_timestamp fuera de rango")
+        if not MIN_NOTIFICATION_TIMESTAMP <= value <= MAX_NOTIFICATION_TIMESTAMP:
+            raise ValueError("notification_timestamp fuera de rango")
+        return value
 
 
 class NotificationOut(NotificationBase):
     id: int
+    amount: float  # Monto en soles (derivado de amount_cents)
+    amount_cents: int  # Monto exacto en céntimos
     working_group_id: int
     status: NotificationStatus  # recieved o sent
     created_at: datetime  # Cuando se guardó en el backend
@@ -212,10 +373,40 @@ class NotificationOut(NotificationBase):
         from_attributes = True
 
 
+class NotificationSearchOut(NotificationOut):
+    rank: float  # Relevancia de la coincidencia (mayor es mejor)
+
+
+class NotificationVerifyOut(BaseModel):
+    verified: bool  # True si llegó al menos un pago con ese código (y monto)
+    matches: List[NotificationOut]  # Los pagos coincidentes, más recientes primero
+
+
 class NotificationUpdateStatus(BaseModel):
     status: NotificationStatus
 
 
+# --- Esquemas para los acumulados de ventas (rollups) ---
+class NotificationRollupOut(BaseModel):
+    bucket_start: datetime
+    device_id: Optional[int] = None  # Solo si se pide el detalle por dispositivo
+    count: int
+    sum_amount_cents: int
+    amount: float  # Suma en soles
+
+
+class NotificationSummaryOut(BaseModel):
+    working_group_id: int
+    granularity: RollupGranularity
+    start: datetime
+    end: datetime
+    count: int
+    sum_amount_cents: int
+    amount: float
+    buckets: List[NotificationRollupOut]
+    time_zone: str  # Zona del grupo: define los días locales del resumen
+
+
 # --- Esquemas para DeviceUserNotification (para evitar duplicados MQTT) ---
 class DeviceUserNotificationBase(BaseModel):
     notification_id: int
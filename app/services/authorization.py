@@ -0,0 +1,233 @@
+from sqlalchemy import and_, exists, func, literal, or_, select
+from sqlalchemy.orm import Session
+from app.models import (
+    DBDevice,
+    DBDeviceUser,
+    DBGroupMember,
+    DBGroupSchedule,
+    DBIndividualSchedule,
+    DBUser,
+    DBWorkingGroup,
+    UserRole,
+)
+from typing import Optional
+
+# Chequeos de permisos resueltos en la DB con un solo EXISTS indexado cada uno, en
+# lugar de recorrer current_user.user_devices / created_working_groups (que cargan
+# cada asociación y su dispositivo con una consulta por fila).
+# Los resultados se memorizan en la sesión: como hay una sesión por request, el
+# mismo chequeo repetido por varios servicios en una request cuesta una sola consulta.
+
+
+class AccessControl:
+    def __init__(self, db: Session):
+        self.db = db
+        self._cache = {}
+
+    @classmethod
+    def for_session(cls, db: Session) -> "AccessControl":
+        access = db.info.get("access_control")
+        if access is None:
+            access = db.info["access_control"] = cls(db)
+        return access
+
+    def clear(self):
+        # Llamar tras cambiar asignaciones o grupos dentro de la misma request
+        self._cache.clear()
+
+    def _memo(self, key: tuple, query):
+        if key not in self._cache:
+            self._cache[key] = self.db.execute(query).scalar()
+        return self._cache[key]
+
+    # --- Condiciones reutilizables (EXISTS correlacionables) ---
+
+    @staticmethod
+    def _admin_clause(user_id: int, group_id):
+        return exists().where(
+            DBWorkingGroup.id == group_id, DBWorkingGroup.creator_id == user_id
+        )
+
+    @staticmethod
+    def _member_clause(user_id: int, group_id):
+        return exists().where(
+            DBGroupMember.user_id == user_id,
+            DBGroupMember.working_group_id == group_id,
+        )
+
+    # --- Grupos ---
+
+    def is_group_admin(self, user: DBUser, group_id: int) -> bool:
+        if user.role != UserRole.ADMIN:
+            return False
+        return self._memo(
+            ("admin", user.id, group_id), select(self._admin_clause(user.id, group_id))
+        )
+
+    def is_group_member(self, user_id: int, group_id: int) -> bool:
+        return self._memo(
+            ("member", user_id, group_id), select(self._member_clause(user_id, group_id))
+        )
+
+    def can_access_group(self, user: DBUser, group_id: int) -> bool:
+        # Admin (creador) o miembro (group_members) del grupo
+        conditions = [self._member_clause(user.id, group_id)]
+        if user.role == UserRole.ADMIN:
+            conditions.append(self._admin_clause(user.id, group_id))
+        return self._memo(("access", user.id, group_id), select(or_(*conditions)))
+
+    def get_primary_group_id(self, user_id: int) -> Optional[int]:
+        # Grupo del usuario: el primero que creó o, si no, el primero al que se unió
+        created = (
+            select(func.min(DBWorkingGroup.id))
+            .where(DBWorkingGroup.creator_id == user_id)
+            .scalar_subquery()
+        )
+        joined = (
+            select(DBGroupMember.working_group_id)
+            .where(DBGroupMember.user_id == user_id)
+            .order_by(DBGroupMember.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        return self._memo(("primary", user_id), select(func.coalesce(created, joined)))
+
+    def has_any_group(self, user_id: int) -> bool:
+        return self.get_primary_group_id(user_id) is not None
+
+    # --- Dispositivos ---
+
+    def can_manage_device(self, user: DBUser, device_id: int) -> bool:
+        # Solo el admin del grupo al que pertenece el dispositivo
+        if user.role != UserRole.ADMIN:
+            return False
+        return self._memo(
+            ("manage_device", user.id, device_id),
+            select(
+                exists().where(
+                    DBDevice.id == device_id,
+                    DBWorkingGroup.id == DBDevice.working_group_id,
+                    DBWorkingGroup.creator_id == user.id,
+                )
+            ),
+        )
+
+    def can_view_device(self, user: DBUser, device_id: int) -> bool:
+        # Admin o miembro del grupo del dispositivo
+        group_id = (
+            select(DBDevice.working_group_id)
+            .where(DBDevice.id == device_id)
+            .scalar_subquery()
+        )
+        conditions = [self._member_clause(user.id, group_id)]
+        if user.role == UserRole.ADMIN:
+            conditions.append(self._admin_clause(user.id, group_id))
+        return self._memo(("view_device", user.id, device_id), select(or_(*conditions)))
+
+    def is_device_user(self, user_id: int, device_id: int) -> bool:
+        return self._memo(
+            ("device_user", user_id, device_id),
+            select(
+                exists().where(
+                    DBDeviceUser.user_id == user_id, DBDeviceUser.device_id == device_id
+                )
+            ),
+        )
+
+    def can_manage_device_user(self, user: DBUser, device_user_id: int) -> bool:
+        # Admin del grupo del dispositivo de la asignación
+        if user.role != UserRole.ADMIN:
+            return False
+        return self._memo(
+            ("manage_device_user", user.id, device_user_id),
+            select(
+                exists().where(
+                    DBDeviceUser.id == device_user_id,
+                    DBDevice.id == DBDeviceUser.device_id,
+                    DBWorkingGroup.id == DBDevice.working_group_id,
+                    DBWorkingGroup.creator_id == user.id,
+                )
+            ),
+        )
+
+    def is_member_of_admin_group(self, admin: DBUser, user_id: int) -> bool:
+        # El usuario es miembro de algún grupo creado por el admin
+        if admin.role != UserRole.ADMIN:
+            return False
+        if admin.id == user_id:
+            return True
+        return self._memo(
+            ("admin_member", admin.id, user_id),
+            select(
+                exists().where(
+                    DBGroupMember.user_id == user_id,
+                    DBWorkingGroup.id == DBGroupMember.working_group_id,
+                    DBWorkingGroup.creator_id == admin.id,
+                )
+            ),
+        )
+
+    # --- Horarios ---
+
+    def can_view_group_schedule(self, user: DBUser, schedule_id: int) -> bool:
+        group_id = (
+            select(DBGroupSchedule.working_group_id)
+            .where(DBGroupSchedule.id == schedule_id)
+            .scalar_subquery()
+        )
+        conditions = [self._member_clause(user.id, group_id)]
+        if user.role == UserRole.ADMIN:
+            conditions.append(self._admin_clause(user.id, group_id))
+        return self._memo(
+            ("view_group_schedule", user.id, schedule_id), select(or_(*conditions))
+        )
+
+    def can_manage_individual_schedule(self, user: DBUser, schedule_id: int) -> bool:
+        # Dueño del horario (por user_id o por su asignación) o admin del grupo del
+        # dispositivo / de la asignación / del usuario al que aplica
+        schedule = DBIndividualSchedule
+        own_assignment = exists().where(
+            DBDeviceUser.id == schedule.device_user_id,
+            DBDeviceUser.user_id == user.id,
+        )
+        conditions = [
+            and_(
+                schedule.device_user_id.is_(None),
+                schedule.device_id.is_(None),
+                schedule.user_id == user.id,
+            ),
+            own_assignment,
+        ]
+        if user.role == UserRole.ADMIN:
+            admin_groups = select(DBWorkingGroup.id).where(
+                DBWorkingGroup.creator_id == user.id
+            )
+            conditions += [
+                exists().where(
+                    DBDeviceUser.id == schedule.device_user_id,
+                    DBDevice.id == DBDeviceUser.device_id,
+                    DBDevice.working_group_id.in_(admin_groups),
+                ),
+                and_(
+                    schedule.device_user_id.is_(None),
+                    exists().where(
+                        DBDevice.id == schedule.device_id,
+                        DBDevice.working_group_id.in_(admin_groups),
+                    ),
+                ),
+                and_(
+                    schedule.device_user_id.is_(None),
+                    schedule.device_id.is_(None),
+                    or_(
+                        schedule.user_id == user.id,
+                        exists().where(
+                            DBGroupMember.user_id == schedule.user_id,
+                            DBGroupMember.working_group_id.in_(admin_groups),
+                        ),
+                    ),
+                ),
+            ]
+        return self._memo(
+            ("manage_individual_schedule", user.id, schedule_id),
+            select(literal(True)).where(schedule.id == schedule_id, or_(*conditions)),
+        ) is True
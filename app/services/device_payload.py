@@ -0,0 +1,75 @@
+import calendar
+import logging
+import struct
+from typing import Optional
+from app.models import PayloadFormat
+from app.schemas import NotificationOut
+
+# Formato compacto para ESP32 (little-endian, sin padding):
+#   u8   versión del formato (COMPACT_VERSION)
+#   u32  id de la notificación
+#   i32  monto en céntimos
+#   u32  notification_timestamp (epoch UTC, segundos)
+#   u8   largo del nombre + bytes UTF-8 del nombre (truncado a NAME_MAX_BYTES)
+#   u8   largo del código + bytes del código de seguridad (truncado a CODE_MAX_BYTES)
+# Cada registro es autodelimitado, por lo que varios registros se pueden concatenar.
+COMPACT_VERSION = 1
+NAME_MAX_BYTES = 24
+CODE_MAX_BYTES = 16
+COMPACT_MEDIA_TYPE = "application/octet-stream"
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<BIiI")
+
+
+def _truncate_utf8(value: str, max_bytes: int) -> bytes:
+    encoded = value.encode("utf-8")[:max_bytes]
+    # No cortar un carácter multibyte a la mitad
+    return encoded.decode("utf-8", errors="ignore").encode("utf-8")
+
+
+def encode_compact(notification: NotificationOut) -> bytes:
+    name = _truncate_utf8(notification.name, NAME_MAX_BYTES)
+    code = _truncate_utf8(notification.security_code, CODE_MAX_BYTES)
+    return b"".join(
+        (
+            _HEADER.pack(
+                COMPACT_VERSION,
+                notification.id,
+                notification.amount_cents,
+                calendar.timegm(notification.notification_timestamp.utctimetuple()),
+            ),
+            bytes((len(name),)),
+            name,
+            bytes((len(code),)),
+            code,
+        )
+    )
+
+
+def encode_json(notification: NotificationOut) -> bytes:
+    return notification.model_dump_json().encode("utf-8")
+
+
+def encode_notification(
+    notification: NotificationOut, payload_format: PayloadFormat
+) -> bytes:
+    if payload_format == PayloadFormat.COMPACT:
+        return encode_compact(notification)
+    return encode_json(notification)
+
+
+def try_encode_notification(
+    notification: NotificationOut, payload_format: PayloadFormat
+) -> Optional[bytes]:
+    # None si la notificación no cabe en el formato (p. ej. filas anteriores a la
+    # validación de monto y fecha): se omiten esos destinos y no el resto
+    try:
+        return encode_notification(notification, payload_format)
+    except (struct.error, ValueError, OverflowError):
+        logger.warning(
+            "No se pudo serializar la notificación",
+            extra={"notification_id": notification.id, "format": payload_format.value},
+        )
+        return None
@@ -0,0 +1,60 @@
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models import DBDevice, DBWorkingGroup, PayloadFormat
+from app.core.config import settings
+
+
+class DeviceEntry(NamedTuple):
+    device_id: int
+    working_group_id: int
+    is_active: bool
+    credential_version: int
+    payload_format: PayloadFormat
+    time_zone: str  # Zona del grupo (días locales de los acumulados)
+
+
+class DeviceRegistry:
+    # Mapa en memoria device_uid -> (device_id, working_group_id, is_active, credential_version, payload_format, time_zone)
+    # { device_uid: (expira_en, DeviceEntry) }
+    # Permite que los ESP32 resuelvan su grupo sin recorrer usuario y membresías en cada request.
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, DeviceEntry]] = {}
+
+    def resolve(self, db: Session, device_uid: str) -> Optional[DeviceEntry]:
+        cached = self._entries.get(device_uid)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        row = (
+            db.query(
+                DBDevice.id,
+                DBDevice.working_group_id,
+                DBDevice.is_active,
+                DBDevice.credential_version,
+                DBDevice.payload_format,
+                DBWorkingGroup.time_zone,
+            )
+            .join(DBWorkingGroup, DBWorkingGroup.id == DBDevice.working_group_id)
+            .filter(DBDevice.device_uid == device_uid)
+            .first()
+        )
+        if row is None:
+            # No cacheamos UIDs inexistentes para no llenar el mapa con basura
+            self._entries.pop(device_uid, None)
+            return None
+
+        entry = DeviceEntry(*row)
+        self._entries[device_uid] = (now + self.ttl_seconds, entry)
+        return entry
+
+    def invalidate(self, device_uid: str):
+        self._entries.pop(device_uid, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+device_registry = DeviceRegistry(settings.DEVICE_CACHE_TTL_SECONDS)
@@ -1,9 +1,19 @@
+import csv
+import io
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from app.models import DBDevice, DBDeviceUser, DBUser
+from app.models import DBDevice, DBDeviceUser, DBUser, UserRole
 from app.schemas import (
     DeviceCreate,
     DeviceOut,
     DeviceUpdate,
+    DeviceCredentialsOut,
+    DeviceBatchItem,
+    DeviceBatchOut,
+    DeviceBatchResultOut,
+    DeviceAssignmentItem,
+    DeviceAssignmentsOut,
+    MAX_DEVICE_BATCH,
     DeviceUserCreate,
     DeviceUserOut,
     UserOut,
@@ -11,37 +21,84 @@ from app.schemas import (
 from app.repositories.device_repository import DeviceRepository
 from app.repositories.user_repository import UserRepository
 from app.repositories.working_group_repository import WorkingGroupRepository
+from app.repositories.schedule_repository import ScheduleRepository
+from app.repositories.resource_version_repository import ResourceVersionRepository
+from app.services.device_registry import device_registry
+from app.services.authorization import AccessControl
+from app.services.group_roster import group_roster
+from app.services.resource_versions import DEVICES, list_etag
+from app.auth import create_device_key
 from fastapi import HTTPException, status
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
 
+def parse_device_csv(
+    content: str,
+) -> Tuple[List[Optional[DeviceBatchItem]], Dict[int, str]]:
+    # CSV con encabezado: device_uid (obligatoria), alias, description, is_active,
+    # payload_format y user_ids (ids separados por ";"). Devuelve una entrada por fila
+    # de datos (None si es inválida) y el motivo de cada fila inválida.
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or "device_uid" not in reader.fieldnames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El CSV debe tener encabezado con la columna device_uid.",
+        )
+
+    items: List[Optional[DeviceBatchItem]] = []
+    errors: Dict[int, str] = {}
+    for index, row in enumerate(reader):
+        if index >= MAX_DEVICE_BATCH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El lote admite como máximo {MAX_DEVICE_BATCH} dispositivos.",
+            )
+        data = {
+            key: value for key, value in row.items() if key and value not in (None, "")
+        }
+        try:
+            data["user_ids"] = [
+                int(user_id) for user_id in data.get("user_ids", "").split(";") if user_id
+            ]
+            items.append(DeviceBatchItem.model_validate(data))
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            items.append(None)
+            errors[index] = f"Fila inválida ({field}): {error['msg']}"
+        except ValueError:
+            items.append(None)
+            errors[index] = "Fila inválida (user_ids): se esperaban ids separados por ';'."
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El CSV no contiene dispositivos.",
+        )
+    return items, errors
+
+
 class DeviceService:
     def __init__(self, db: Session):
         self.device_repo = DeviceRepository(db)
         self.user_repo = UserRepository(db)
         self.group_repo = WorkingGroupRepository(db)
+        self.schedule_repo = ScheduleRepository(db)
+        self.version_repo = ResourceVersionRepository(db)
+        self.access = AccessControl.for_session(db)
         self.db = db
 
     def create_device(
         self, device_data: DeviceCreate, current_user: DBUser
     ) -> DeviceOut:
         # Solo el admin del grupo puede crear dispositivos para SU grupo
-        # Asumimos que el admin tiene al menos un grupo creado
-        if (
-            current_user.role != DBUser.role.ADMIN
-            or not current_user.created_working_groups
-        ):
+        if current_user.role != UserRole.ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Solo los administradores de un grupo pueden crear dispositivos.",
             )
 
-        admin_group_id = current_user.created_working_groups[
-            0
-        ].id  # Asumimos el primer grupo del admin
-
-        if device_data.working_group_id != admin_group_id:
+        if not self.access.is_group_admin(current_user, device_data.working_group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Solo puedes crear dispositivos para tu propio grupo.",
@@ -70,11 +127,121 @@ class DeviceService:
             alias=device_data.alias,
             description=device_data.description,
             is_active=device_data.is_active,
+            payload_format=device_data.payload_format,
             last_seen=datetime.utcnow(),  # Establecer last_seen al crear
         )
+        self.version_repo.bump(device_data.working_group_id, DEVICES)
         created_device = self.device_repo.create_device(new_device)
         return DeviceOut.model_validate(created_device)
 
+    def create_devices_batch(
+        self,
+        group_id: int,
+        items: List[Optional[DeviceBatchItem]],
+        current_user: DBUser,
+        invalid: Optional[Dict[int, str]] = None,
+    ) -> DeviceBatchOut:
+        # Alta masiva: un IN para los UID existentes, otro para los usuarios a asignar,
+        # un INSERT multi-fila de dispositivos y otro de asignaciones, y un solo commit.
+        # Las filas con problemas no se crean y se informan en su resultado.
+        if not self.access.is_group_admin(current_user, group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Solo puedes crear dispositivos para tu propio grupo.",
+            )
+
+        results: List[Optional[DeviceBatchResultOut]] = [None] * len(items)
+        for index, detail in (invalid or {}).items():
+            results[index] = DeviceBatchResultOut(
+                index=index, status="invalid", detail=detail
+            )
+
+        candidates = [
+            (index, item) for index, item in enumerate(items) if item is not None
+        ]
+        existing_uids = self.device_repo.get_existing_uids(
+            [item.device_uid for _, item in candidates]
+        )
+        existing_users = self.user_repo.get_existing_user_ids(
+            list({user_id for _, item in candidates for user_id in item.user_ids})
+        )
+
+        accepted = []
+        seen_uids = set()
+        for index, item in candidates:
+            detail, result_status = None, "conflict"
+            if item.device_uid in existing_uids:
+                detail = "Ya existe un dispositivo con este UID."
+            elif item.device_uid in seen_uids:
+                detail = "UID repetido en el lote."
+            else:
+                missing = [u for u in item.user_ids if u not in existing_users]
+                if missing:
+                    detail, result_status = (
+                        f"Usuarios a asignar no encontrados: {missing}",
+                        "invalid",
+                    )
+            if detail:
+                results[index] = DeviceBatchResultOut(
+                    index=index,
+                    device_uid=item.device_uid,
+                    status=result_status,
+                    detail=detail,
+                )
+                continue
+            seen_uids.add(item.device_uid)
+            accepted.append((index, item))
+
+        now = datetime.utcnow()
+        created_devices = self.device_repo.bulk_create_devices(
+            [
+                {
+                    "working_group_id": group_id,
+                    "device_uid": item.device_uid,
+                    "alias": item.alias,
+                    "description": item.description,
+                    "is_active": item.is_active,
+                    "payload_format": item.payload_format,
+                    "last_seen": now,
+                }
+                for _, item in accepted
+            ]
+        )
+        assignments = [
+            {
+                "user_id": user_id,
+                "device_id": created_devices[item.device_uid].id,
+                "is_active": True,
+            }
+            for _, item in accepted
+            for user_id in dict.fromkeys(item.user_ids)
+        ]
+        self.device_repo.bulk_create_device_user_associations(assignments)
+        assigned_users = list({row["user_id"] for row in assignments})
+        self.user_repo.add_group_members(group_id, assigned_users)
+        # Serializar antes del commit, que expira los objetos (evita un SELECT por fila)
+        for index, item in accepted:
+            device = created_devices[item.device_uid]
+            results[index] = DeviceBatchResultOut(
+                index=index,
+                device_uid=device.device_uid,
+                status="created",
+                device=DeviceOut.model_validate(device),
+                assigned_user_ids=list(dict.fromkeys(item.user_ids)),
+            )
+        if created_devices:
+            self.version_repo.bump(group_id, DEVICES)
+        self.db.commit()
+
+        if assigned_users:
+            group_roster.invalidate(group_id)
+            self.access.clear()
+        return DeviceBatchOut(
+            created=len(created_devices),
+            failed=len(items) - len(created_devices),
+            results=results,
+        )
+
     def get_device_by_id(
         self, device_id: int, current_user: DBUser
     ) -> Optional[DeviceOut]:
@@ -83,16 +250,7 @@ class DeviceService:
             return None
 
         # Solo usuarios del mismo grupo pueden ver el dispositivo
-        user_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else (
-                current_user.user_devices[0].device.working_group_id
-                if current_user.user_devices
-                else None
-            )
-        )
-        if user_group_id != device.working_group_id:
+        if not self.access.can_access_group(current_user, device.working_group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para ver este dispositivo.",
@@ -100,23 +258,26 @@ class DeviceService:
 
         return DeviceOut.model_validate(device)
 
-    def get_devices_for_group(
-        self, group_id: int, current_user: DBUser
-    ) -> List[DeviceOut]:
+    def _ensure_group_devices_access(self, group_id: int, current_user: DBUser):
         # Verificar que el usuario pertenezca o sea admin del grupo
-        is_admin_of_group = current_user.role == DBUser.role.ADMIN and any(
-            g.id == group_id for g in current_user.created_working_groups
-        )
-        is_member_of_group = any(
-            du.device.working_group_id == group_id for du in current_user.user_devices
-        )
-
-        if not (is_admin_of_group or is_member_of_group):
+        if not self.access.can_access_group(current_user, group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para ver los dispositivos de este grupo.",
             )
 
+    def get_group_devices_etag(self, group_id: int, current_user: DBUser) -> str:
+        # ETag del listado de dispositivos del grupo, sin leer los dispositivos
+        self._ensure_group_devices_access(group_id, current_user)
+        return list_etag(
+            DEVICES, group_id, self.version_repo.get_version(group_id, DEVICES)
+        )
+
+    def get_devices_for_group(
+        self, group_id: int, current_user: DBUser
+    ) -> List[DeviceOut]:
+        self._ensure_group_devices_access(group_id, current_user)
+
         devices = self.device_repo.get_devices_by_group(group_id)
         return [DeviceOut.model_validate(device) for device in devices]
 
@@ -131,14 +292,8 @@ class DeviceService:
             )
 
         # Solo el admin del grupo al que pertenece el dispositivo puede actualizarlo
-        admin_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else None
-        )
-        if (
-            current_user.role != DBUser.role.ADMIN
-            or device_to_update.working_group_id != admin_group_id
+        if not self.access.is_group_admin(
+            current_user, device_to_update.working_group_id
         ):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -149,7 +304,9 @@ class DeviceService:
         for key, value in update_data.items():
             setattr(device_to_update, key, value)
 
+        self.version_repo.bump(device_to_update.working_group_id, DEVICES)
         updated_device = self.device_repo.update_device(device_to_update)
+        device_registry.invalidate(updated_device.device_uid)
         return DeviceOut.model_validate(updated_device)
 
     def deactivate_device(self, device_id: int, current_user: DBUser) -> DeviceOut:
@@ -160,24 +317,46 @@ class DeviceService:
                 detail="Dispositivo no encontrado.",
             )
 
-        admin_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else None
-        )
-        if (
-            current_user.role != DBUser.role.ADMIN
-            or device.working_group_id != admin_group_id
-        ):
+        if not self.access.is_group_admin(current_user, device.working_group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para desactivar este dispositivo.",
             )
 
         device.is_active = False
+        self.version_repo.bump(device.working_group_id, DEVICES)
         deactivated_device = self.device_repo.update_device(device)
+        device_registry.invalidate(deactivated_device.device_uid)
         return DeviceOut.model_validate(deactivated_device)
 
+    def get_device_credentials(
+        self, device_id: int, current_user: DBUser, rotate: bool = False
+    ) -> DeviceCredentialsOut:
+        device = self.device_repo.get_device_by_id(device_id)
+        if not device:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dispositivo no encontrado.",
+            )
+
+        # Solo el admin del grupo del dispositivo puede ver o rotar su credencial
+        if not self.access.is_group_admin(current_user, device.working_group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para gestionar las credenciales de este dispositivo.",
+            )
+
+        if rotate:
+            device.credential_version += 1
+            device = self.device_repo.update_device(device)
+            device_registry.invalidate(device.device_uid)
+
+        return DeviceCredentialsOut(
+            device_uid=device.device_uid,
+            device_key=create_device_key(device.device_uid, device.credential_version),
+            credential_version=device.credential_version,
+        )
+
     def assign_user_to_device(
         self, device_user_data: DeviceUserCreate, current_user: DBUser
     ) -> DeviceUserOut:
@@ -189,15 +368,7 @@ class DeviceService:
                 detail="Dispositivo no encontrado.",
             )
 
-        admin_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else None
-        )
-        if (
-            current_user.role != DBUser.role.ADMIN
-            or device.working_group_id != admin_group_id
-        ):
+        if not self.access.is_group_admin(current_user, device.working_group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para asignar usuarios a este dispositivo.",
@@ -211,13 +382,8 @@ class DeviceService:
                 detail="Usuario a asignar no encontrado.",
             )
 
-        # Si el target_user es un miembro, debe estar asociado al mismo grupo del dispositivo
-        # O ser el propio admin asignándose a un dispositivo de su grupo.
-        # Simplificación: Asumimos que los miembros se crean y luego se asocian.
-        # Aquí, si el target_user no es ADMIN, debe estar en el grupo del device.
-        # Esto es complejo porque la pertenencia de un miembro al grupo es a través de device_users.
-        # Para simplificar: solo permite que el admin asigne a CUALQUIER usuario,
-        # pero la implicación es que ese usuario "pertenece" al grupo al ser asociado a un dispositivo del grupo.
+        # Asignar un dispositivo del grupo hace al usuario miembro del grupo
+        # (se registra en group_members en la misma transacción).
 
         existing_association = self.device_repo.get_device_user_association(
             device_user_data.user_id, device_user_data.device_id
@@ -233,11 +399,114 @@ class DeviceService:
             device_id=device_user_data.device_id,
             is_active=device_user_data.is_active,
         )
+        self.user_repo.add_group_member(device.working_group_id, target_user.id)
         created_association = self.device_repo.create_device_user_association(
             new_association
         )
+        group_roster.invalidate(device.working_group_id)
+        self.access.clear()
         return DeviceUserOut.model_validate(created_association)
 
+    def replace_group_assignments(
+        self,
+        group_id: int,
+        assignments: List[DeviceAssignmentItem],
+        current_user: DBUser,
+        delete_schedules: bool = False,
+    ) -> DeviceAssignmentsOut:
+        # Deja a cada dispositivo listado exactamente con los usuarios indicados: compara
+        # con device_users en una consulta y aplica altas, bajas y reactivaciones en una
+        # sola transacción. Los dispositivos del grupo que no se listan no cambian.
+        # Los horarios individuales de las asignaciones eliminadas solo se borran con
+        # delete_schedules; si no, se rechaza la operación listándolos.
+        if not self.access.is_group_admin(current_user, group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para asignar usuarios en este grupo.",
+            )
+
+        desired = {}
+        for item in assignments:
+            if item.device_id in desired:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"El dispositivo {item.device_id} aparece más de una vez.",
+                )
+            desired[item.device_id] = set(item.user_ids)
+
+        device_ids = list(desired)
+        foreign = set(device_ids) - self.device_repo.get_group_device_ids(
+            group_id, device_ids
+        )
+        if foreign:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Dispositivos que no pertenecen al grupo: {sorted(foreign)}",
+            )
+        user_ids = list(set().union(*desired.values()))
+        missing = set(user_ids) - self.user_repo.get_existing_user_ids(user_ids)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuarios a asignar no encontrados: {sorted(missing)}",
+            )
+
+        current = {
+            (association.device_id, association.user_id): association
+            for association in self.device_repo.get_device_users_for_devices(device_ids)
+        }
+        wanted = {
+            (device_id, user_id)
+            for device_id, users in desired.items()
+            for user_id in users
+        }
+        removed = [current[pair] for pair in current.keys() - wanted]
+        kept = wanted & current.keys()
+        reactivated = [current[pair] for pair in kept if not current[pair].is_active]
+        removed_out = [DeviceUserOut.model_validate(a) for a in removed]
+
+        removed_ids = [association.id for association in removed]
+        if not delete_schedules:
+            affected = self.schedule_repo.get_individual_schedule_ids_for_device_users(
+                removed_ids
+            )
+            if affected:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Las asignaciones eliminadas tienen los horarios individuales "
+                    f"{affected}; envía delete_schedules=true para borrarlos.",
+                )
+        removed_schedules = (
+            self.schedule_repo.delete_individual_schedules_for_device_users(removed_ids)
+        )
+        self.device_repo.delete_device_users_by_ids(removed_ids)
+        self.device_repo.activate_device_users_by_ids([a.id for a in reactivated])
+        added = self.device_repo.bulk_create_device_user_associations(
+            [
+                {"device_id": device_id, "user_id": user_id, "is_active": True}
+                for device_id, user_id in sorted(wanted - current.keys())
+            ]
+        )
+        self.user_repo.add_group_members(group_id, user_ids)
+        self.user_repo.remove_unassigned_group_members(
+            group_id, sorted({association.user_id for association in removed})
+        )
+        result = DeviceAssignmentsOut(
+            added=[DeviceUserOut.model_validate(a) for a in added],
+            removed=removed_out,
+            reactivated=[
+                DeviceUserOut(id=a.id, user_id=a.user_id, device_id=a.device_id)
+                for a in reactivated
+            ],
+            unchanged=len(kept) - len(reactivated),
+            removed_schedules=removed_schedules,
+        )
+        self.db.commit()
+
+        group_roster.invalidate(group_id)
+        self.access.clear()
+        return result
+
     def get_users_assigned_to_device(
         self, device_id: int, current_user: DBUser
     ) -> List[UserOut]:
@@ -249,16 +518,7 @@ class DeviceService:
             )
 
         # Solo usuarios del mismo grupo pueden ver las asignaciones
-        user_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else (
-                current_user.user_devices[0].device.working_group_id
-                if current_user.user_devices
-                else None
-            )
-        )
-        if user_group_id != device.working_group_id:
+        if not self.access.can_access_group(current_user, device.working_group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para ver las asignaciones de este dispositivo.",
@@ -285,19 +545,17 @@ class DeviceService:
             )
 
         # Verificar permisos: solo el admin del grupo del dispositivo puede remover
-        device = self.device_repo.get_device_by_id(association.device_id)
-        admin_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else None
-        )
-        if (
-            current_user.role != DBUser.role.ADMIN
-            or device.working_group_id != admin_group_id
-        ):
+        if not self.access.can_manage_device_user(current_user, device_user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para remover esta asignación.",
             )
 
-        self.device_repo.delete_device_user_association(association)
+        group_id = self.device_repo.get_device_by_id(association.device_id).working_group_id
+        self.device_repo.delete_device_users_by_ids([association.id])
+        # Sin otra asignación en el grupo, el usuario deja de ser miembro (y pierde el acceso)
+        self.user_repo.remove_unassigned_group_members(group_id, [association.user_id])
+        self.db.commit()
+
+        group_roster.invalidate(group_id)
+        self.access.clear()
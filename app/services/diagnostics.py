@@ -0,0 +1,81 @@
+import asyncio
+import collections
+import sys
+import threading
+import time
+from typing import Dict, List
+from app.core.metrics import in_flight_requests
+from app.services.websocket_manager import manager
+
+# Perfilado por muestreo del propio worker: cada `interval` segundos se leen las pilas
+# de todos los hilos con sys._current_frames() (incluido el del event loop) y se cuentan
+# en formato "collapsed" (hilo;marco1;marco2 N), listo para flamegraph.pl o speedscope.
+# El muestreo corre en un hilo aparte, así el event loop sigue atendiendo mientras tanto.
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename.rsplit("/", 1)[-1]
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def sample_stacks(duration: float, interval: float) -> Dict[str, int]:
+    sampler_ident = threading.get_ident()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Dict[str, int] = collections.Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == sampler_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            thread_name = thread_names.get(ident, str(ident))
+            stacks[";".join([thread_name] + labels[::-1])] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    return "".join(
+        f"{stack} {count}\n"
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+    )
+
+
+def dump_tasks(stack_limit: int = 8) -> dict:
+    # Tareas asyncio pendientes (con dónde está esperando cada una), requests en
+    # curso y conexiones WebSocket abiertas por grupo
+    now = time.perf_counter()
+    tasks: List[dict] = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append(
+            {
+                "name": task.get_name(),
+                "coroutine": getattr(coro, "__qualname__", repr(coro)),
+                "stack": [_frame_label(frame) for frame in task.get_stack(limit=stack_limit)],
+            }
+        )
+    requests = [
+        {
+            "method": method,
+            "path": path,
+            "elapsed_seconds": round(now - start, 4),
+            "sql_queries": sql_stats[0],
+            "sql_seconds": round(sql_stats[1], 4),
+        }
+        for method, path, start, sql_stats in list(in_flight_requests.values())
+    ]
+    return {
+        "tasks": tasks,
+        "in_flight_requests": sorted(
+            requests, key=lambda request: -request["elapsed_seconds"]
+        ),
+        "websocket_connections": {
+            group_id: len(connections)
+            for group_id, connections in manager.active_connections.items()
+        },
+    }
@@ -0,0 +1,40 @@
+import time
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.repositories.user_repository import UserRepository
+from app.schemas import UserOut
+
+
+class GroupRoster:
+    # Mapa en memoria working_group_id -> [UserOut, ...] con los miembros del grupo
+    # { working_group_id: (expira_en, miembros) }
+    # Se invalida al crear miembros, al asignar dispositivos y al quitar asignaciones
+    # (quien entró al grupo solo por una asignación deja de ser miembro) en este proceso;
+    # el TTL acota lo que tarda en verse un cambio hecho por otro worker.
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[float, List[UserOut]]] = {}
+
+    def get(self, db: Session, group_id: int) -> List[UserOut]:
+        cached = self._entries.get(group_id)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return list(cached[1])
+
+        members = [
+            UserOut.model_validate(user)
+            for user in UserRepository(db).get_users_by_group(group_id)
+        ]
+        self._entries[group_id] = (now + self.ttl_seconds, members)
+        return list(members)
+
+    def invalidate(self, *group_ids: int):
+        for group_id in group_ids:
+            self._entries.pop(group_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+group_roster = GroupRoster(settings.GROUP_ROSTER_TTL_SECONDS)
@@ -0,0 +1,233 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import paho.mqtt.client as mqtt
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import PayloadFormat
+from app.repositories.notification_repository import NotificationRepository
+from app.repositories.resource_version_repository import ResourceVersionRepository
+from app.schemas import NotificationOut
+from app.services.device_payload import try_encode_notification
+from app.services.notification_feed import notification_feed
+from app.services.resource_versions import NOTIFICATIONS
+
+logger = logging.getLogger(__name__)
+
+
+class MQTTBridge:
+    # Publica cada notificación en el tópico de cada dispositivo activo del grupo
+    # ({prefix}/{device_uid}/notifications) con QoS 1. Los PUBACK del broker se acumulan
+    # y se vuelcan en lote a device_users_notifications, marcando la notificación como SENT.
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        topic_prefix: str,
+        flush_interval: float,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_pending: int = 10000,
+        client_id: str = "tracking-yape-backend",
+    ):
+        self.host = host
+        self.port = port
+        self.topic_prefix = topic_prefix.rstrip("/")
+        self.flush_interval = flush_interval
+        self.username = username
+        self.password = password
+        self.max_pending = max_pending
+        self.client_id = f"{client_id}-{socket.gethostname()}-{os.getpid()}"
+        self.client: Optional[mqtt.Client] = None
+        self._lock = threading.Lock()
+        # { mid: (notification_id, device_id, [user_id, ...]) } a la espera del PUBACK
+        self._pending: Dict[int, Tuple[int, int, List[int]]] = {}
+        # { mid: acked_at } PUBACK que llegaron antes de registrar su mid en _pending
+        self._early_acks: Dict[int, datetime] = {}
+        self._acked: List[Tuple[int, int, List[int], datetime]] = []
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.client is not None
+
+    def device_topic(self, device_uid: str) -> str:
+        return f"{self.topic_prefix}/{device_uid}/notifications"
+
+    def start(self):
+        if self.client is not None:
+            return
+        client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id
+        )
+        if self.username:
+            client.username_pw_set(self.username, self.password)
+        client.on_publish = self._on_publish
+        # La cola de paho también se acota: sin conexión guarda los mensajes QoS 1
+        client.max_queued_messages_set(self.max_pending)
+        client.connect_async(self.host, self.port)
+        client.loop_start()
+        self.client = client
+
+        self._stop.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="mqtt-ack-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self):
+        if self.client is None:
+            return
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.client = None
+        self.flush()  # Persistir los acuses que llegaron durante el cierre
+
+    def publish_notification(
+        self, notification: NotificationOut, targets: List[tuple]
+    ) -> int:
+        # targets: filas (device_id, device_uid, payload_format, user_id)
+        # de DeviceRepository.get_delivery_targets
+        if self.client is None:
+            return 0
+
+        devices: Dict[int, Tuple[str, PayloadFormat, List[int]]] = {}
+        for device_id, device_uid, payload_format, user_id in targets:
+            _, _, user_ids = devices.setdefault(
+                device_id, (device_uid, payload_format, [])
+            )
+            if user_id is not None:
+                user_ids.append(user_id)
+
+        # Cada formato se serializa una sola vez por notificación
+        payloads: Dict[PayloadFormat, Optional[bytes]] = {}
+        published = skipped = 0
+        for device_id, (device_uid, payload_format, user_ids) in devices.items():
+            if payload_format not in payloads:
+                payloads[payload_format] = try_encode_notification(
+                    notification, payload_format
+                )
+            if payloads[payload_format] is None:
+                skipped += 1
+                continue
+            with self._lock:
+                if len(self._pending) >= self.max_pending:
+                    break
+            # publish() se llama sin self._lock: el hilo de red de paho ejecuta
+            # on_publish con su propio mutex tomado, y tomar ambos en orden inverso
+            # bloquearía los dos hilos
+            info = self.client.publish(
+                self.device_topic(device_uid), payloads[payload_format], qos=1
+            )
+            # Sin conexión paho encola el mensaje (MQTT_ERR_NO_CONN) y lo envía al
+            # reconectar; solo con la cola llena lo descarta
+            if info.rc == mqtt.MQTT_ERR_QUEUE_SIZE:
+                break
+            delivery = (notification.id, device_id, user_ids)
+            with self._lock:
+                # El PUBACK pudo llegar antes de registrar el mid
+                acked_at = self._early_acks.pop(info.mid, None)
+                if acked_at is not None:
+                    self._acked.append((*delivery, acked_at))
+                else:
+                    self._pending[info.mid] = delivery
+            published += 1
+        if published + skipped < len(devices):
+            logger.warning(
+                "Cola MQTT llena: notificación no publicada a todos los dispositivos",
+                extra={
+                    "notification_id": notification.id,
+                    "devices": len(devices),
+                    "published": published,
+                    "pending": len(self._pending),
+                },
+            )
+        logger.debug(
+            "Notificación publicada por MQTT",
+            extra={
+                "notification_id": notification.id,
+                "devices": published,
+                "sampled": True,
+            },
+        )
+        return published
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        with self._lock:
+            delivery = self._pending.pop(mid, None)
+            if delivery is not None:
+                self._acked.append((*delivery, datetime.utcnow()))
+            else:
+                self._early_acks[mid] = datetime.utcnow()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error al registrar acuses MQTT")
+
+    def flush(self) -> int:
+        with self._lock:
+            acked, self._acked = self._acked, []
+        if not acked:
+            return 0
+
+        deliveries = [
+            {
+                "notification_id": notification_id,
+                "device_id": device_id,
+                "user_id": user_id,
+                "is_active": True,
+                "sent_at": acked_at,
+            }
+            for notification_id, device_id, user_ids, acked_at in acked
+            for user_id in user_ids
+        ]
+        notification_ids = sorted({delivery[0] for delivery in acked})
+
+        db = SessionLocal()
+        try:
+            changed_groups = NotificationRepository(db).record_deliveries(
+                deliveries, notification_ids
+            )
+            # El estado SENT cambia el listado de esos grupos: nueva versión (ETag) en la
+            # misma transacción
+            version_repo = ResourceVersionRepository(db)
+            for group_id in sorted(changed_groups):
+                version_repo.bump(group_id, NOTIFICATIONS)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Reencolar para reintentar en el siguiente ciclo
+            with self._lock:
+                self._acked[:0] = acked
+            raise
+        finally:
+            db.close()
+        # Las copias serializadas de esos grupos tienen el estado anterior
+        notification_feed.invalidate(*changed_groups)
+        logger.debug(
+            "Acuses MQTT registrados",
+            extra={"acks": len(acked), "deliveries": len(deliveries), "sampled": True},
+        )
+        return len(acked)
+
+
+mqtt_bridge = MQTTBridge(
+    settings.MQTT_HOST,
+    settings.MQTT_PORT,
+    settings.MQTT_TOPIC_PREFIX,
+    settings.MQTT_ACK_FLUSH_INTERVAL_SECONDS,
+    username=settings.MQTT_USERNAME,
+    password=settings.MQTT_PASSWORD,
+    max_pending=settings.MQTT_MAX_PENDING,
+    client_id=settings.MQTT_CLIENT_ID,
+)
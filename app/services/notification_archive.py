@@ -0,0 +1,228 @@
+import gzip
+import heapq
+import itertools
+import json
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import DBNotificationArchive, NotificationStatus
+from app.repositories.archive_repository import NotificationArchiveRepository
+from app.repositories.notification_repository import NotificationRepository
+from app.repositories.resource_version_repository import ResourceVersionRepository
+from app.services.notification_feed import notification_feed
+from app.services.resource_versions import NOTIFICATIONS
+from app.services.partition_service import add_months
+
+# Cada archivo es NDJSON comprimido con gzip: una notificación por línea, como arreglo
+# JSON con las mismas columnas (y en el mismo orden) que NotificationRepository.iter_notifications:
+#   [id, notification_timestamp, created_at, device_id, name, amount_cents,
+#    security_code, status, raw_notification]
+# Las filas van en orden cronológico (notification_timestamp, id).
+ARCHIVE_SUFFIX = ".ndjson.gz"
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _encode_row(row: tuple) -> str:
+    (
+        notification_id,
+        notification_timestamp,
+        created_at,
+        device_id,
+        name,
+        amount_cents,
+        security_code,
+        notification_status,
+        raw_notification,
+    ) = row
+    return json.dumps(
+        [
+            notification_id,
+            notification_timestamp.isoformat(),
+            created_at.isoformat(),
+            device_id,
+            name,
+            amount_cents,
+            security_code,
+            notification_status.value,
+            raw_notification,
+        ],
+        ensure_ascii=False,
+    )
+
+
+def _decode_row(line: str) -> tuple:
+    values = json.loads(line)
+    values[1] = datetime.fromisoformat(values[1])
+    values[2] = datetime.fromisoformat(values[2])
+    values[7] = NotificationStatus(values[7])
+    return tuple(values)
+
+
+def _sort_key(row: tuple):
+    return row[1], row[0]
+
+
+class NotificationArchiveService:
+    # Mueve las notificaciones antiguas a archivos por grupo y mes en `archive_dir`
+    # (group_<id>/<AAAA-MM>.<marca>.ndjson.gz), deja un manifiesto en notification_archives
+    # y las lee de vuelta cuando el historial o la exportación lo piden.
+    # Los acumulados (notification_rollups) no se tocan: los resúmenes siguen completos.
+    def __init__(self, db: Session, archive_dir: Optional[str] = None):
+        self.notification_repo = NotificationRepository(db)
+        self.archive_repo = NotificationArchiveRepository(db)
+        self.version_repo = ResourceVersionRepository(db)
+        self.archive_dir = archive_dir or settings.ARCHIVE_DIR
+        self.db = db
+
+    def _full_path(self, relative_path: str) -> str:
+        return os.path.join(self.archive_dir, relative_path)
+
+    def read_archive(self, archive: DBNotificationArchive) -> Iterator[tuple]:
+        with gzip.open(self._full_path(archive.path), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield _decode_row(line)
+
+    def archive_older_than(
+        self, months: int, group_id: Optional[int] = None
+    ) -> List[DBNotificationArchive]:
+        # Archiva los meses completos anteriores a los últimos `months` meses
+        cutoff = add_months(month_start(datetime.utcnow()), -months)
+        archives = []
+        for oldest_group_id, oldest in self.notification_repo.get_oldest_timestamps_before(
+            cutoff
+        ):
+            if group_id is not None and oldest_group_id != group_id:
+                continue
+            month = month_start(oldest)
+            while month < cutoff:
+                archive = self.archive_month(oldest_group_id, month)
+                if archive is not None:
+                    archives.append(archive)
+                month = add_months(month, 1)
+        return archives
+
+    def archive_month(
+        self, group_id: int, month: datetime
+    ) -> Optional[DBNotificationArchive]:
+        month_end = add_months(month, 1)
+        archive = self.archive_repo.get_archive(group_id, month)
+
+        hot_rows = self.notification_repo.iter_notifications(group_id, month, month_end)
+        first = next(hot_rows, None)
+        if first is None:
+            return None
+        # Ids leídos de la tabla (y escritos en el archivo): solo esos se borran después
+        hot_ids: List[int] = []
+
+        def track_hot_rows():
+            for row in itertools.chain((first,), hot_rows):
+                hot_ids.append(row[0])
+                yield row
+
+        # Si el mes ya estaba archivado (llegaron filas atrasadas), se reescribe el
+        # archivo combinando lo anterior con lo nuevo, siempre en orden cronológico.
+        rows = heapq.merge(
+            self.read_archive(archive) if archive is not None else iter(()),
+            track_hot_rows(),
+            key=_sort_key,
+        )
+
+        # Siempre se escribe un archivo nuevo: el anterior sigue siendo el válido
+        # hasta que el manifiesto y el borrado se confirman en la DB.
+        relative_path = os.path.join(
+            f"group_{group_id}",
+            f"{month:%Y-%m}.{datetime.utcnow():%Y%m%dT%H%M%S%f}{ARCHIVE_SUFFIX}",
+        )
+        full_path = self._full_path(relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        row_count = sum_amount_cents = 0
+        min_id = max_id = None
+        try:
+            with gzip.open(full_path, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(_encode_row(row) + "\n")
+                    row_count += 1
+                    sum_amount_cents += row[5]
+                    min_id = row[0] if min_id is None else min(min_id, row[0])
+                    max_id = row[0] if max_id is None else max(max_id, row[0])
+
+            previous_path = archive.path if archive is not None else None
+            if archive is None:
+                archive = DBNotificationArchive(working_group_id=group_id, month_start=month)
+            archive.path = relative_path
+            archive.row_count = row_count
+            archive.sum_amount_cents = sum_amount_cents
+            archive.min_notification_id = min_id
+            archive.max_notification_id = max_id
+            archive.archived_at = datetime.utcnow()
+            self.archive_repo.save_archive(archive)
+            self.notification_repo.delete_notifications_by_ids(
+                group_id, month, month_end, hot_ids
+            )
+            self.version_repo.bump(group_id, NOTIFICATIONS)
+            self.db.commit()
+            # Las filas pasaron al archivo: el feed del grupo ya no las refleja
+            notification_feed.invalidate(group_id)
+        except Exception:
+            self.db.rollback()
+            if os.path.exists(full_path):
+                os.remove(full_path)
+            raise
+
+        if previous_path is not None:
+            os.remove(self._full_path(previous_path))
+        return archive
+
+    def iter_archived(
+        self,
+        group_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device_id: Optional[int] = None,
+    ) -> Iterator[tuple]:
+        # Filas archivadas del grupo en [start, end), en orden cronológico;
+        # solo se abren los archivos de los meses que se solapan con el rango.
+        for archive in self.archive_repo.get_archives(group_id, start, end):
+            for row in self.read_archive(archive):
+                if start is not None and row[1] < start:
+                    continue
+                if end is not None and row[1] >= end:
+                    break
+                if device_id is not None and row[3] != device_id:
+                    continue
+                yield row
+
+    def iter_with_archived(
+        self,
+        group_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device_id: Optional[int] = None,
+    ) -> Iterator[tuple]:
+        # Historial completo: archivo + tabla caliente, combinados en orden cronológico
+        return heapq.merge(
+            self.iter_archived(group_id, start, end, device_id),
+            self.notification_repo.iter_notifications(group_id, start, end, device_id),
+            key=_sort_key,
+        )
+
+    def get_archived_page(self, group_id: int, skip: int, limit: int) -> List[tuple]:
+        # Página del historial archivado, de la más reciente a la más antigua.
+        # Con el row_count del manifiesto se saltan meses enteros sin abrir su archivo.
+        page = []
+        for archive in self.archive_repo.get_archives(group_id, newest_first=True):
+            if len(page) >= limit:
+                break
+            if skip >= archive.row_count:
+                skip -= archive.row_count
+                continue
+            rows = sorted(self.read_archive(archive), key=_sort_key, reverse=True)
+            page.extend(rows[skip : skip + limit - len(page)])
+            skip = 0
+        return page
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+from app.core.money import format_cents
+from app.database import SessionLocal
+from app.repositories.notification_repository import NotificationRepository
+from app.services.notification_archive import NotificationArchiveService
+
+EXPORT_COLUMNS = [
+    "id",
+    "notification_timestamp",
+    "created_at",
+    "device_id",
+    "name",
+    "amount",
+    "amount_cents",
+    "security_code",
+    "status",
+    "raw_notification",
+]
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+# Tamaño aproximado de cada bloque enviado al cliente
+CHUNK_SIZE = 64 * 1024
+
+
+def _export_record(row: tuple) -> list:
+    (
+        notification_id,
+        notification_timestamp,
+        created_at,
+        device_id,
+        name,
+        amount_cents,
+        security_code,
+        notification_status,
+        raw_notification,
+    ) = row
+    return [
+        notification_id,
+        notification_timestamp.isoformat(),
+        created_at.isoformat(),
+        device_id,
+        name,
+        format_cents(amount_cents),
+        amount_cents,
+        security_code,
+        notification_status.value,
+        raw_notification,
+    ]
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()  # La cabecera sale de inmediato
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(_export_record(row))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(EXPORT_COLUMNS, _export_record(row))), ensure_ascii=False)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines, size = [], 0
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_group_export(
+    group_id: int,
+    export_format: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    device_id: Optional[int] = None,
+    include_archived: bool = False,
+) -> Iterator[str]:
+    # Usa su propia sesión: la de la request se cierra antes de terminar el streaming
+    db = SessionLocal()
+    try:
+        if include_archived:
+            rows = NotificationArchiveService(db).iter_with_archived(
+                group_id, start, end, device_id
+            )
+        else:
+            rows = NotificationRepository(db).iter_notifications(
+                group_id, start, end, device_id
+            )
+        encoder = iter_csv if export_format == "csv" else iter_ndjson
+        yield from encoder(rows)
+    finally:
+        db.close()
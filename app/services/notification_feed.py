@@ -0,0 +1,131 @@
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.repositories.notification_repository import NotificationRepository
+from app.schemas import NotificationOut
+
+# Entrada del feed: (notification_timestamp, id, JSON ya serializado)
+FeedEntry = Tuple[object, int, bytes]
+
+
+class _GroupFeed:
+    def __init__(
+        self, version: int, expires_at: float, entries: List[FeedEntry], complete: bool
+    ):
+        self.version = version  # Versión del listado (group_resource_versions) que refleja
+        self.expires_at = expires_at
+        self.entries = entries  # Más antigua primero (la página se lee desde el final)
+        self.complete = complete  # True si el grupo no tiene más filas que las del feed
+
+
+class NotificationFeedCache:
+    # Por grupo, las últimas `size` notificaciones de la tabla en el orden de
+    # GET /notifications/group/{id} (notification_timestamp desc), ya serializadas a
+    # JSON. La primera página se arma uniendo bytes, sin consulta ni validación pydantic.
+    # { working_group_id: _GroupFeed }
+    # Se actualiza al recibir notificaciones y al cambiar su estado en este proceso
+    # (write-through). Cada feed guarda la versión del listado que refleja: si la versión
+    # actual del grupo es otra (escribió otro worker), se relee. Así el contenido siempre
+    # corresponde al ETag que lo acompaña; el TTL solo acota cambios hechos fuera de la app.
+    def __init__(self, size: int, ttl_seconds: float):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._feeds: Dict[int, _GroupFeed] = {}
+
+    @staticmethod
+    def _entry(notification: NotificationOut) -> FeedEntry:
+        return (
+            notification.notification_timestamp,
+            notification.id,
+            notification.model_dump_json().encode(),
+        )
+
+    def _load(self, db: Session, group_id: int, version: int) -> _GroupFeed:
+        rows = NotificationRepository(db).get_notifications_by_group(
+            group_id, 0, self.size
+        )
+        entries = sorted(
+            self._entry(NotificationOut.model_validate(row)) for row in rows
+        )
+        feed = _GroupFeed(
+            version,
+            time.monotonic() + self.ttl_seconds,
+            entries,
+            len(entries) < self.size,
+        )
+        self._feeds[group_id] = feed
+        return feed
+
+    def get_page(
+        self, db: Session, group_id: int, version: int, skip: int, limit: int
+    ) -> Optional[bytes]:
+        # Página como arreglo JSON, o None si cae fuera de lo que guarda el feed.
+        # `version` es la versión actual del listado, leída antes de llamar.
+        if skip < 0 or limit < 0 or (skip + limit > self.size):
+            return None
+        feed = self._feeds.get(group_id)
+        if (
+            feed is None
+            or feed.version != version
+            or feed.expires_at <= time.monotonic()
+        ):
+            feed = self._load(db, group_id, version)
+        if skip + limit > len(feed.entries) and not feed.complete:
+            return None
+
+        end = max(0, len(feed.entries) - skip)
+        start = max(0, end - limit)
+        return b"[" + b",".join(e[2] for e in reversed(feed.entries[start:end])) + b"]"
+
+    def _current_feed(self, group_id: int, version: int) -> Optional[_GroupFeed]:
+        # Feed al que se puede aplicar la escritura que dejó el listado en `version`: solo
+        # si refleja justo la anterior. Si no (hubo escrituras de otros workers en medio),
+        # se descarta y la próxima lectura lo relee.
+        feed = self._feeds.get(group_id)
+        if feed is None:
+            return None
+        if feed.version != version - 1:
+            self.invalidate(group_id)
+            return None
+        feed.version = version
+        return feed
+
+    def add(self, notification: NotificationOut, version: int):
+        # Nueva notificación: se inserta en su lugar y se descarta la más antigua
+        feed = self._current_feed(notification.working_group_id, version)
+        if feed is None:
+            return
+        entry = self._entry(notification)
+        index = bisect_left(feed.entries, entry[:2], key=lambda e: e[:2])
+        if index < len(feed.entries) and feed.entries[index][:2] == entry[:2]:
+            # Ya estaba: el feed se leyó después del commit de esta misma notificación
+            feed.entries[index] = entry
+            return
+        insort(feed.entries, entry, key=lambda e: e[:2])
+        if len(feed.entries) > self.size:
+            del feed.entries[0]
+            feed.complete = False
+
+    def update(self, notification: NotificationOut, version: int):
+        # Reemplaza la copia serializada (p. ej. tras un cambio de estado), si está
+        feed = self._current_feed(notification.working_group_id, version)
+        if feed is None:
+            return
+        for i, entry in enumerate(feed.entries):
+            if entry[1] == notification.id:
+                feed.entries[i] = self._entry(notification)
+                return
+
+    def invalidate(self, *group_ids: int):
+        for group_id in group_ids:
+            self._feeds.pop(group_id, None)
+
+    def clear(self):
+        self._feeds.clear()
+
+
+notification_feed = NotificationFeedCache(
+    settings.NOTIFICATION_FEED_SIZE, settings.NOTIFICATION_FEED_TTL_SECONDS
+)
@@ -1,20 +1,46 @@
+import logging
 from sqlalchemy.orm import Session
 from app.models import (
     DBNotification,
     NotificationStatus,
+    RollupGranularity,
     DBUser,
     DBDevice,
     DBDeviceUser,
     DBDeviceUserNotification,
 )
-from app.schemas import NotificationCreate, NotificationOut, NotificationUpdateStatus
+from app.schemas import (
+    NotificationCreate,
+    NotificationOut,
+    NotificationUpdateStatus,
+    NotificationRollupOut,
+    NotificationSummaryOut,
+    NotificationSearchOut,
+    NotificationVerifyOut,
+)
 from app.repositories.notification_repository import NotificationRepository
 from app.repositories.working_group_repository import WorkingGroupRepository
 from app.repositories.device_repository import DeviceRepository
 from app.repositories.user_repository import UserRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.resource_version_repository import ResourceVersionRepository
+from app.services.mqtt_bridge import mqtt_bridge
+from app.services.notification_export import stream_group_export
+from app.services.notification_archive import NotificationArchiveService
+from app.services.recent_codes import recent_codes
+from app.services.notification_feed import notification_feed
+from app.services.resource_versions import NOTIFICATIONS, list_etag
+from app.services.authorization import AccessControl
+from app.core.config import settings
+from app.core.money import to_cents, from_cents
+from app.core.timezones import DEFAULT_TIME_ZONE, zone_table
 from fastapi import HTTPException, status
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Iterator
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+
+logger = logging.getLogger(__name__)
 
 
 class NotificationService:
@@ -23,32 +49,84 @@ class NotificationService:
         self.group_repo = WorkingGroupRepository(db)
         self.device_repo = DeviceRepository(db)
         self.user_repo = UserRepository(db)
+        self.rollup_repo = RollupRepository(db)
+        self.version_repo = ResourceVersionRepository(db)
+        self.access = AccessControl.for_session(db)
         self.db = db
 
+    def _ensure_group_access(self, group_id: int, current_user_id: int, detail: str):
+        # Verificar que el usuario pertenezca o sea admin del grupo
+        current_user = self.user_repo.get_user_by_id(current_user_id)
+        if not self.access.can_access_group(current_user, group_id):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+    def _get_user_group_id(self, current_user_id: int) -> Optional[int]:
+        # Grupo del usuario: el que creó (admin) o el de su primer dispositivo
+        return self.access.get_primary_group_id(current_user_id)
+
     def create_notification(
-        self, notification_data: NotificationCreate, working_group_id: int
+        self,
+        notification_data: NotificationCreate,
+        working_group_id: int,
+        device_id: Optional[int] = None,
+        time_zone: Optional[str] = None,
     ) -> NotificationOut:
-        # Validar que el grupo exista
-        group = self.group_repo.get_working_group_by_id(working_group_id)
-        if not group:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Grupo de trabajo no encontrado.",
+        # Validar que el grupo exista. Si la notificación viene de un dispositivo,
+        # el grupo (y su zona) ya se resolvió a partir del propio dispositivo.
+        if time_zone is None:
+            group = self.group_repo.get_working_group_by_id(working_group_id)
+            if not group:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Grupo de trabajo no encontrado.",
+                )
+            time_zone = group.time_zone
+
+        now = datetime.utcnow()
+        notification_timestamp = notification_data.notification_timestamp
+        if not (
+            now - timedelta(hours=settings.NOTIFICATION_MAX_DELAY_HOURS)
+            <= notification_timestamp
+            <= now + timedelta(minutes=settings.NOTIFICATION_MAX_AHEAD_MINUTES)
+        ):
+            # Reloj del cliente desfasado: la fila iría a un mes equivocado (o a
+            # notifications_default)
+            logger.warning(
+                "notification_timestamp fuera de ventana, se usa la hora de recepción",
+                extra={
+                    "working_group_id": working_group_id,
+                    "device_id": device_id,
+                    "client_timestamp": notification_timestamp.isoformat(),
+                },
             )
+            notification_timestamp = now
 
         new_notification = DBNotification(
             working_group_id=working_group_id,
+            device_id=device_id,
             raw_notification=notification_data.raw_notification,
             name=notification_data.name,
-            amount=notification_data.amount,
+            amount_cents=to_cents(notification_data.amount),
             security_code=notification_data.security_code,
-            notification_timestamp=notification_data.notification_timestamp,
+            notification_timestamp=notification_timestamp,
             status=NotificationStatus.RECEIVED,  # Estado inicial al recibir
         )
+        # Los acumulados se actualizan en la misma transacción que la inserción
+        self.rollup_repo.increment(new_notification, time_zone or DEFAULT_TIME_ZONE)
+        version = self.version_repo.bump(working_group_id, NOTIFICATIONS)
         created_notification = self.notification_repo.create_notification(
             new_notification
         )
-        return NotificationOut.model_validate(created_notification)
+        notification_out = NotificationOut.model_validate(created_notification)
+        recent_codes.add(notification_out)
+        notification_feed.add(notification_out, version)
+
+        # Empujar la notificación a los dispositivos del grupo por MQTT (si está activo)
+        if mqtt_bridge.is_running:
+            targets = self.device_repo.get_delivery_targets(working_group_id)
+            mqtt_bridge.publish_notification(notification_out, targets)
+
+        return notification_out
 
     def get_notification_by_id(
         self, notification_id: int, current_user_group_id: int
@@ -67,25 +145,265 @@ class NotificationService:
         return NotificationOut.model_validate(notification)
 
     def get_notifications_for_group(
-        self, group_id: int, current_user_id: int, skip: int = 0, limit: int = 100
+        self,
+        group_id: int,
+        current_user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        include_archived: bool = False,
     ) -> List[NotificationOut]:
-        # Verificar que el usuario pertenezca o sea admin del grupo
-        current_user = self.user_repo.get_user_by_id(current_user_id)
-        is_admin_of_group = current_user.role == DBUser.role.ADMIN and any(
-            g.id == group_id for g in current_user.created_working_groups
+        self._ensure_group_access(
+            group_id,
+            current_user_id,
+            "No tienes permiso para ver las notificaciones de este grupo.",
         )
-        is_member_of_group = any(
-            du.device.working_group_id == group_id for du in current_user.user_devices
-        )  # Verifica pertenencia via device_users
 
-        if not (is_admin_of_group or is_member_of_group):
+        notifications = [
+            NotificationOut.model_validate(notification)
+            for notification in self.notification_repo.get_notifications_by_group(
+                group_id, skip, limit
+            )
+        ]
+        # Si la tabla no alcanza para completar la página, se continúa con los meses
+        # archivados (siempre más antiguos que lo que queda en la tabla)
+        if include_archived and len(notifications) < limit:
+            archive_skip = max(
+                0, skip - self.notification_repo.count_notifications_by_group(group_id)
+            )
+            archived = NotificationArchiveService(self.db).get_archived_page(
+                group_id, archive_skip, limit - len(notifications)
+            )
+            notifications.extend(
+                self._archived_notification_out(group_id, row) for row in archived
+            )
+        return notifications
+
+    def get_group_version(self, group_id: int, current_user_id: int) -> int:
+        # Versión del listado de notificaciones del grupo (cambia con cada escritura)
+        self._ensure_group_access(
+            group_id,
+            current_user_id,
+            "No tienes permiso para ver las notificaciones de este grupo.",
+        )
+        return self.version_repo.get_version(group_id, NOTIFICATIONS)
+
+    @staticmethod
+    def group_page_etag(
+        group_id: int, version: int, skip: int, limit: int, include_archived: bool
+    ) -> str:
+        return list_etag(
+            NOTIFICATIONS, group_id, version, skip, limit, int(include_archived)
+        )
+
+    def get_cached_group_page(
+        self, group_id: int, version: int, skip: int = 0, limit: int = 100
+    ) -> Optional[bytes]:
+        # Página ya serializada desde el feed en memoria (solo la tabla, sin archivados);
+        # None si la página cae fuera del feed y hay que consultar la DB. El acceso ya
+        # se verificó al obtener la versión.
+        return notification_feed.get_page(self.db, group_id, version, skip, limit)
+
+    def _archived_notification_out(self, group_id: int, row: tuple) -> NotificationOut:
+        (
+            notification_id,
+            notification_timestamp,
+            created_at,
+            device_id,
+            name,
+            amount_cents,
+            security_code,
+            notification_status,
+            raw_notification,
+        ) = row
+        return NotificationOut(
+            id=notification_id,
+            working_group_id=group_id,
+            raw_notification=raw_notification,
+            name=name,
+            amount=from_cents(amount_cents),
+            amount_cents=amount_cents,
+            security_code=security_code,
+            notification_timestamp=notification_timestamp,
+            status=notification_status,
+            created_at=created_at,
+        )
+
+    def search_notifications(
+        self,
+        group_id: int,
+        current_user_id: int,
+        text_query: str,
+        amount: Optional[Decimal] = None,
+        min_amount: Optional[Decimal] = None,
+        max_amount: Optional[Decimal] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+    ) -> List[NotificationSearchOut]:
+        self._ensure_group_access(
+            group_id,
+            current_user_id,
+            "No tienes permiso para buscar notificaciones de este grupo.",
+        )
+
+        # Un monto exacto equivale a un rango [amount, amount]
+        if amount is not None:
+            min_amount = max_amount = amount
+        # Sin `start`, los últimos SEARCH_DEFAULT_DAYS días (antes de `end`, si se da):
+        # acota las particiones y las filas que se rankean
+        if start is None:
+            start = (end or datetime.utcnow()) - timedelta(
+                days=settings.SEARCH_DEFAULT_DAYS
+            )
+        results = self.notification_repo.search_notifications(
+            group_id,
+            text_query,
+            to_cents(min_amount) if min_amount is not None else None,
+            to_cents(max_amount) if max_amount is not None else None,
+            start,
+            end,
+            limit,
+        )
+        return [
+            NotificationSearchOut(
+                **NotificationOut.model_validate(notification).model_dump(),
+                rank=rank,
+            )
+            for notification, rank in results
+        ]
+
+    def verify_payment(
+        self,
+        current_user_id: int,
+        security_code: str,
+        amount: Optional[Decimal] = None,
+        since: Optional[datetime] = None,
+        limit: int = 5,
+    ) -> NotificationVerifyOut:
+        group_id = self._get_user_group_id(current_user_id)
+        if group_id is None:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No tienes permiso para ver las notificaciones de este grupo.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El usuario autenticado no está asociado a un grupo de trabajo.",
+            )
+        amount_cents = to_cents(amount) if amount is not None else None
+        # Los códigos de seguridad son cortos y se repiten: solo cuentan los pagos desde
+        # `since` (por defecto, las últimas VERIFY_RECENT_HOURS horas)
+        if since is None:
+            since = datetime.utcnow() - timedelta(hours=settings.VERIFY_RECENT_HOURS)
+        elif since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+        # Primero los códigos recientes en memoria; si no está, el índice
+        # (working_group_id, security_code, notification_timestamp). Ambos caminos
+        # aplican el mismo filtro, orden y límite.
+        matches = [
+            notification
+            for notification in recent_codes.lookup(group_id, security_code)
+            if notification.notification_timestamp >= since
+            and (amount_cents is None or notification.amount_cents == amount_cents)
+        ]
+        if matches:
+            matches.sort(key=lambda n: (n.notification_timestamp, n.id), reverse=True)
+            matches = matches[:limit]
+        else:
+            matches = [
+                NotificationOut.model_validate(notification)
+                for notification in self.notification_repo.find_by_security_code(
+                    group_id, security_code, amount_cents, limit, since
+                )
+            ]
+        return NotificationVerifyOut(verified=bool(matches), matches=matches)
+
+    def get_group_summary(
+        self,
+        group_id: int,
+        current_user_id: int,
+        granularity: RollupGranularity = RollupGranularity.HOUR,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        by_device: bool = False,
+        day: Optional[date] = None,
+    ) -> NotificationSummaryOut:
+        self._ensure_group_access(
+            group_id,
+            current_user_id,
+            "No tienes permiso para ver el resumen de este grupo.",
+        )
+        time_zone = (
+            self.group_repo.get_working_group_by_id(group_id).time_zone
+            or DEFAULT_TIME_ZONE
+        )
+        table = zone_table(time_zone)
+
+        # Todo en UTC naive, como las columnas. Por defecto: el día local `day` del
+        # grupo (hoy si no se indica), de su medianoche a la siguiente.
+        start, end = (
+            value.astimezone(timezone.utc).replace(tzinfo=None)
+            if value is not None and value.tzinfo is not None
+            else value
+            for value in (start, end)
+        )
+        if start is None:
+            local_day = day or table.to_local(datetime.utcnow()).date()
+            start = table.to_utc(datetime.combine(local_day, time.min))
+            if end is None:
+                end = table.to_utc(datetime.combine(local_day + timedelta(days=1), time.min))
+        if end is None:
+            end = start + timedelta(days=1)
+
+        # Los acumulados DAY ya son días locales del grupo (bucket_start = medianoche
+        # local en UTC)
+        rows = self.rollup_repo.get_buckets(group_id, granularity, start, end, by_device)
+        buckets = [
+            NotificationRollupOut(
+                bucket_start=bucket_start,
+                device_id=device_id,
+                count=count,
+                sum_amount_cents=sum_amount_cents,
+                amount=from_cents(sum_amount_cents),
             )
+            for bucket_start, device_id, count, sum_amount_cents in rows
+        ]
+        total_cents = sum(bucket.sum_amount_cents for bucket in buckets)
+        return NotificationSummaryOut(
+            working_group_id=group_id,
+            granularity=granularity,
+            start=start,
+            end=end,
+            count=sum(bucket.count for bucket in buckets),
+            sum_amount_cents=total_cents,
+            amount=from_cents(total_cents),
+            buckets=buckets,
+            time_zone=time_zone,
+        )
 
-        notifications = self.notification_repo.get_notifications_by_group(
-            group_id, skip, limit
+    def export_notifications(
+        self,
+        group_id: int,
+        current_user_id: int,
+        export_format: str = "csv",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device_id: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Iterator[str]:
+        # El permiso se valida antes de empezar a enviar datos
+        self._ensure_group_access(
+            group_id,
+            current_user_id,
+            "No tienes permiso para exportar las notificaciones de este grupo.",
+        )
+        return stream_group_export(
+            group_id, export_format, start, end, device_id, include_archived
+        )
+
+    def get_notifications_for_device(
+        self, working_group_id: int, after_id: int = 0, limit: int = 20
+    ) -> List[NotificationOut]:
+        # El grupo ya viene resuelto desde la credencial del dispositivo
+        notifications = self.notification_repo.get_notifications_after(
+            working_group_id, after_id, limit
         )
         return [
             NotificationOut.model_validate(notification)
@@ -108,16 +426,7 @@ class NotificationService:
             )
 
         # Solo usuarios del grupo de la notificación pueden cambiar su estado
-        current_user = self.user_repo.get_user_by_id(current_user_id)
-        user_group_id = (
-            current_user.created_working_groups[0].id
-            if current_user.created_working_groups
-            else (
-                current_user.user_devices[0].device.working_group_id
-                if current_user.user_devices
-                else None
-            )
-        )
+        user_group_id = self._get_user_group_id(current_user_id)
 
         if notification_to_update.working_group_id != user_group_id:
             raise HTTPException(
@@ -126,10 +435,16 @@ class NotificationService:
             )
 
         notification_to_update.status = status_data.status
+        version = self.version_repo.bump(
+            notification_to_update.working_group_id, NOTIFICATIONS
+        )
         updated_notification = self.notification_repo.update_notification(
             notification_to_update
         )
-        return NotificationOut.model_validate(updated_notification)
+        notification_out = NotificationOut.model_validate(updated_notification)
+        recent_codes.update(notification_out)
+        notification_feed.update(notification_out, version)
+        return notification_out
 
     def register_sent_notification(
         self, notification_id: int, device_id: int, user_id: int
@@ -0,0 +1,123 @@
+import re
+from datetime import date
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models import DBNotification
+
+PARENT_TABLE = "notifications"
+DEFAULT_PARTITION = "notifications_default"
+# Columnas mapeadas (sin la generada search_vector) para mover filas entre particiones
+COLUMNS = ", ".join(column.name for column in DBNotification.__table__.columns)
+PARTITION_NAME = re.compile(r"^notifications_p(\d{4})(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    # Primer día del mes desplazado `months` meses (acepta date o datetime)
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+class NotificationPartitionService:
+    # Mantenimiento de las particiones mensuales de notifications (solo PostgreSQL):
+    # crea las particiones de los próximos meses y separa (o elimina) las antiguas.
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_partitions(self) -> List[Tuple[str, date]]:
+        # Particiones mensuales adjuntas a notifications, ordenadas por mes
+        rows = self.db.execute(
+            text(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :parent
+                """
+            ),
+            {"parent": PARENT_TABLE},
+        ).scalars()
+        partitions = []
+        for name in rows:
+            match = PARTITION_NAME.match(name)
+            if match:  # Ignora notifications_default
+                partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    def ensure_partitions(self, months_ahead: int = 3, start: date = None) -> List[str]:
+        # Crea las particiones faltantes desde `start` (por defecto el mes actual)
+        # hasta `months_ahead` meses después. Las filas de esos meses que ya cayeron en
+        # notifications_default se mueven a la partición nueva (si se quedaran ahí,
+        # crear la partición fallaría).
+        existing = {name for name, _ in self.list_partitions()}
+        month = (start or date.today()).replace(day=1)
+        last_month = add_months(date.today().replace(day=1), months_ahead)
+        created = []
+        while month <= last_month:
+            name = partition_name(month)
+            if name not in existing:
+                self._create_partition(name, month, add_months(month, 1))
+                created.append(name)
+            month = add_months(month, 1)
+        self.db.commit()
+        return created
+
+    def _create_partition(self, name: str, start: date, end: date):
+        bounds = {"start": start, "end": end}
+        in_range = "notification_timestamp >= :start AND notification_timestamp < :end"
+        stray = self.db.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"),
+            bounds,
+        ).scalar()
+        if stray:
+            # Bloquea inserciones hasta el commit para que no lleguen más filas del mes
+            # a notifications_default mientras se mueven
+            self.db.execute(text(f"LOCK TABLE {PARENT_TABLE} IN SHARE ROW EXCLUSIVE MODE"))
+            self.db.execute(
+                text(
+                    f"CREATE TEMP TABLE {name}_stray AS "
+                    f"SELECT {COLUMNS} FROM {DEFAULT_PARTITION} WITH NO DATA"
+                )
+            )
+            self.db.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} "
+                    f"RETURNING {COLUMNS}) INSERT INTO {name}_stray SELECT * FROM moved"
+                ),
+                bounds,
+            )
+        self.db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        if stray:
+            self.db.execute(
+                text(
+                    f"INSERT INTO {PARENT_TABLE} ({COLUMNS}) "
+                    f"SELECT {COLUMNS} FROM {name}_stray"
+                )
+            )
+            self.db.execute(text(f"DROP TABLE {name}_stray"))
+
+    def detach_partitions(self, retain_months: int, drop: bool = False) -> List[str]:
+        # Separa las particiones anteriores a los últimos `retain_months` meses.
+        # Sin `drop` quedan como tablas independientes (para archivarlas o consultarlas);
+        # con `drop` se eliminan.
+        cutoff = add_months(date.today().replace(day=1), -retain_months)
+        detached = []
+        for name, month in self.list_partitions():
+            if month >= cutoff:
+                break
+            self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            if drop:
+                self.db.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+        self.db.commit()
+        return detached
@@ -0,0 +1,54 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+from app.core.config import settings
+from app.schemas import NotificationOut
+
+
+class RecentCodeIndex:
+    # Mapa en memoria (working_group_id, security_code) -> [NotificationOut, ...] con las
+    # notificaciones recibidas por este proceso en las últimas `window_hours` horas.
+    # Se llena al crear cada notificación (write-through). Solo sirve para aciertos:
+    # si el código no está (otro worker lo recibió, o es más antiguo) se consulta la DB.
+    def __init__(self, window_hours: int):
+        self.window_seconds = window_hours * 3600
+        self._entries: Dict[Tuple[int, str], List[NotificationOut]] = {}
+        # Orden de llegada para expirar: (registrado_en, clave)
+        self._expiry: Deque[Tuple[float, Tuple[int, str]]] = deque()
+
+    def _prune(self, now: float):
+        while self._expiry and self._expiry[0][0] + self.window_seconds <= now:
+            _, key = self._expiry.popleft()
+            notifications = self._entries.get(key)
+            if notifications:
+                notifications.pop(0)  # La más antigua de esa clave
+                if not notifications:
+                    del self._entries[key]
+
+    def add(self, notification: NotificationOut):
+        now = time.monotonic()
+        self._prune(now)
+        key = (notification.working_group_id, notification.security_code)
+        self._entries.setdefault(key, []).append(notification)
+        self._expiry.append((now, key))
+
+    def lookup(self, working_group_id: int, security_code: str) -> List[NotificationOut]:
+        self._prune(time.monotonic())
+        return list(self._entries.get((working_group_id, security_code), ()))
+
+    def update(self, notification: NotificationOut):
+        # Reemplaza la copia en memoria (p. ej. tras un cambio de estado), si está
+        notifications = self._entries.get(
+            (notification.working_group_id, notification.security_code), ()
+        )
+        for i, cached in enumerate(notifications):
+            if cached.id == notification.id:
+                notifications[i] = notification
+                return
+
+    def clear(self):
+        self._entries.clear()
+        self._expiry.clear()
+
+
+recent_codes = RecentCodeIndex(settings.VERIFY_RECENT_HOURS)
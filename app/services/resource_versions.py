@@ -0,0 +1,29 @@
+from typing import Optional
+
+# Listados por grupo versionados en group_resource_versions. Cada escritura que cambia
+# uno de estos listados incrementa la versión del grupo en su misma transacción, así que
+# (recurso, grupo, versión, parámetros de la página) identifica la respuesta exacta y
+# sirve de ETag: con un If-None-Match que coincide se responde 304 sin consultar filas.
+NOTIFICATIONS = "notifications"
+DEVICES = "devices"
+SCHEDULES = "schedules"
+
+
+def list_etag(resource: str, group_id: int, version: int, *params) -> str:
+    # ETag débil: el mismo contenido puede salir serializado por caminos distintos
+    # (p. ej. el feed de notificaciones o la consulta), no byte a byte idéntico
+    tag = "-".join(str(part) for part in (resource, group_id, version, *params))
+    return f'W/"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Comparación débil (RFC 9110 §13.1.2): se ignora el prefijo W/ de ambos lados
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
@@ -0,0 +1,88 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+# Detección de horarios superpuestos con un barrido ordenado (sweep line): por cada
+# objetivo (grupo, asignación, dispositivo o usuario) los intervalos se ordenan por
+# inicio y se mantiene un heap con los activos ordenados por fin. Cada intervalo solo
+# se compara con los que siguen abiertos, O(n log n + choques) en vez de O(n²).
+
+
+class Conflict(NamedTuple):
+    key: Hashable  # Objetivo en común, p. ej. ("device", 7)
+    first: Hashable  # Referencia del horario que empezó antes
+    second: Hashable
+    start: datetime  # Tramo superpuesto
+    end: datetime
+
+
+def individual_targets(schedule, assignment=None) -> List[Tuple[str, int]]:
+    # Objetivos que ocupa un horario individual: su dispositivo y su usuario, indicados
+    # directamente o a través de la asignación (`assignment`, el DBDeviceUser de
+    # device_user_id). Un horario de asignación choca con los del mismo dispositivo y
+    # con los personales del mismo usuario.
+    device_id = schedule.device_id or (assignment.device_id if assignment else None)
+    user_id = schedule.user_id or (assignment.user_id if assignment else None)
+    targets = []
+    if device_id:
+        targets.append(("device", device_id))
+    if user_id:
+        targets.append(("user", user_id))
+    return targets
+
+
+def sweep_conflicts(
+    intervals: Iterable[Tuple[Hashable, datetime, datetime, Hashable]],
+) -> List[Conflict]:
+    # intervals: (clave, inicio, fin, referencia) con intervalos [inicio, fin). Las
+    # ocurrencias de un mismo horario (misma referencia) no chocan entre sí.
+    by_key: Dict[Hashable, list] = defaultdict(list)
+    for key, start, end, ref in intervals:
+        by_key[key].append((start, end, ref))
+
+    conflicts = []
+    for key, items in by_key.items():
+        items.sort(key=lambda item: (item[0], item[1]))
+        active: list = []  # heap de (fin, orden, referencia)
+        for order, (start, end, ref) in enumerate(items):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for other_end, _, other_ref in active:
+                if other_ref != ref:
+                    conflicts.append(
+                        Conflict(key, other_ref, ref, start, min(end, other_end))
+                    )
+            heapq.heappush(active, (end, order, ref))
+    return conflicts
+
+
+def summarize_conflicts(conflicts: Iterable[Conflict]) -> List[Tuple[Conflict, int]]:
+    # Un par de horarios recurrentes choca en muchas ocurrencias: se deja el primer
+    # choque de cada par junto con la cantidad de ocurrencias superpuestas
+    first: Dict[tuple, Conflict] = {}
+    counts: Dict[tuple, int] = defaultdict(int)
+    for conflict in conflicts:
+        pair = (conflict.key, frozenset((conflict.first, conflict.second)))
+        if pair not in first or conflict.start < first[pair].start:
+            first[pair] = conflict
+        counts[pair] += 1
+    return sorted(
+        ((conflict, counts[pair]) for pair, conflict in first.items()),
+        key=lambda item: item[0].start,
+    )
+
+
+def conflict_window(
+    start: datetime, series_end: Optional[datetime], now: datetime, horizon_days: int
+) -> Tuple[datetime, datetime]:
+    # Rango en el que se revisa un horario al crearlo o editarlo: desde ahora (o desde su
+    # inicio si es futuro) hasta su última ocurrencia, acotado a horizon_days. Un
+    # horario que ya terminó se revisa completo.
+    window_start = max(start, now)
+    if series_end is not None and window_start >= series_end:
+        window_start = start
+    window_end = window_start + timedelta(days=horizon_days)
+    if series_end is not None:
+        window_end = min(window_end, series_end)
+    return window_start, window_end
@@ -0,0 +1,319 @@
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+# Reglas de recurrencia estilo RRULE (RFC 5545, subconjunto) guardadas en una sola fila:
+#   FREQ=DAILY|WEEKLY;INTERVAL=n;BYDAY=MO,TU,...;UNTIL=AAAAMMDD[THHMMSS];COUNT=n
+# start_time/end_time son la primera ocurrencia (hora del día y duración). Las
+# ocurrencias se calculan al consultarlas, nunca se materializan como filas.
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY")
+RULE_PARTS = ("FREQ", "INTERVAL", "BYDAY", "UNTIL", "COUNT")
+# Ventana máxima que se puede pedir de una vez al expandir ocurrencias
+MAX_WINDOW_DAYS = 93
+# Límites de una regla: COUNT máximo y fecha más lejana para UNTIL (y para el inicio de
+# un horario recurrente), lejos del desborde de datetime
+MAX_COUNT = 10000
+MAX_RULE_DATE = datetime(2100, 1, 1)
+
+Occurrence = Tuple[datetime, datetime]
+
+
+class RecurrenceRule(NamedTuple):
+    freq: str
+    interval: int
+    by_day: Tuple[int, ...]  # 0 = lunes; vacío = el día de la semana de start_time
+    until: Optional[datetime]
+    count: Optional[int]
+
+
+def _parse_until(value: str) -> datetime:
+    value = value.rstrip("Z")
+    try:
+        if len(value) == 8:
+            # Solo fecha: incluye todas las ocurrencias de ese día
+            return datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time.max)
+        return datetime.strptime(value, "%Y%m%dT%H%M%S")
+    except (ValueError, OverflowError):
+        raise ValueError("UNTIL debe tener formato AAAAMMDD o AAAAMMDDTHHMMSS.")
+
+
+def parse_rule(text: str) -> RecurrenceRule:
+    parts = {}
+    for part in text.strip().upper().split(";"):
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Parte inválida: {part!r}.")
+        if name not in RULE_PARTS:
+            raise ValueError(f"Parámetro no soportado: {name}.")
+        parts[name] = value
+
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError("FREQ debe ser DAILY o WEEKLY.")
+    try:
+        interval = int(parts.get("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL y COUNT deben ser enteros.")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL y COUNT deben ser mayores que cero.")
+    if interval > MAX_COUNT or (count is not None and count > MAX_COUNT):
+        raise ValueError(f"INTERVAL y COUNT no pueden superar {MAX_COUNT}.")
+    if count is not None and "UNTIL" in parts:
+        raise ValueError("No se puede usar UNTIL y COUNT a la vez.")
+
+    by_day: Tuple[int, ...] = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY solo se admite con FREQ=WEEKLY.")
+        days = parts["BYDAY"].split(",")
+        if any(day not in WEEKDAYS for day in days):
+            raise ValueError(f"BYDAY inválido: {parts['BYDAY']}.")
+        by_day = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    if until is not None and until >= MAX_RULE_DATE:
+        raise ValueError(f"UNTIL debe ser anterior a {MAX_RULE_DATE:%Y-%m-%d}.")
+    return RecurrenceRule(freq, interval, by_day, until, count)
+
+
+def parse_exceptions(text: Optional[str]) -> FrozenSet[date]:
+    # Columna recurrence_exceptions: fechas ISO separadas por comas
+    if not text:
+        return frozenset()
+    return frozenset(date.fromisoformat(value) for value in text.split(","))
+
+
+def format_exceptions(dates: Iterable[date]) -> Optional[str]:
+    return ",".join(day.isoformat() for day in sorted(set(dates))) or None
+
+
+def _periods(start: datetime, rule: RecurrenceRule) -> Tuple[date, int, Tuple[int, ...], int]:
+    # Cada periodo (un día o una semana, cada `interval`) empieza en anchor + n * step_days
+    # y tiene una ocurrencia por offset. El primero solo emite las que no son anteriores
+    # a start: se devuelve también cuántas son.
+    if rule.freq == "DAILY":
+        return start.date(), rule.interval, (0,), 1
+    offsets = rule.by_day or (start.weekday(),)
+    first = sum(1 for offset in offsets if offset >= start.weekday())
+    return (
+        start.date() - timedelta(days=start.weekday()),
+        7 * rule.interval,
+        offsets,
+        first,
+    )
+
+
+def _emitted_before(period: int, offsets: Tuple[int, ...], first: int) -> int:
+    # Ocurrencias emitidas por los periodos anteriores a `period`
+    return 0 if period == 0 else first + (period - 1) * len(offsets)
+
+
+def last_occurrence_start(start: datetime, rule: RecurrenceRule) -> datetime:
+    # Inicio de la última ocurrencia de una regla con COUNT, calculado sin recorrerla
+    anchor, step_days, offsets, first = _periods(start, rule)
+    index = rule.count - 1
+    if index < first:
+        period, offset = 0, offsets[len(offsets) - first + index]
+    else:
+        period, position = divmod(index - first, len(offsets))
+        period, offset = period + 1, offsets[position]
+    return datetime.combine(
+        anchor + timedelta(days=period * step_days + offset), start.time()
+    )
+
+
+def iter_occurrence_starts(
+    start: datetime, rule: RecurrenceRule, from_time: Optional[datetime] = None
+) -> Iterator[datetime]:
+    # Inicios de ocurrencia en orden (sin aplicar excepciones). Salta directo al periodo
+    # que contiene from_time (con COUNT, descontando las ocurrencias saltadas), así el
+    # costo no crece con la antigüedad de la regla. Si la regla no tiene fin, el
+    # generador tampoco: el llamador corta.
+    anchor, step_days, offsets, first = _periods(start, rule)
+
+    period = 0
+    if from_time is not None and from_time.date() > anchor:
+        period = (from_time.date() - anchor).days // step_days
+
+    emitted = _emitted_before(period, offsets, first)
+    if rule.count is not None and emitted >= rule.count:
+        return
+    while True:
+        base = anchor + timedelta(days=period * step_days)
+        for offset in offsets:
+            occurrence = datetime.combine(base + timedelta(days=offset), start.time())
+            if occurrence < start:
+                continue
+            if rule.until is not None and occurrence > rule.until:
+                return
+            yield occurrence
+            emitted += 1
+            if rule.count is not None and emitted >= rule.count:
+                return
+        period += 1
+
+
+def all_day_bounds(start: datetime, end: datetime) -> Occurrence:
+    # Un horario all_day cubre días locales completos: de la medianoche de su inicio a
+    # la medianoche siguiente a su fin
+    day_start = datetime.combine(start.date(), time.min)
+    day_end = datetime.combine(end.date(), time.min)
+    if day_end < end or day_end == day_start:
+        day_end += timedelta(days=1)
+    return day_start, day_end
+
+
+def expand(
+    start: datetime,
+    end: datetime,
+    rule_text: Optional[str],
+    exceptions_text: Optional[str],
+    window_start: datetime,
+    window_end: datetime,
+    all_day: bool = False,
+) -> List[Occurrence]:
+    # Ocurrencias [inicio, fin) en hora local que se cruzan con [window_start, window_end)
+    if all_day:
+        margin = timedelta(days=1)
+        days = (
+            all_day_bounds(occurrence_start, occurrence_end)
+            for occurrence_start, occurrence_end in expand(
+                start,
+                end,
+                rule_text,
+                exceptions_text,
+                window_start - margin,
+                window_end + margin,
+            )
+        )
+        return [
+            (day_start, day_end)
+            for day_start, day_end in days
+            if day_start < window_end and day_end > window_start
+        ]
+    if not rule_text:
+        if start < window_end and end > window_start:
+            return [(start, end)]
+        return []
+
+    duration = end - start
+    skipped = parse_exceptions(exceptions_text)
+    occurrences = []
+    for occurrence_start in iter_occurrence_starts(
+        start, parse_rule(rule_text), window_start - duration
+    ):
+        if occurrence_start >= window_end:
+            break
+        occurrence_end = occurrence_start + duration
+        if occurrence_end <= window_start or occurrence_start.date() in skipped:
+            continue
+        occurrences.append((occurrence_start, occurrence_end))
+    return occurrences
+
+
+def recurrence_columns(
+    start: datetime,
+    end: datetime,
+    rule_text: Optional[str],
+    exceptions: Iterable[date] = (),
+) -> dict:
+    # Valores de recurrence_rule / recurrence_exceptions / series_end para guardar un
+    # horario. series_end es el fin de la última ocurrencia (NULL = sin fin) y permite
+    # filtrar por ventana en la DB sin expandir. Lanza ValueError si la regla no es válida.
+    rule_text = rule_text.strip().upper() if rule_text else None
+    if not rule_text:
+        return {"recurrence_rule": None, "recurrence_exceptions": None, "series_end": end}
+    if end <= start:
+        raise ValueError("end_time debe ser posterior a start_time.")
+
+    if start >= MAX_RULE_DATE:
+        raise ValueError(
+            f"Un horario recurrente debe empezar antes de {MAX_RULE_DATE:%Y-%m-%d}."
+        )
+    rule = parse_rule(rule_text)
+    if rule.count is not None:
+        series_end = last_occurrence_start(start, rule) + (end - start)
+    elif rule.until is not None:
+        series_end = max(rule.until, start) + (end - start)
+    else:
+        series_end = None
+    return {
+        "recurrence_rule": rule_text,
+        "recurrence_exceptions": format_exceptions(exceptions),
+        "series_end": series_end,
+    }
+
+
+class OccurrenceCache:
+    # Expansiones recientes por horario: { clave: (desde, hasta, ocurrencias) }
+    # La clave incluye id, horas, regla y excepciones, así que editar un horario cambia
+    # su clave y nunca se sirve una expansión vieja (las huérfanas salen por LRU).
+    # Cada expansión cubre al menos window_days desde lo pedido: las consultas
+    # siguientes (el resto del día, la semana siguiente) se sirven de la misma entrada.
+    def __init__(self, window_days: int, max_entries: int):
+        self.window_days = window_days
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[datetime, datetime, List[Occurrence]]]" = (
+            OrderedDict()
+        )
+
+    def get(self, schedule, window_start: datetime, window_end: datetime) -> List[Occurrence]:
+        if not schedule.recurrence_rule:
+            return expand(
+                schedule.start_time,
+                schedule.end_time,
+                None,
+                None,
+                window_start,
+                window_end,
+                schedule.all_day,
+            )
+
+        key = (
+            schedule.__tablename__,
+            schedule.id,
+            schedule.start_time,
+            schedule.end_time,
+            schedule.all_day,
+            schedule.recurrence_rule,
+            schedule.recurrence_exceptions,
+        )
+        cached = self._entries.get(key)
+        if cached is None or cached[0] > window_start or cached[1] < window_end:
+            cache_end = max(window_end, window_start + timedelta(days=self.window_days))
+            cached = (
+                window_start,
+                cache_end,
+                expand(
+                    schedule.start_time,
+                    schedule.end_time,
+                    schedule.recurrence_rule,
+                    schedule.recurrence_exceptions,
+                    window_start,
+                    cache_end,
+                    schedule.all_day,
+                ),
+            )
+            self._entries[key] = cached
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return [
+            (occurrence_start, occurrence_end)
+            for occurrence_start, occurrence_end in cached[2]
+            if occurrence_start < window_end and occurrence_end > window_start
+        ]
+
+    def clear(self):
+        self._entries.clear()
+
+
+occurrence_cache = OccurrenceCache(
+    settings.SCHEDULE_WINDOW_DAYS, settings.SCHEDULE_OCCURRENCE_CACHE_SIZE
+)
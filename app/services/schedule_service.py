@@ -4,6 +4,7 @@ from app.models import (
     DBGroupSchedule,
     DBIndividualSchedule,
     DBUser,
+    DBWorkingGroup,
     UserRole,
 )
 from app.schemas import (
@@ -11,15 +12,37 @@ from app.schemas import (
     GroupScheduleOut,
     IndividualScheduleCreate,
     IndividualScheduleOut,
+    ScheduleBulkReplace,
+    ScheduleBulkOut,
+    ScheduleConflictOut,
+    ScheduleOccurrenceOut,
     ScheduleUpdate,
 )
 from app.repositories.schedule_repository import ScheduleRepository
 from app.repositories.working_group_repository import WorkingGroupRepository
 from app.repositories.device_repository import DeviceRepository
 from app.repositories.user_repository import UserRepository
+from app.repositories.resource_version_repository import ResourceVersionRepository
+from app.services.authorization import AccessControl
+from app.services.resource_versions import SCHEDULES, list_etag
+from app.services.schedule_engine import (
+    MAX_WINDOW_DAYS,
+    expand,
+    occurrence_cache,
+    parse_exceptions,
+    recurrence_columns,
+)
+from app.services.schedule_conflicts import (
+    conflict_window,
+    individual_targets,
+    summarize_conflicts,
+    sweep_conflicts,
+)
+from app.core.config import settings
+from app.core.timezones import DEFAULT_TIME_ZONE, MAX_UTC_BEHIND, ZoneTable, zone_table
 from fastapi import HTTPException, status
-from typing import Optional, List
-from datetime import datetime
+from typing import Callable, Optional, List, Tuple
+from datetime import datetime, timedelta, timezone
 
 
 class ScheduleService:
@@ -28,8 +51,215 @@ class ScheduleService:
         self.group_repo = WorkingGroupRepository(db)
         self.device_repo = DeviceRepository(db)
         self.user_repo = UserRepository(db)
+        self.version_repo = ResourceVersionRepository(db)
+        self.access = AccessControl.for_session(db)
         self.db = db
 
+    def _recurrence_values(
+        self, start: datetime, end: datetime, rule: Optional[str], exceptions
+    ) -> dict:
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end_time debe ser posterior a start_time.",
+            )
+        try:
+            return recurrence_columns(start, end, rule, exceptions)
+        except (ValueError, OverflowError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Regla de recurrencia inválida: {e}",
+            )
+
+    @staticmethod
+    def _localized(schedule_data, time_zone: Optional[str]):
+        # Los horarios se guardan en hora local (naive) del grupo: las horas con zona
+        # (p. ej. "...Z") se convierten; las naive ya se consideran locales
+        table = zone_table(time_zone or DEFAULT_TIME_ZONE)
+        changes = {
+            field: table.to_local(getattr(schedule_data, field))
+            for field in ("start_time", "end_time")
+            if getattr(schedule_data, field, None) is not None
+            and getattr(schedule_data, field).tzinfo is not None
+        }
+        return schedule_data.model_copy(update=changes) if changes else schedule_data
+
+    def _individual_time_zone(self, schedule) -> Optional[str]:
+        # Zona del grupo del objetivo de un horario individual (asignación, dispositivo
+        # o, para un usuario, su grupo principal); None si no se puede resolver
+        device_id = schedule.device_id
+        if schedule.device_user_id:
+            association = (
+                self.db.query(DBDeviceUser)
+                .filter(DBDeviceUser.id == schedule.device_user_id)
+                .first()
+            )
+            device_id = association.device_id if association else None
+        if device_id:
+            device = self.device_repo.get_device_by_id(device_id)
+            group_id = device.working_group_id if device else None
+        elif schedule.user_id:
+            group_id = self.access.get_primary_group_id(schedule.user_id)
+        else:
+            group_id = None
+        group = self.group_repo.get_working_group_by_id(group_id) if group_id else None
+        return group.time_zone if group else None
+
+    def _apply_update(self, schedule, schedule_data: ScheduleUpdate):
+        update_data = schedule_data.model_dump(exclude_unset=True)
+        exceptions = update_data.pop("recurrence_exceptions", None)
+        for key, value in update_data.items():
+            setattr(schedule, key, value)
+        if exceptions is None:
+            exceptions = parse_exceptions(schedule.recurrence_exceptions)
+        # Revalida la regla y recalcula series_end con las horas ya actualizadas
+        values = self._recurrence_values(
+            schedule.start_time, schedule.end_time, schedule.recurrence_rule, exceptions
+        )
+        for key, value in values.items():
+            setattr(schedule, key, value)
+
+    def _ensure_no_conflicts(
+        self,
+        schedule,
+        load_candidates: Callable[[datetime, datetime], list],
+        time_zone: Optional[str] = None,
+    ):
+        # Rechaza (409) un horario activo que se superpone con otro horario activo del
+        # mismo objetivo. load_candidates(desde, hasta) devuelve los horarios del
+        # objetivo que pueden caer en el rango; se comparan sus ocurrencias con un barrido.
+        # Sin time_zone se revisa desde la hora local más temprana posible.
+        if not schedule.is_active:
+            return
+        if time_zone:
+            now = zone_table(time_zone).to_local(datetime.utcnow())
+        else:
+            now = datetime.utcnow() - MAX_UTC_BEHIND
+        window_start, window_end = conflict_window(
+            schedule.start_time, schedule.series_end, now, MAX_WINDOW_DAYS
+        )
+        intervals = [
+            (None, occurrence_start, occurrence_end, None)
+            for occurrence_start, occurrence_end in expand(
+                schedule.start_time,
+                schedule.end_time,
+                schedule.recurrence_rule,
+                schedule.recurrence_exceptions,
+                window_start,
+                window_end,
+                schedule.all_day,
+            )
+        ]
+        if not intervals:
+            return
+        for other in load_candidates(window_start, window_end):
+            if other.id == schedule.id:
+                continue
+            intervals += [
+                (None, occurrence_start, occurrence_end, other.id)
+                for occurrence_start, occurrence_end in occurrence_cache.get(
+                    other, window_start, window_end
+                )
+            ]
+
+        conflicts = [c for c in sweep_conflicts(intervals) if None in (c.first, c.second)]
+        if conflicts:
+            ids = sorted({c.first if c.second is None else c.second for c in conflicts})
+            first = min(c.start for c in conflicts)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"El horario se superpone con los horarios {ids} "
+                f"(primer choque: {first:%Y-%m-%d %H:%M}).",
+            )
+
+    def _individual_targets(self, schedule) -> List[Tuple[str, int]]:
+        assignment = None
+        if schedule.device_user_id:
+            assignment = (
+                self.db.query(DBDeviceUser)
+                .filter(DBDeviceUser.id == schedule.device_user_id)
+                .first()
+            )
+        return individual_targets(schedule, assignment)
+
+    @staticmethod
+    def _local_window(
+        table: ZoneTable,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        default_days: int,
+    ) -> Tuple[datetime, datetime]:
+        # Rango en hora local del grupo. Las fechas con zona se convierten; las naive ya
+        # se consideran locales. Por defecto, desde hoy (local) por default_days días.
+        if start is None:
+            start = table.to_local(datetime.utcnow()).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+        elif start.tzinfo is not None:
+            start = table.to_local(start)
+        if end is None:
+            end = start + timedelta(days=default_days)
+        elif end.tzinfo is not None:
+            end = table.to_local(end)
+        if end <= start or end - start > timedelta(days=MAX_WINDOW_DAYS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El rango debe ser positivo y de a lo sumo {MAX_WINDOW_DAYS} días.",
+            )
+        return start, end
+
+    def _collect_occurrences(
+        self, group_id: int, table: ZoneTable, start: datetime, end: datetime
+    ) -> List[ScheduleOccurrenceOut]:
+        # Solo se leen las filas que pueden caer en la ventana (filtro por series_end) y
+        # las reglas se expanden en memoria con la caché de ocurrencias
+        schedules = [
+            ("group", schedule)
+            for schedule in self.schedule_repo.get_group_schedules_in_window(
+                group_id, start, end
+            )
+        ] + [
+            ("individual", schedule)
+            for schedule in self.schedule_repo.get_individual_schedules_for_group_in_window(
+                group_id, start, end
+            )
+        ]
+        occurrences = []
+        for kind, schedule in schedules:
+            for occurrence_start, occurrence_end in occurrence_cache.get(
+                schedule, start, end
+            ):
+                occurrences.append(
+                    ScheduleOccurrenceOut(
+                        schedule_id=schedule.id,
+                        kind=kind,
+                        start_time=occurrence_start,
+                        end_time=occurrence_end,
+                        start_utc=table.to_utc(occurrence_start).replace(tzinfo=timezone.utc),
+                        end_utc=table.to_utc(occurrence_end).replace(tzinfo=timezone.utc),
+                        all_day=schedule.all_day,
+                        device_user_id=getattr(schedule, "device_user_id", None),
+                        device_id=getattr(schedule, "device_id", None),
+                        user_id=getattr(schedule, "user_id", None),
+                    )
+                )
+        occurrences.sort(key=lambda o: (o.start_time, o.kind, o.schedule_id))
+        return occurrences
+
+    def _get_viewable_group(self, group_id: int, current_user: DBUser) -> DBWorkingGroup:
+        group = self.group_repo.get_working_group_by_id(group_id)
+        if not group:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Grupo de trabajo no encontrado.",
+            )
+        if not self.access.can_access_group(current_user, group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para ver los horarios de este grupo.",
+            )
+        return group
+
     # --- Group Schedules ---
     def create_group_schedule(
         self, schedule_data: GroupScheduleCreate, group_id: int, current_user: DBUser
@@ -47,38 +277,42 @@ class ScheduleService:
                 detail="No tienes permiso para gestionar horarios de este grupo.",
             )
 
+        schedule_data = self._localized(schedule_data, group.time_zone)
         new_schedule = DBGroupSchedule(
             working_group_id=group_id,
             start_time=schedule_data.start_time,
             end_time=schedule_data.end_time,
             all_day=schedule_data.all_day,
             is_active=schedule_data.is_active,
+            **self._recurrence_values(
+                schedule_data.start_time,
+                schedule_data.end_time,
+                schedule_data.recurrence_rule,
+                schedule_data.recurrence_exceptions,
+            ),
         )
+        self._ensure_no_conflicts(
+            new_schedule,
+            lambda start, end: self.schedule_repo.get_group_schedules_in_window(
+                group_id, start, end
+            ),
+            group.time_zone,
+        )
+        self.version_repo.bump(group_id, SCHEDULES)
         created_schedule = self.schedule_repo.create_group_schedule(new_schedule)
         return GroupScheduleOut.model_validate(created_schedule)
 
+    def get_group_schedules_etag(self, group_id: int, current_user: DBUser) -> str:
+        # ETag del listado de horarios de grupo, sin leer los horarios
+        self._get_viewable_group(group_id, current_user)
+        return list_etag(
+            SCHEDULES, group_id, self.version_repo.get_version(group_id, SCHEDULES)
+        )
+
     def get_group_schedules(
         self, group_id: int, current_user: DBUser
     ) -> List[GroupScheduleOut]:
-        group = self.group_repo.get_working_group_by_id(group_id)
-        if not group:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Grupo de trabajo no encontrado.",
-            )
-
-        # Verificar permisos para ver los horarios del grupo
-        is_admin_of_group = (
-            current_user.role == UserRole.ADMIN and group.creator_id == current_user.id
-        )
-        is_member_of_group = any(
-            du.device.working_group_id == group_id for du in current_user.user_devices
-        )
-        if not (is_admin_of_group or is_member_of_group):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No tienes permiso para ver los horarios de este grupo.",
-            )
+        self._get_viewable_group(group_id, current_user)
 
         schedules = self.schedule_repo.get_group_schedules_by_group(group_id)
         return [GroupScheduleOut.model_validate(schedule) for schedule in schedules]
@@ -107,10 +341,17 @@ class ScheduleService:
                 detail="No tienes permiso para actualizar este horario.",
             )
 
-        update_data = schedule_data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(schedule_to_update, key, value)
-
+        self._apply_update(
+            schedule_to_update, self._localized(schedule_data, group.time_zone)
+        )
+        self._ensure_no_conflicts(
+            schedule_to_update,
+            lambda start, end: self.schedule_repo.get_group_schedules_in_window(
+                schedule_to_update.working_group_id, start, end
+            ),
+            group.time_zone,
+        )
+        self.version_repo.bump(schedule_to_update.working_group_id, SCHEDULES)
         updated_schedule = self.schedule_repo.update_group_schedule(schedule_to_update)
         return GroupScheduleOut.model_validate(updated_schedule)
 
@@ -133,8 +374,287 @@ class ScheduleService:
                 detail="No tienes permiso para eliminar este horario.",
             )
 
+        self.version_repo.bump(schedule.working_group_id, SCHEDULES)
         self.schedule_repo.delete_group_schedule(schedule)
 
+    def replace_group_schedules(
+        self, group_id: int, data: ScheduleBulkReplace, current_user: DBUser
+    ) -> ScheduleBulkOut:
+        # Valida todo el lote en memoria (rangos, pertenencia al grupo y superposiciones)
+        # y reemplaza los horarios del grupo en una sola transacción.
+        if not self.access.is_group_admin(current_user, group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para gestionar horarios de este grupo.",
+            )
+
+        time_zone = self.group_repo.get_working_group_by_id(group_id).time_zone
+        group_schedules = [self._localized(s, time_zone) for s in data.group_schedules]
+        individual = [
+            self._localized(s, time_zone) for s in data.individual_schedules or []
+        ]
+        batches = (("de grupo", group_schedules), ("individual", individual))
+        recurrences = {}
+        for label, schedules in batches:
+            for index, schedule in enumerate(schedules):
+                if schedule.end_time <= schedule.start_time:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Horario {label} {index}: end_time debe ser "
+                        "posterior a start_time.",
+                    )
+                try:
+                    recurrences[label, index] = recurrence_columns(
+                        schedule.start_time,
+                        schedule.end_time,
+                        schedule.recurrence_rule,
+                        schedule.recurrence_exceptions,
+                    )
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Horario {label} {index}: regla de recurrencia "
+                        f"inválida: {e}",
+                    )
+        for index, schedule in enumerate(individual):
+            if not (schedule.device_user_id or schedule.device_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Horario individual {index}: debe indicar "
+                    "device_user_id o device_id.",
+                )
+
+        device_user_ids = list({s.device_user_id for s in individual if s.device_user_id})
+        device_ids = list({s.device_id for s in individual if s.device_id})
+        user_ids = list({s.user_id for s in individual if s.user_id} - {current_user.id})
+        group_device_users = self.device_repo.get_group_device_users_by_id(
+            group_id, device_user_ids
+        )
+        foreign_device_users = set(device_user_ids) - group_device_users.keys()
+        foreign_devices = set(device_ids) - self.device_repo.get_group_device_ids(
+            group_id, device_ids
+        )
+        if foreign_device_users or foreign_devices:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "Asignaciones o dispositivos fuera del grupo: "
+                    f"device_user_id {sorted(foreign_device_users)}, "
+                    f"device_id {sorted(foreign_devices)}"
+                ),
+            )
+        # El admin del grupo (creador) no figura en group_members
+        foreign_users = set(user_ids) - self.user_repo.get_group_member_ids(
+            group_id, user_ids
+        )
+        if foreign_users:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Usuarios fuera del grupo: user_id {sorted(foreign_users)}",
+            )
+        # Si se indican varios destinos, deben referirse a la misma asignación
+        for index, schedule in enumerate(individual):
+            association = group_device_users.get(schedule.device_user_id)
+            if association is None:
+                continue
+            if (schedule.device_id and schedule.device_id != association.device_id) or (
+                schedule.user_id and schedule.user_id != association.user_id
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Horario individual {index}: device_id/user_id no "
+                    f"coinciden con la asignación {association.id}.",
+                )
+
+        # Superposiciones entre horarios activos: los de grupo entre sí y los
+        # individuales en cada dispositivo y usuario que ocupan (directamente o por su
+        # asignación). Los recurrentes se comparan por sus ocurrencias desde el primer
+        # horario hasta el último no recurrente (al menos SCHEDULE_WINDOW_DAYS días).
+        all_schedules = [*group_schedules, *individual]
+        horizon_start = min((s.start_time for s in all_schedules), default=datetime.min)
+        horizon_end = max(
+            [horizon_start + timedelta(days=settings.SCHEDULE_WINDOW_DAYS)]
+            + [s.end_time for s in all_schedules]
+        )
+
+        def occurrence_intervals(label, schedules, keys_of):
+            return [
+                (key, occurrence_start, occurrence_end, i)
+                for i, s in enumerate(schedules)
+                if s.is_active
+                for occurrence_start, occurrence_end in expand(
+                    s.start_time,
+                    s.end_time,
+                    recurrences[label, i]["recurrence_rule"],
+                    recurrences[label, i]["recurrence_exceptions"],
+                    horizon_start,
+                    horizon_end,
+                    s.all_day,
+                )
+                for key in keys_of(s)
+            ]
+
+        def individual_keys(schedule):
+            return individual_targets(
+                schedule, group_device_users.get(schedule.device_user_id)
+            )
+
+        # Un par que comparte dispositivo y usuario se informa una sola vez
+        individual_pairs = {
+            (conflict.first, conflict.second): conflict
+            for conflict, _ in summarize_conflicts(
+                sweep_conflicts(
+                    occurrence_intervals("individual", individual, individual_keys)
+                )
+            )
+        }
+        overlaps = [
+            ("de grupo", conflict)
+            for conflict, _ in summarize_conflicts(
+                sweep_conflicts(
+                    occurrence_intervals("de grupo", group_schedules, lambda s: [None])
+                )
+            )
+        ] + [("individuales", conflict) for conflict in individual_pairs.values()]
+        if overlaps:
+            pairs = ", ".join(
+                f"{label} {c.first} y {c.second}" for label, c in overlaps[:10]
+            )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Horarios superpuestos: {pairs}",
+            )
+
+        removed_group = self.schedule_repo.delete_group_schedules_by_group(group_id)
+        created_group = self.schedule_repo.bulk_create_group_schedules(
+            [
+                {
+                    "working_group_id": group_id,
+                    **schedule.model_dump(exclude={"recurrence_exceptions"}),
+                    **recurrences["de grupo", index],
+                }
+                for index, schedule in enumerate(group_schedules)
+            ]
+        )
+        removed_individual = 0
+        created_individual = []
+        if data.individual_schedules is not None:
+            removed_individual = self.schedule_repo.delete_individual_schedules_for_group(
+                group_id
+            )
+            created_individual = self.schedule_repo.bulk_create_individual_schedules(
+                [
+                    {
+                        **schedule.model_dump(exclude={"recurrence_exceptions"}),
+                        **recurrences["individual", index],
+                    }
+                    for index, schedule in enumerate(individual)
+                ]
+            )
+        result = ScheduleBulkOut(
+            group_schedules=[GroupScheduleOut.model_validate(s) for s in created_group],
+            individual_schedules=[
+                IndividualScheduleOut.model_validate(s) for s in created_individual
+            ],
+            removed_group_schedules=removed_group,
+            removed_individual_schedules=removed_individual,
+        )
+        self.version_repo.bump(group_id, SCHEDULES)
+        self.db.commit()
+        return result
+
+    def get_group_occurrences(
+        self,
+        group_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        current_user: DBUser,
+    ) -> List[ScheduleOccurrenceOut]:
+        # Ocurrencias concretas en [start, end) (hora local del grupo) de los horarios del
+        # grupo y de sus dispositivos, con su equivalente en UTC
+        group = self._get_viewable_group(group_id, current_user)
+        table = zone_table(group.time_zone)
+        start, end = self._local_window(table, start, end, default_days=7)
+        return self._collect_occurrences(group_id, table, start, end)
+
+    def get_active_occurrences(
+        self, group_id: int, at: Optional[datetime], current_user: DBUser
+    ) -> List[ScheduleOccurrenceOut]:
+        # Ocurrencias vigentes en el instante `at` (UTC si no trae zona; por defecto,
+        # ahora), evaluadas en la hora local del grupo
+        group = self._get_viewable_group(group_id, current_user)
+        table = zone_table(group.time_zone)
+        if at is None:
+            at = datetime.utcnow()
+        elif at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        local = table.to_local(at)
+        return self._collect_occurrences(
+            group_id, table, local, local + timedelta(microseconds=1)
+        )
+
+    def audit_group_conflicts(
+        self,
+        group_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        current_user: DBUser,
+    ) -> List[ScheduleConflictOut]:
+        # Horarios activos superpuestos en [start, end) (hora local del grupo): los del
+        # grupo entre sí y los individuales (de sus dispositivos, asignaciones y
+        # miembros) por objetivo
+        if not self.access.is_group_admin(current_user, group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para auditar los horarios de este grupo.",
+            )
+        group = self.group_repo.get_working_group_by_id(group_id)
+        start, end = self._local_window(
+            zone_table(group.time_zone), start, end, default_days=31
+        )
+
+        intervals = []
+        group_target = ("group", group_id)
+        for schedule in self.schedule_repo.get_group_schedules_in_window(
+            group_id, start, end
+        ):
+            intervals += [
+                (group_target, occurrence_start, occurrence_end, ("group", schedule.id))
+                for occurrence_start, occurrence_end in occurrence_cache.get(
+                    schedule, start, end
+                )
+            ]
+        individual = self.schedule_repo.get_individual_schedules_for_group_in_window(
+            group_id, start, end
+        ) + self.schedule_repo.get_member_schedules_in_window(group_id, start, end)
+        assignments = self.device_repo.get_group_device_users_by_id(
+            group_id, list({s.device_user_id for s in individual if s.device_user_id})
+        )
+        for schedule in individual:
+            # Cada ocurrencia cuenta en todos los objetivos del horario
+            targets = individual_targets(
+                schedule, assignments.get(schedule.device_user_id)
+            )
+            occurrences = occurrence_cache.get(schedule, start, end)
+            intervals += [
+                (target, occurrence_start, occurrence_end, ("individual", schedule.id))
+                for target in targets
+                for occurrence_start, occurrence_end in occurrences
+            ]
+
+        return [
+            ScheduleConflictOut(
+                target=conflict.key[0],
+                target_id=conflict.key[1],
+                kind=conflict.first[0],
+                schedule_ids=[conflict.first[1], conflict.second[1]],
+                first_overlap_start=conflict.start,
+                first_overlap_end=conflict.end,
+                overlaps=count,
+            )
+            for conflict, count in summarize_conflicts(sweep_conflicts(intervals))
+        ]
+
     # --- Individual Schedules ---
     def create_individual_schedule(
         self, schedule_data: IndividualScheduleCreate, current_user: DBUser
@@ -175,8 +695,7 @@ class ScheduleService:
                     detail="DeviceUser no encontrado.",
                 )
             if current_user.role == UserRole.ADMIN and (
-                du.device.working_group_id
-                not in [g.id for g in current_user.created_working_groups]
+                not self.access.can_manage_device_user(current_user, du.id)
             ):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
@@ -190,8 +709,7 @@ class ScheduleService:
                     detail="Dispositivo no encontrado.",
                 )
             if current_user.role == UserRole.ADMIN and (
-                device.working_group_id
-                not in [g.id for g in current_user.created_working_groups]
+                not self.access.is_group_admin(current_user, device.working_group_id)
             ):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
@@ -206,19 +724,16 @@ class ScheduleService:
                 )
             # Si el admin crea un horario para un usuario, el usuario debe pertenecer a su grupo
             if current_user.role == UserRole.ADMIN:
-                if not (
-                    target_user.id == current_user.id
-                    or any(
-                        du.device.working_group_id
-                        in [g.id for g in current_user.created_working_groups]
-                        for du in target_user.user_devices
-                    )
+                if not self.access.is_member_of_admin_group(
+                    current_user, target_user.id
                 ):
                     raise HTTPException(
                         status_code=status.HTTP_403_FORBIDDEN,
                         detail="No puedes crear horarios para usuarios fuera de tu grupo.",
                     )
 
+        time_zone = self._individual_time_zone(schedule_data)
+        schedule_data = self._localized(schedule_data, time_zone)
         new_schedule = DBIndividualSchedule(
             device_user_id=schedule_data.device_user_id,
             device_id=schedule_data.device_id,
@@ -227,6 +742,21 @@ class ScheduleService:
             end_time=schedule_data.end_time,
             all_day=schedule_data.all_day,
             is_active=schedule_data.is_active,
+            **self._recurrence_values(
+                schedule_data.start_time,
+                schedule_data.end_time,
+                schedule_data.recurrence_rule,
+                schedule_data.recurrence_exceptions,
+            ),
+        )
+        self._ensure_no_conflicts(
+            new_schedule,
+            lambda start, end: (
+                self.schedule_repo.get_individual_schedules_for_targets_in_window(
+                    self._individual_targets(new_schedule), start, end
+                )
+            ),
+            time_zone,
         )
         created_schedule = self.schedule_repo.create_individual_schedule(new_schedule)
         return IndividualScheduleOut.model_validate(created_schedule)
@@ -238,23 +768,9 @@ class ScheduleService:
         if not schedule:
             return None
 
-        # Verificar permisos para ver el horario individual
-        is_admin = current_user.role == UserRole.ADMIN
-        belongs_to_user = schedule.user_id == current_user.id
-        belongs_to_device_user = schedule.device_user_id and any(
-            du.id == schedule.device_user_id for du in current_user.user_devices
-        )
-        belongs_to_device_group = schedule.device_id and any(
-            d.id == schedule.device_id and d.working_group.creator_id == current_user.id
-            for d in current_user.created_working_groups
-        )  # Si el admin es creador del grupo del dispositivo
-
-        if not (
-            is_admin
-            or belongs_to_user
-            or belongs_to_device_user
-            or belongs_to_device_group
-        ):
+        # Verificar permisos para ver el horario individual: el propio usuario (o su
+        # asignación) o el admin del grupo al que pertenece el horario
+        if not self.access.can_manage_individual_schedule(current_user, schedule_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para ver este horario.",
@@ -274,56 +790,25 @@ class ScheduleService:
                 detail="Horario individual no encontrado.",
             )
 
-        # Verificar permisos para actualizar (solo admin o el propio usuario/dispositivo)
-        is_admin = current_user.role == UserRole.ADMIN
-        is_owner = schedule_to_update.user_id == current_user.id
-
-        # Lógica más compleja si se trata de device_user_id o device_id
-        if schedule_to_update.device_user_id:
-            du = (
-                self.db.query(DBDeviceUser)
-                .filter(DBDeviceUser.id == schedule_to_update.device_user_id)
-                .first()
+        # Verificar permisos para actualizar (solo admin del grupo o el propio
+        # usuario/asignación)
+        if not self.access.can_manage_individual_schedule(current_user, schedule_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para actualizar este horario individual.",
             )
-            if du and du.user_id == current_user.id:
-                is_owner = True
-            elif (
-                is_admin
-                and du
-                and du.device.working_group_id
-                in [g.id for g in current_user.created_working_groups]
-            ):
-                pass  # Admin puede actualizar si el device_user está en su grupo
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para actualizar este horario individual.",
-                )
-        elif schedule_to_update.device_id:
-            device = self.device_repo.get_device_by_id(schedule_to_update.device_id)
-            if (
-                is_admin
-                and device
-                and device.working_group_id
-                in [g.id for g in current_user.created_working_groups]
-            ):
-                pass  # Admin puede actualizar si el dispositivo está en su grupo
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para actualizar este horario individual.",
-                )
-        elif schedule_to_update.user_id:
-            if not (is_admin or is_owner):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para actualizar este horario individual.",
-                )
-
-        update_data = schedule_data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(schedule_to_update, key, value)
 
+        time_zone = self._individual_time_zone(schedule_to_update)
+        self._apply_update(schedule_to_update, self._localized(schedule_data, time_zone))
+        self._ensure_no_conflicts(
+            schedule_to_update,
+            lambda start, end: (
+                self.schedule_repo.get_individual_schedules_for_targets_in_window(
+                    self._individual_targets(schedule_to_update), start, end
+                )
+            ),
+            time_zone,
+        )
         updated_schedule = self.schedule_repo.update_individual_schedule(
             schedule_to_update
         )
@@ -337,49 +822,10 @@ class ScheduleService:
                 detail="Horario individual no encontrado.",
             )
 
-        is_admin = current_user.role == UserRole.ADMIN
-        is_owner = schedule.user_id == current_user.id
-
-        # Lógica más compleja si se trata de device_user_id o device_id
-        if schedule.device_user_id:
-            du = (
-                self.db.query(DBDeviceUser)
-                .filter(DBDeviceUser.id == schedule.device_user_id)
-                .first()
+        if not self.access.can_manage_individual_schedule(current_user, schedule_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para eliminar este horario individual.",
             )
-            if du and du.user_id == current_user.id:
-                is_owner = True
-            elif (
-                is_admin
-                and du
-                and du.device.working_group_id
-                in [g.id for g in current_user.created_working_groups]
-            ):
-                pass  # Admin puede eliminar si el device_user está en su grupo
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para eliminar este horario individual.",
-                )
-        elif schedule.device_id:
-            device = self.device_repo.get_device_by_id(schedule.device_id)
-            if (
-                is_admin
-                and device
-                and device.working_group_id
-                in [g.id for g in current_user.created_working_groups]
-            ):
-                pass  # Admin puede eliminar si el dispositivo está en su grupo
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para eliminar este horario individual.",
-                )
-        elif schedule.user_id:
-            if not (is_admin or is_owner):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para eliminar este horario individual.",
-                )
 
         self.schedule_repo.delete_individual_schedule(schedule)
@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from app.models import DBUser, UserRole, DBWorkingGroup, DBDeviceUser
+from app.models import DBUser, UserRole, DBWorkingGroup
 from app.schemas import UserCreateOwner, UserCreateMember, UserOut, UserUpdate
 from app.repositories.user_repository import UserRepository
 from app.repositories.working_group_repository import WorkingGroupRepository
+from app.services.group_roster import group_roster
+from app.services.authorization import AccessControl
 from app.auth import get_password_hash, verify_password
 from fastapi import HTTPException, status
 from typing import Optional, List
@@ -124,25 +126,16 @@ class UserService:
             country_code=member_data.country_code,
             is_active=member_data.is_active,
         )
-        self.user_repo.create_user(new_member)
-
-        # Asociar el nuevo miembro al grupo a través de la tabla device_users (sin dispositivo por ahora)
-        # Esto es un placeholder. La asociación real de un miembro a un grupo
-        # se haría al asignarle un dispositivo o al unirse a un grupo.
-        # Para que aparezca en "my-members", necesitamos asociarlo de alguna manera.
-        # Podríamos tener una tabla `group_members` en lugar de solo `device_users` para usuarios sin un dispositivo específico.
-        # Por ahora, si un miembro no tiene un device_user, no aparecerá en el "miembros del grupo" directamente.
-        # Para simplificar y que aparezca, vamos a asumir que al crear un miembro, lo asociamos a un grupo.
-        # Nota: La tabla `device_users` es para "usuario de un dispositivo". Si un miembro está en un grupo
-        # pero no tiene un dispositivo asociado, la relación `DBWorkingGroup.members` (via `DBDeviceUser`)
-        # no lo capturaría automáticamente.
-        # Si un "cajero" es simplemente un usuario que trabaja en el grupo, y no necesariamente tiene un dispositivo
-        # propio para recibir notificaciones (solo ve el dashboard), entonces DBDeviceUser no es el lugar.
-        # Deberíamos crear una tabla de asociación directa `group_members` (user_id, group_id).
-        # Sin embargo, siguiendo el ERD, `device_users` parece ser la tabla de unión principal.
-        # Por ahora, simplemente lo creamos como usuario y el admin lo vinculará a un dispositivo luego.
-
-        # Retornamos el usuario creado. Su pertenencia al grupo se gestionará al asignarle un dispositivo.
+        # El miembro pertenece al grupo desde su creación (tabla group_members),
+        # aunque el admin le asigne dispositivos más adelante
+        self.db.add(new_member)
+        self.db.flush()
+        self.user_repo.add_group_member(target_group.id, new_member.id, explicit=True)
+        self.db.commit()
+        self.db.refresh(new_member)
+        group_roster.invalidate(target_group.id)
+        AccessControl.for_session(self.db).clear()
+
         return UserOut.model_validate(new_member)
 
     def authenticate_user(self, username: str, password: str) -> Optional[DBUser]:
@@ -171,21 +164,13 @@ class UserService:
             0
         ].id  # Asumimos que el admin tiene un grupo principal
 
-        # Obtener todos los usuarios (miembros y admin) asociados a este grupo a través de device_users
-        members_db = (
-            self.db.query(DBUser)
-            .join(DBDeviceUser)
-            .join(DBDeviceUser.device)
-            .filter(DBDeviceUser.device.has(working_group_id=admin_group_id))
-            .distinct()
-            .all()
-        )
-
-        # Asegurarse de incluir al propio admin si no está en device_users (ej. si no tiene un dispositivo asociado)
-        if admin_user not in members_db:
-            members_db.insert(0, admin_user)  # Añadir el admin al principio
-
-        return [UserOut.model_validate(member) for member in members_db]
+        # El admin primero y luego los miembros del grupo (lista cacheada)
+        members = [
+            member
+            for member in group_roster.get(self.db, admin_group_id)
+            if member.id != admin_user.id
+        ]
+        return [UserOut.model_validate(admin_user)] + members
 
     def update_user_profile(
         self, user_id: int, user_data: UserUpdate
@@ -208,6 +193,7 @@ class UserService:
             setattr(user_to_update, key, value)
 
         self.user_repo.update_user(user_to_update)
+        group_roster.invalidate(*self.user_repo.get_group_ids_for_user(user_id))
         return UserOut.model_validate(user_to_update)
 
     def deactivate_user(self, user_id: int) -> UserOut:
@@ -218,4 +204,5 @@ class UserService:
             )
         user.is_active = False
         self.user_repo.update_user(user)
+        group_roster.invalidate(*self.user_repo.get_group_ids_for_user(user_id))
         return UserOut.model_validate(user)
@@ -1,6 +1,15 @@
+import asyncio
 import collections
-from typing import List, Dict
-from fastapi import WebSocket, WebSocketDisconnect
+import logging
+from functools import partial
+from typing import Awaitable, Callable, List, Dict
+from fastapi import WebSocket
+from app.core.config import settings
+from app.models import PayloadFormat
+from app.schemas import NotificationOut
+from app.services.device_payload import try_encode_notification
+
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
@@ -10,35 +19,128 @@ class ConnectionManager:
         self.active_connections: Dict[int, List[WebSocket]] = collections.defaultdict(
             list
         )
+        # Formato elegido por cada conexión al abrir el WebSocket
+        self.connection_formats: Dict[WebSocket, PayloadFormat] = {}
 
-    async def connect(self, websocket: WebSocket, business_id: int):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        business_id: int,
+        payload_format: PayloadFormat = PayloadFormat.JSON,
+    ):
         await websocket.accept()
         self.active_connections[business_id].append(websocket)
-        print(f"WebSocket conectado para Business ID {business_id}: {websocket.client}")
+        self.connection_formats[websocket] = payload_format
+        logger.info(
+            "WebSocket conectado",
+            extra={"business_id": business_id, "client": str(websocket.client)},
+        )
 
     def disconnect(self, websocket: WebSocket, business_id: int):
-        if business_id in self.active_connections:
-            self.active_connections[business_id].remove(websocket)
-            if not self.active_connections[
-                business_id
-            ]:  # Si la lista está vacía, la eliminamos
-                del self.active_connections[business_id]
-        print(
-            f"WebSocket desconectado para Business ID {business_id}: {websocket.client}"
+        # Idempotente: un envío fallido ya puede haber quitado la conexión antes de que
+        # el endpoint del WebSocket reciba la desconexión
+        self.connection_formats.pop(websocket, None)
+        connections = self.active_connections.get(business_id)
+        if connections is None or websocket not in connections:
+            return
+        connections.remove(websocket)
+        if not connections:  # Si la lista está vacía, la eliminamos
+            del self.active_connections[business_id]
+        logger.info(
+            "WebSocket desconectado",
+            extra={"business_id": business_id, "client": str(websocket.client)},
         )
 
+    async def _send(
+        self,
+        business_id: int,
+        websocket: WebSocket,
+        send: Callable[[], Awaitable[None]],
+    ):
+        # Un cliente caído (WebSocketDisconnect, RuntimeError...) o que no lee a tiempo
+        # se desconecta; nunca propaga el error a quien hace el broadcast
+        try:
+            await asyncio.wait_for(send(), settings.WEBSOCKET_SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(
+                "Error al enviar a WebSocket, se desconecta: %r",
+                e,
+                extra={"business_id": business_id, "client": str(websocket.client)},
+            )
+            self.disconnect(websocket, business_id)
+            # Se cierra aparte para que el cliente (si sigue ahí) sepa que debe reconectar
+            asyncio.ensure_future(self._close(websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass  # Ya estaba cerrada
+
     async def broadcast_to_business(self, business_id: int, message: str):
         if business_id in self.active_connections:
-            for connection in self.active_connections[business_id]:
-                try:
-                    await connection.send_text(message)
-                except RuntimeError as e:
-                    # Posible error si la conexión se cierra justo antes de enviar
-                    print(f"Error al enviar a WebSocket (posiblemente cerrado): {e}")
-                    # Podrías querer eliminar la conexión aquí si el error indica que está rota
-            print(f"Mensaje broadcast a Business ID {business_id}: {message}")
+            connections = list(self.active_connections[business_id])
+            # Envíos concurrentes: un cliente lento no retrasa a los demás
+            await asyncio.gather(
+                *(
+                    self._send(
+                        business_id,
+                        connection,
+                        partial(connection.send_text, message),
+                    )
+                    for connection in connections
+                )
+            )
+            # Sin el cuerpo del mensaje: solo metadatos, y muestreado
+            logger.debug(
+                "Mensaje broadcast",
+                extra={
+                    "business_id": business_id,
+                    "connections": len(connections),
+                    "size": len(message),
+                    "sampled": True,
+                },
+            )
         else:
-            print(f"No hay conexiones activas para Business ID {business_id}")
+            logger.debug(
+                "No hay conexiones activas",
+                extra={"business_id": business_id, "sampled": True},
+            )
+
+    async def broadcast_notification(
+        self, business_id: int, notification: NotificationOut
+    ):
+        # Serializa la notificación una vez por formato y la envía a cada conexión
+        # del grupo: texto para JSON, binario para el formato compacto.
+        # Los envíos van en paralelo y con tiempo límite por conexión.
+        payloads: Dict[PayloadFormat, bytes] = {}
+        connections = list(self.active_connections.get(business_id, []))
+        sends = []
+        for connection in connections:
+            payload_format = self.connection_formats.get(connection, PayloadFormat.JSON)
+            if payload_format not in payloads:
+                payloads[payload_format] = try_encode_notification(
+                    notification, payload_format
+                )
+            payload = payloads[payload_format]
+            if payload is None:
+                continue
+            if payload_format == PayloadFormat.COMPACT:
+                send = partial(connection.send_bytes, payload)
+            else:
+                send = partial(connection.send_text, payload.decode("utf-8"))
+            sends.append(self._send(business_id, connection, send))
+        await asyncio.gather(*sends)
+        logger.debug(
+            "Notificación broadcast",
+            extra={
+                "business_id": business_id,
+                "notification_id": notification.id,
+                "connections": len(connections),
+                "sampled": True,
+            },
+        )
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
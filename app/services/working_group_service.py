@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from app.models import DBWorkingGroup, DBUser, UserRole
 from app.schemas import WorkingGroupCreate, WorkingGroupOut
 from app.repositories.working_group_repository import WorkingGroupRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.services.device_registry import device_registry
 from fastapi import HTTPException, status
 from typing import Optional, List
 
@@ -9,6 +11,7 @@ from typing import Optional, List
 class WorkingGroupService:
     def __init__(self, db: Session):
         self.group_repo = WorkingGroupRepository(db)
+        self.rollup_repo = RollupRepository(db)
         self.db = db
 
     def create_group(
@@ -25,6 +28,7 @@ class WorkingGroupService:
             name=group_data.name,
             description=group_data.description,
             creator_id=creator_id,
+            time_zone=group_data.time_zone,
         )
         created_group = self.group_repo.create_working_group(new_group)
         return WorkingGroupOut.model_validate(created_group)
@@ -67,8 +71,17 @@ class WorkingGroupService:
         existing_group.name = group_data.name
         existing_group.description = group_data.description
         existing_group.is_active = group_data.is_active
+        time_zone_changed = existing_group.time_zone != group_data.time_zone
+        existing_group.time_zone = group_data.time_zone
+        if time_zone_changed:
+            # Los acumulados diarios son días locales: se recalculan en la nueva zona en
+            # la misma transacción. Los dispositivos cacheados llevan la zona anterior
+            # (en otros workers, hasta que expira DEVICE_CACHE_TTL_SECONDS).
+            self.rollup_repo.rebuild_day_buckets(group_id, group_data.time_zone)
 
         updated_group = self.group_repo.update_working_group(existing_group)
+        if time_zone_changed:
+            device_registry.clear()
         return WorkingGroupOut.model_validate(updated_group)
 
     def deactivate_group(self, group_id: int, current_user_id: int):
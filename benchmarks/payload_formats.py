@@ -0,0 +1,55 @@
+"""
+Compara el formato JSON (NotificationOut) con el formato compacto para ESP32:
+tamaño en bytes y tiempo de codificación por notificación.
+
+Uso:
+    python -m benchmarks.payload_formats [--iterations 20000] [--output resultados.json]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+from app.models import NotificationStatus
+from app.schemas import NotificationOut
+from app.services.device_payload import encode_compact, encode_json
+
+SAMPLE = NotificationOut(
+    id=1_234_567,
+    working_group_id=42,
+    raw_notification=(
+        "Yape! Juan Pérez Quispe te envió un pago por S/ 25.50. "
+        "El cód. de seguridad es: 482"
+    ),
+    name="Juan Pérez Quispe",
+    amount=25.5,
+    amount_cents=2550,
+    security_code="482",
+    notification_timestamp=datetime(2026, 10, 19, 15, 4, 11),
+    status=NotificationStatus.RECEIVED,
+    created_at=datetime(2026, 10, 19, 15, 4, 12),
+)
+
+
+def run(iterations: int) -> dict:
+    results = {}
+    for name, encoder in (("json", encode_json), ("compact", encode_compact)):
+        seconds = timeit.timeit(lambda: encoder(SAMPLE), number=iterations)
+        results[name] = {
+            "bytes": len(encoder(SAMPLE)),
+            "encode_us": round(seconds / iterations * 1_000_000, 3),
+        }
+    results["size_ratio"] = round(results["compact"]["bytes"] / results["json"]["bytes"], 3)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -1,3 +1,4 @@
+import logging
 from typing import Optional
 import uvicorn
 from fastapi import (
@@ -15,25 +16,60 @@ from app.routers import (
     devices_router,
     notifications_router,
     schedules_router,
+    metrics_router,
+    diagnostics_router,
 )
 from app.services.websocket_manager import manager
+from app.services.mqtt_bridge import mqtt_bridge
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core.logging_config import setup_logging
+from app.core.timezones import DEFAULT_TIME_ZONE, zone_table
 from app.auth import (
     get_current_user,
 )  # Solo necesitas get_current_user para el WebSocket
 from jose import JWTError, jwt
-from app.database import get_db
+from app.database import get_db, engine
 from sqlalchemy.orm import Session
-from app.models import DBUser  # Para obtener el tipo de usuario desde get_current_user
+from app.models import (
+    DBUser,
+    PayloadFormat,
+)  # Para obtener el tipo de usuario desde get_current_user
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+# Métricas por ruta (latencia, requests en curso, SQL por request) en /metrics
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+
 # Incluir los nuevos routers
 app.include_router(auth_router.router)
 app.include_router(working_groups_router.router)
 app.include_router(devices_router.router)
 app.include_router(notifications_router.router)
 app.include_router(schedules_router.router)
+app.include_router(metrics_router.router)
+app.include_router(diagnostics_router.router)
+
+
+@app.on_event("startup")
+def start_mqtt_bridge():
+    if settings.MQTT_ENABLED:
+        mqtt_bridge.start()
+
+
+@app.on_event("startup")
+def warm_time_zone_tables():
+    # La tabla de transiciones de la zona por defecto se arma antes de la primera request
+    zone_table(DEFAULT_TIME_ZONE)
+
+
+@app.on_event("shutdown")
+def stop_mqtt_bridge():
+    mqtt_bridge.stop()
 
 
 # Ruta raíz
@@ -48,6 +84,11 @@ async def websocket_endpoint(
     websocket: WebSocket,
     # El token se pasa como query parameter para el WebSocket
     token: str = Query(..., description="Token de autenticación JWT para el WebSocket"),
+    payload_format: PayloadFormat = Query(
+        PayloadFormat.JSON,
+        alias="format",
+        description="Formato de las notificaciones: json o compact (binario para ESP32)",
+    ),
     db: Session = Depends(
         get_db
     ),  # Inyectar la dependencia de la DB para get_current_user
@@ -88,15 +129,15 @@ async def websocket_endpoint(
         if user is None or user.is_active is False:
             raise credentials_exception
 
-    except JWTError:
+    except (JWTError, HTTPException):
         raise credentials_exception
-    except Exception as e:
-        print(f"Error al decodificar/validar token JWT en WebSocket: {e}")
+    except Exception:
+        logger.exception("Error al decodificar/validar token JWT en WebSocket")
         raise credentials_exception
 
     # Conecta el WebSocket y asocia el working_group_id
     # Ahora el manager usa working_group_id para agrupar conexiones
-    await manager.connect(websocket, working_group_id)
+    await manager.connect(websocket, working_group_id, payload_format)
     try:
         while True:
             # Mantener la conexión abierta, si el cliente envía algo, puedes manejarlo aquí
@@ -108,7 +149,9 @@ async def websocket_endpoint(
         manager.disconnect(
             websocket, working_group_id
         )  # Desconecta y remueve del working_group_id
-        print(f"WebSocket desconectado para Business ID {working_group_id}.")
-    except Exception as e:
-        print(f"Error inesperado en WebSocket para Business ID {working_group_id}: {e}")
+    except Exception:
+        logger.exception(
+            "Error inesperado en WebSocket",
+            extra={"business_id": working_group_id},
+        )
         manager.disconnect(websocket, working_group_id)
@@ -0,0 +1,45 @@
+"""
+Mueve las notificaciones antiguas al almacenamiento en frío (ARCHIVE_DIR).
+
+Archiva, por grupo y mes calendario, todo lo anterior a los últimos `--months` meses
+en archivos NDJSON comprimidos con gzip, registra cada archivo en notification_archives
+y borra esas filas de la tabla notifications. Pensado para correr una vez al mes,
+antes de `scripts.manage_partitions --retain-months` (que separa las particiones vacías).
+
+Uso:
+    python -m scripts.archive_notifications [--months 12] [--group-id 3]
+"""
+import argparse
+from app.core.config import settings
+from app.database import SessionLocal
+from app.services.notification_archive import NotificationArchiveService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--months",
+        type=int,
+        default=settings.ARCHIVE_AFTER_MONTHS,
+        help="Meses recientes que se mantienen en la DB",
+    )
+    parser.add_argument("--group-id", type=int, help="Archivar solo este grupo")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        archives = NotificationArchiveService(db).archive_older_than(
+            args.months, args.group_id
+        )
+        for archive in archives:
+            print(
+                f"Grupo {archive.working_group_id} {archive.month_start:%Y-%m}: "
+                f"{archive.row_count} notificaciones -> {archive.path}"
+            )
+        print(f"Meses archivados: {len(archives)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
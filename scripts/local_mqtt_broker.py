@@ -0,0 +1,140 @@
+"""
+Broker MQTT 3.1.1 mínimo para desarrollo y pruebas locales cuando no hay mosquitto.
+
+Soporta CONNECT, PUBLISH (QoS 0/1, con PUBACK), SUBSCRIBE/UNSUBSCRIBE con comodines
+(+ y #), PINGREQ y DISCONNECT. Reenvía los mensajes a los suscriptores con QoS 0.
+No implementa sesiones persistentes, retained ni QoS 2: para producción usar mosquitto.
+
+Uso:
+    python -m scripts.local_mqtt_broker --port 1883
+"""
+import argparse
+import asyncio
+import struct
+from typing import Dict, List, Set
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[i]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def encode_remaining_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length > 0:
+            byte |= 0x80
+        encoded.append(byte)
+        if length == 0:
+            return bytes(encoded)
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+class LocalBroker:
+    def __init__(self):
+        # { writer: {topic_filter, ...} }
+        self.subscriptions: Dict[asyncio.StreamWriter, Set[str]] = {}
+        self.published = 0
+
+    async def read_packet(self, reader: asyncio.StreamReader):
+        header = await reader.readexactly(1)
+        multiplier, length = 1, 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b""
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self.subscriptions[writer] = set()
+        try:
+            while True:
+                packet_type, flags, body = await self.read_packet(reader)
+                if packet_type == 1:  # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                elif packet_type == 3:  # PUBLISH
+                    await self.handle_publish(writer, flags, body)
+                elif packet_type == 8:  # SUBSCRIBE
+                    self.handle_subscribe(writer, body)
+                elif packet_type == 10:  # UNSUBSCRIBE
+                    packet_id, filters = body[:2], self.parse_filters(body[2:], False)
+                    self.subscriptions[writer].difference_update(filters)
+                    writer.write(b"\xb0\x02" + packet_id)
+                elif packet_type == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif packet_type == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscriptions.pop(writer, None)
+            writer.close()
+
+    def parse_filters(self, data: bytes, with_qos: bool) -> List[str]:
+        filters, offset = [], 0
+        while offset < len(data):
+            (length,) = struct.unpack_from("!H", data, offset)
+            offset += 2
+            filters.append(data[offset : offset + length].decode())
+            offset += length + (1 if with_qos else 0)
+        return filters
+
+    def handle_subscribe(self, writer: asyncio.StreamWriter, body: bytes):
+        packet_id, filters = body[:2], self.parse_filters(body[2:], True)
+        self.subscriptions[writer].update(filters)
+        payload = packet_id + b"\x00" * len(filters)  # QoS 0 concedido
+        writer.write(b"\x90" + encode_remaining_length(len(payload)) + payload)
+
+    async def handle_publish(self, writer: asyncio.StreamWriter, flags: int, body: bytes):
+        qos = (flags >> 1) & 0x03
+        (topic_length,) = struct.unpack_from("!H", body, 0)
+        topic = body[2 : 2 + topic_length].decode()
+        offset = 2 + topic_length
+        if qos > 0:
+            packet_id = body[offset : offset + 2]
+            offset += 2
+            writer.write(b"\x40\x02" + packet_id)  # PUBACK
+        payload = body[offset:]
+        self.published += 1
+
+        message = encode_string(topic) + payload
+        packet = b"\x30" + encode_remaining_length(len(message)) + message
+        for subscriber, filters in list(self.subscriptions.items()):
+            if any(topic_matches(f, topic) for f in filters):
+                subscriber.write(packet)
+
+
+async def serve(host: str, port: int):
+    broker = LocalBroker()
+    server = await asyncio.start_server(broker.handle_client, host, port)
+    print(f"Broker MQTT local escuchando en {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,42 @@
+"""
+Mantenimiento de las particiones mensuales de la tabla notifications.
+
+Crea las particiones de los próximos meses y, opcionalmente, separa o elimina las
+anteriores al período de retención. Pensado para correr a diario (cron / job).
+
+Uso:
+    python -m scripts.manage_partitions --ahead 3
+    python -m scripts.manage_partitions --ahead 3 --retain-months 24 [--drop]
+"""
+import argparse
+from app.database import SessionLocal
+from app.services.partition_service import NotificationPartitionService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ahead", type=int, default=3, help="Meses a futuro a crear")
+    parser.add_argument(
+        "--retain-months",
+        type=int,
+        help="Separar las particiones más antiguas que esta cantidad de meses",
+    )
+    parser.add_argument(
+        "--drop", action="store_true", help="Eliminar (no solo separar) las particiones antiguas"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = NotificationPartitionService(db)
+        for name in service.ensure_partitions(args.ahead):
+            print(f"Partición creada: {name}")
+        if args.retain_months is not None:
+            for name in service.detach_partitions(args.retain_months, drop=args.drop):
+                print(f"Partición {'eliminada' if args.drop else 'separada'}: {name}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
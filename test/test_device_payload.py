@@ -0,0 +1,74 @@
+import struct
+from datetime import datetime, timedelta
+
+from app.models import PayloadFormat
+from app.schemas import NotificationOut
+from app.services.device_payload import encode_compact, try_encode_notification
+
+
+def notification(**overrides):
+    values = dict(
+        id=7,
+        raw_notification="Yape! Ana te envió S/ 12.50",
+        name="Ana",
+        security_code="123",
+        notification_timestamp=datetime(2031, 10, 20, 12),
+        amount=12.5,
+        amount_cents=1250,
+        working_group_id=1,
+        status="received",
+        created_at=datetime(2031, 10, 20, 12),
+    )
+    values.update(overrides)
+    return NotificationOut(**values)
+
+
+def test_compact_record_layout():
+    record = encode_compact(notification())
+    header = struct.unpack_from("<BIiI", record)
+    assert header[:3] == (1, 7, 1250)  # Versión, id, céntimos
+    assert datetime.utcfromtimestamp(header[3]) == datetime(2031, 10, 20, 12)
+    assert record[13:] == b"\x03Ana\x03123"
+
+
+def test_unencodable_notification_is_skipped_not_raised():
+    too_big = notification(amount_cents=2**31)
+    assert try_encode_notification(too_big, PayloadFormat.COMPACT) is None
+    assert try_encode_notification(too_big, PayloadFormat.JSON) is not None
+
+
+def post_payment(client, headers, **overrides):
+    payload = {
+        "raw_notification": "Yape",
+        "name": "Juan",
+        "amount": "1.00",
+        "security_code": "123",
+        "notification_timestamp": datetime.utcnow().isoformat(),
+    }
+    payload.update(overrides)
+    return client.post("/notifications/incoming", json=payload, headers=headers)
+
+
+def test_ingest_rejects_values_the_device_format_cannot_carry(client, register_owner):
+    headers, _ = register_owner()
+    assert post_payment(client, headers, amount="21474836.47").status_code == 200
+    assert post_payment(client, headers, amount="21474836.48").status_code == 422
+    for timestamp in ("1969-12-31T23:59:59", "2200-01-01T00:00:00"):
+        response = post_payment(client, headers, notification_timestamp=timestamp)
+        assert response.status_code == 422
+    # Con zona: se guarda en UTC
+    utc = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    local = (utc - timedelta(hours=5)).isoformat() + "-05:00"
+    response = post_payment(client, headers, notification_timestamp=local)
+    assert response.json()["notification_timestamp"] == utc.isoformat()
+
+
+def test_timestamp_outside_the_receipt_window_is_clamped(client, register_owner):
+    headers, _ = register_owner()
+    # Un ESP32 sin NTP reporta 1970; otro, un reloj muy adelantado
+    for timestamp in ("1970-01-01T00:00:05", "2099-01-01T00:00:00"):
+        before = datetime.utcnow()
+        response = post_payment(client, headers, notification_timestamp=timestamp)
+        assert response.status_code == 200, response.text
+        stored = datetime.fromisoformat(response.json()["notification_timestamp"])
+        assert before <= stored <= datetime.utcnow()
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+
+def get_fresh(client, headers, url):
+    # Primer GET: 200 con ETag; repetirlo con If-None-Match: 304 sin cuerpo
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+    repeat = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == etag
+    assert repeat.content == b""
+    return etag, response.json()
+
+
+def assert_changed(client, headers, url, old_etag):
+    # Tras una escritura, el ETag viejo ya no vale y el contenido es el nuevo
+    response = client.get(url, headers={**headers, "If-None-Match": old_etag})
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != old_etag
+    return response.json()
+
+
+def post_payment(client, headers, amount):
+    response = client.post(
+        "/notifications/incoming",
+        json={
+            "raw_notification": "Yape",
+            "name": "Juan",
+            "amount": amount,
+            "security_code": "123",
+            "notification_timestamp": datetime.utcnow().isoformat(),
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_notifications_etag_follows_ingest_and_status_changes(client, register_owner):
+    headers, group_id = register_owner()
+    url = f"/notifications/group/{group_id}"
+    notification_id = post_payment(client, headers, "1.00")
+    etag, page = get_fresh(client, headers, url)
+    assert [n["id"] for n in page] == [notification_id]
+
+    second_id = post_payment(client, headers, "2.00")
+    page = assert_changed(client, headers, url, etag)
+    assert {n["id"] for n in page} == {notification_id, second_id}
+
+    etag, _ = get_fresh(client, headers, url)
+    response = client.patch(
+        f"/notifications/{notification_id}/status",
+        json={"status": "sent"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    page = assert_changed(client, headers, url, etag)
+    assert {n["id"]: n["status"] for n in page}[notification_id] == "sent"
+
+
+def test_devices_etag_follows_device_updates(client, register_owner):
+    headers, group_id = register_owner()
+    url = f"/devices/group/{group_id}"
+    device_id = client.post(
+        "/devices/",
+        json={"device_uid": "caja-1", "working_group_id": group_id},
+        headers=headers,
+    ).json()["id"]
+    etag, devices = get_fresh(client, headers, url)
+    assert [d["id"] for d in devices] == [device_id]
+
+    response = client.put(
+        f"/devices/{device_id}", json={"alias": "Caja principal"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    devices = assert_changed(client, headers, url, etag)
+    assert devices[0]["alias"] == "Caja principal"
+
+
+def test_schedules_etag_follows_schedule_updates(client, register_owner):
+    headers, group_id = register_owner()
+    url = f"/schedules/group/{group_id}"
+    schedule_id = client.post(
+        url,
+        json={"start_time": "2031-10-20T08:00:00", "end_time": "2031-10-20T10:00:00"},
+        headers=headers,
+    ).json()["id"]
+    etag, schedules = get_fresh(client, headers, url)
+    assert [s["id"] for s in schedules] == [schedule_id]
+
+    response = client.put(
+        f"/schedules/group/{schedule_id}",
+        json={"end_time": "2031-10-20T12:00:00"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    schedules = assert_changed(client, headers, url, etag)
+    assert schedules[0]["end_time"] == "2031-10-20T12:00:00"
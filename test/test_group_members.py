@@ -0,0 +1,82 @@
+def create_member(client, headers, group_id, username):
+    response = client.post(
+        "/auth/create-member",
+        json={"username": username, "password": "pw", "working_group_id": group_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    token = client.post(
+        "/auth/token", data={"username": username, "password": "pw"}
+    ).json()["access_token"]
+    return response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+
+def create_device(client, headers, group_id, device_uid):
+    response = client.post(
+        "/devices/",
+        json={"device_uid": device_uid, "working_group_id": group_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def member_ids(client, headers):
+    members = client.get("/auth/my-members", headers=headers).json()
+    return [user["id"] for user in members]
+
+
+def test_created_member_survives_losing_their_last_assignment(client, register_owner):
+    headers, group_id = register_owner()
+    member_id, member_headers = create_member(client, headers, group_id, "cajero")
+    device_id = create_device(client, headers, group_id, "caja-1")
+
+    assignment = client.post(
+        "/devices/assign-user",
+        json={"user_id": member_id, "device_id": device_id},
+        headers=headers,
+    ).json()["id"]
+    response = client.delete(
+        f"/devices/remove-user-assignment/{assignment}", headers=headers
+    )
+    assert response.status_code == 204, response.text
+
+    assert member_id in member_ids(client, headers)
+    devices = client.get(f"/devices/group/{group_id}", headers=member_headers)
+    assert devices.status_code == 200
+
+    # Lo mismo por la reasignación masiva
+    body = {"assignments": [{"device_id": device_id, "user_ids": [member_id]}]}
+    client.put(f"/devices/group/{group_id}/assignments", json=body, headers=headers)
+    body = {"assignments": [{"device_id": device_id, "user_ids": []}]}
+    response = client.put(
+        f"/devices/group/{group_id}/assignments", json=body, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert member_id in member_ids(client, headers)
+    devices = client.get(f"/devices/group/{group_id}", headers=member_headers)
+    assert devices.status_code == 200
+
+
+def test_membership_from_an_assignment_ends_with_it(client, register_owner):
+    headers, group_id = register_owner("owner", "grupo")
+    other_headers, other_group_id = register_owner("otro", "otro grupo")
+    # Miembro de otro grupo que solo entra a este por una asignación
+    guest_id, guest_headers = create_member(
+        client, other_headers, other_group_id, "visita"
+    )
+    device_id = create_device(client, headers, group_id, "caja-1")
+
+    body = {"assignments": [{"device_id": device_id, "user_ids": [guest_id]}]}
+    client.put(f"/devices/group/{group_id}/assignments", json=body, headers=headers)
+    assert guest_id in member_ids(client, headers)
+    devices = client.get(f"/devices/group/{group_id}", headers=guest_headers)
+    assert devices.status_code == 200
+
+    body = {"assignments": [{"device_id": device_id, "user_ids": []}]}
+    client.put(f"/devices/group/{group_id}/assignments", json=body, headers=headers)
+    assert guest_id not in member_ids(client, headers)
+    devices = client.get(f"/devices/group/{group_id}", headers=guest_headers)
+    assert devices.status_code == 403
+    # Sigue siendo miembro de su propio grupo
+    assert guest_id in member_ids(client, other_headers)
@@ -0,0 +1,179 @@
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from app.database import SessionLocal
+from app.models import (
+    DBDevice,
+    DBDeviceUser,
+    DBDeviceUserNotification,
+    DBNotification,
+    DBUser,
+    DBWorkingGroup,
+    NotificationStatus,
+    UserRole,
+)
+from app.repositories.device_repository import DeviceRepository
+from app.schemas import NotificationOut
+from app.services.mqtt_bridge import MQTTBridge
+
+ROOT = Path(__file__).resolve().parent.parent
+TOPIC_PREFIX = "yape/devices"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+@pytest.fixture
+def broker_port():
+    # Broker local de scripts/local_mqtt_broker.py en un puerto libre
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "scripts.local_mqtt_broker", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        assert wait_until(lambda: _accepts(port)), "El broker local no arrancó"
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+
+
+def _accepts(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+@pytest.fixture
+def delivery(db_engine):
+    # Grupo con un dispositivo, un usuario asignado y una notificación recibida
+    with SessionLocal() as db:
+        user = DBUser(username="owner", hashed_password="x", role=UserRole.ADMIN)
+        db.add(user)
+        db.flush()
+        group = DBWorkingGroup(creator_id=user.id, name="grupo")
+        db.add(group)
+        db.flush()
+        device = DBDevice(working_group_id=group.id, device_uid="caja-1")
+        db.add(device)
+        db.flush()
+        db.add(DBDeviceUser(user_id=user.id, device_id=device.id, is_active=True))
+        notification = DBNotification(
+            working_group_id=group.id,
+            device_id=device.id,
+            raw_notification="Yape! Ana te envió S/ 12.50",
+            name="Ana",
+            amount_cents=1250,
+            security_code="123",
+            notification_timestamp=datetime(2026, 10, 19, 12),
+            status=NotificationStatus.RECEIVED,
+        )
+        db.add(notification)
+        db.commit()
+        targets = DeviceRepository(db).get_delivery_targets(group.id)
+        return NotificationOut.model_validate(notification), targets, user.id
+
+
+def test_bridge_delivers_to_device_and_records_ack(broker_port, delivery):
+    notification, targets, user_id = delivery
+    received = []
+    subscribed = threading.Event()
+
+    device_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="caja-1")
+    device_client.on_connect = lambda client, *_: client.subscribe(
+        f"{TOPIC_PREFIX}/caja-1/notifications", qos=1
+    )
+    device_client.on_subscribe = lambda *_: subscribed.set()
+    device_client.on_message = lambda client, userdata, message: received.append(
+        message.payload
+    )
+    device_client.connect("127.0.0.1", broker_port)
+    device_client.loop_start()
+
+    bridge = MQTTBridge("127.0.0.1", broker_port, TOPIC_PREFIX, flush_interval=0.1)
+    try:
+        assert subscribed.wait(5)
+        bridge.start()
+        assert wait_until(lambda: bridge.client.is_connected())
+        assert bridge.publish_notification(notification, targets) == 1
+
+        assert wait_until(lambda: received)
+        assert b"Ana" in received[0]
+
+        def recorded():
+            with SessionLocal() as db:
+                return (
+                    db.get(DBNotification, notification.id).status
+                    == NotificationStatus.SENT
+                )
+
+        assert wait_until(recorded)
+        with SessionLocal() as db:
+            rows = db.query(DBDeviceUserNotification).all()
+            assert [(r.notification_id, r.user_id) for r in rows] == [
+                (notification.id, user_id)
+            ]
+    finally:
+        bridge.stop()
+        device_client.loop_stop()
+        device_client.disconnect()
+
+
+def test_pending_publications_are_bounded_without_broker(delivery):
+    notification, targets, _ = delivery
+    # Nada escucha en el puerto: paho encola los mensajes y nunca llega el PUBACK
+    bridge = MQTTBridge(
+        "127.0.0.1", free_port(), TOPIC_PREFIX, flush_interval=60, max_pending=2
+    )
+    bridge.start()
+    try:
+        published = [bridge.publish_notification(notification, targets) for _ in range(4)]
+        assert published == [1, 1, 0, 0]
+        assert len(bridge._pending) == 2
+    finally:
+        bridge.stop()
+
+
+def test_puback_before_mid_is_registered_is_not_lost(delivery):
+    notification, targets, _ = delivery
+    bridge = MQTTBridge("127.0.0.1", free_port(), TOPIC_PREFIX, flush_interval=60)
+
+    class AckingClient:
+        # Simula el hilo de red de paho entregando el PUBACK dentro de publish()
+        def publish(self, topic, payload, qos):
+            thread = threading.Thread(
+                target=bridge._on_publish, args=(self, None, 7, None, None)
+            )
+            thread.start()
+            thread.join(timeout=5)
+            assert not thread.is_alive(), "on_publish quedó bloqueado"
+            return mqtt.MQTTMessageInfo(7)
+
+    bridge.client = AckingClient()
+    assert bridge.publish_notification(notification, targets) == 1
+    assert bridge._pending == {} and bridge._early_acks == {}
+    assert [ack[:2] for ack in bridge._acked] == [(notification.id, targets[0][0])]
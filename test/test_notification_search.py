@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models import DBNotification, NotificationStatus
+
+
+def add_notification(group_id, name, timestamp):
+    # Directo en la DB: la ingesta reemplaza las fechas fuera de su ventana
+    with SessionLocal() as db:
+        notification = DBNotification(
+            working_group_id=group_id,
+            raw_notification=f"Yape! {name} te envió S/ 5.00",
+            name=name,
+            amount_cents=500,
+            security_code="123",
+            notification_timestamp=timestamp,
+            status=NotificationStatus.RECEIVED,
+        )
+        db.add(notification)
+        db.commit()
+        return notification.id
+
+
+def search(client, headers, group_id, **params):
+    response = client.get(
+        f"/notifications/group/{group_id}/search", params=params, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return [result["id"] for result in response.json()]
+
+
+def test_search_without_start_only_looks_at_recent_days(client, register_owner):
+    headers, group_id = register_owner()
+    now = datetime.utcnow()
+    recent = add_notification(group_id, "Juan Pérez", now - timedelta(days=3))
+    old = add_notification(group_id, "Juan Quispe", now - timedelta(days=400))
+
+    assert search(client, headers, group_id, q="Juan") == [recent]
+    since = (now - timedelta(days=500)).isoformat()
+    assert set(search(client, headers, group_id, q="Juan", start=since)) == {recent, old}
+    # Con solo `end`, la ventana se cuenta hacia atrás desde ahí
+    until = (now - timedelta(days=390)).isoformat()
+    assert search(client, headers, group_id, q="Juan", end=until) == [old]
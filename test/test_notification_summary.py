@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+
+# Día local de ayer en Lima (UTC-5, sin horario de verano): todos los pagos
+# quedan dentro de la ventana de recepción del servidor.
+DAY = (datetime.utcnow() - timedelta(hours=5)).date() - timedelta(days=1)
+NEXT_DAY = DAY + timedelta(days=1)
+
+
+def at(day: date, time: str) -> str:
+    return f"{day.isoformat()}T{time}"
+
+
+def post_payment(client, headers, amount, timestamp):
+    response = client.post(
+        "/notifications/incoming",
+        json={
+            "raw_notification": "Yape",
+            "name": "Juan",
+            "amount": amount,
+            "security_code": "123",
+            "notification_timestamp": timestamp,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_daily_summary_uses_the_group_local_day(client, register_owner):
+    headers, group_id = register_owner()  # America/Lima (UTC-5)
+    post_payment(client, headers, 10, at(DAY, "04:00:00"))  # 23:00 del día anterior en Lima
+    post_payment(client, headers, 2, at(DAY, "06:00:00"))  # 01:00 del día
+    post_payment(client, headers, 3, at(NEXT_DAY, "04:59:00"))  # 23:59 del día
+
+    summary = client.get(
+        f"/notifications/group/{group_id}/summary",
+        params={"day": DAY.isoformat(), "granularity": "day"},
+        headers=headers,
+    ).json()
+
+    assert summary["time_zone"] == "America/Lima"
+    assert (summary["start"], summary["end"]) == (
+        at(DAY, "05:00:00"),
+        at(NEXT_DAY, "05:00:00"),
+    )
+    assert summary["sum_amount_cents"] == 500
+    assert [(b["bucket_start"], b["count"]) for b in summary["buckets"]] == [
+        (at(DAY, "05:00:00"), 2)
+    ]
+
+
+def test_explicit_utc_range_splits_days_at_local_midnight(client, register_owner):
+    headers, group_id = register_owner()
+    post_payment(client, headers, 10, at(DAY, "04:00:00"))
+    post_payment(client, headers, 2, at(DAY, "06:00:00"))
+
+    summary = client.get(
+        f"/notifications/group/{group_id}/summary",
+        params={
+            "start": at(DAY - timedelta(days=1), "00:00:00"),
+            "end": at(DAY + timedelta(days=2), "00:00:00"),
+            "granularity": "day",
+        },
+        headers=headers,
+    ).json()
+
+    assert [(b["bucket_start"], b["sum_amount_cents"]) for b in summary["buckets"]] == [
+        (at(DAY - timedelta(days=1), "05:00:00"), 1000),
+        (at(DAY, "05:00:00"), 200),
+    ]
+
+
+def test_daily_rollups_follow_a_time_zone_change(client, register_owner):
+    headers, group_id = register_owner()
+    post_payment(client, headers, 10, at(DAY, "04:00:00"))  # 23:00 del día anterior en Lima
+    post_payment(client, headers, 2, at(DAY, "06:00:00"))
+
+    response = client.put(
+        f"/groups/{group_id}",
+        json={"name": "grupo", "time_zone": "UTC"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    post_payment(client, headers, 3, at(DAY, "23:00:00"))
+
+    summary = client.get(
+        f"/notifications/group/{group_id}/summary",
+        params={"day": DAY.isoformat(), "granularity": "day"},
+        headers=headers,
+    ).json()
+    assert summary["time_zone"] == "UTC"
+    assert [(b["bucket_start"], b["sum_amount_cents"]) for b in summary["buckets"]] == [
+        (at(DAY, "00:00:00"), 1500)
+    ]
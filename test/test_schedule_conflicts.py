@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models import DBIndividualSchedule
+from app.services.schedule_conflicts import (
+    conflict_window,
+    summarize_conflicts,
+    sweep_conflicts,
+)
+
+BASE = datetime(2031, 10, 20, 8)
+
+
+def hours(start: int, end: int):
+    return BASE + timedelta(hours=start), BASE + timedelta(hours=end)
+
+
+# --- Barrido ---
+
+
+def test_sweep_detects_overlap_with_its_span():
+    conflicts = sweep_conflicts([("g", *hours(0, 3), "a"), ("g", *hours(2, 5), "b")])
+    assert [(c.first, c.second, c.start, c.end) for c in conflicts] == [
+        ("a", "b", *hours(2, 3))
+    ]
+
+
+def test_sweep_ignores_adjacent_intervals_other_keys_and_same_schedule():
+    intervals = [
+        ("g", *hours(0, 2), "a"),
+        ("g", *hours(2, 4), "b"),  # Empieza justo cuando termina a: no choca
+        ("otro", *hours(0, 4), "c"),  # Otro objetivo
+        ("g", *hours(6, 8), "d"),
+        ("g", *hours(7, 9), "d"),  # Ocurrencias del mismo horario
+    ]
+    assert sweep_conflicts(intervals) == []
+
+
+def test_sweep_reports_every_open_interval():
+    intervals = [
+        ("g", *hours(0, 10), "a"),
+        ("g", *hours(1, 2), "b"),
+        ("g", *hours(3, 4), "c"),
+    ]
+    pairs = {(c.first, c.second) for c in sweep_conflicts(intervals)}
+    assert pairs == {("a", "b"), ("a", "c")}
+
+
+def test_summarize_keeps_first_conflict_per_pair_with_count():
+    intervals = [
+        ("g", *hours(day * 24, day * 24 + 2), ref)
+        for day in range(3)
+        for ref in ("a", "b")
+    ]
+    summary = summarize_conflicts(sweep_conflicts(intervals))
+    assert len(summary) == 1
+    conflict, count = summary[0]
+    assert (conflict.start, count) == (BASE, 3)
+
+
+def test_conflict_window_starts_now_for_ongoing_series():
+    now = BASE + timedelta(days=10)
+    assert conflict_window(BASE, None, now, 30) == (now, now + timedelta(days=30))
+    # Ya terminado: se revisa completo
+    series_end = BASE + timedelta(days=2)
+    assert conflict_window(BASE, series_end, now, 30) == (BASE, series_end)
+
+
+# --- Horarios con zona horaria en la API ---
+
+
+def test_create_group_schedule_with_utc_times_is_stored_in_local_time(
+    client, register_owner
+):
+    headers, group_id = register_owner()
+    response = client.post(
+        f"/schedules/group/{group_id}",
+        json={"start_time": "2031-10-20T21:00:00Z", "end_time": "2031-10-20T23:00:00Z"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    # America/Lima (UTC-5)
+    assert response.json()["start_time"] == "2031-10-20T16:00:00"
+    assert response.json()["end_time"] == "2031-10-20T18:00:00"
+
+    overlapping = client.post(
+        f"/schedules/group/{group_id}",
+        json={"start_time": "2031-10-20T17:00:00", "end_time": "2031-10-20T19:00:00"},
+        headers=headers,
+    )
+    assert overlapping.status_code == 409
+
+
+def test_update_and_bulk_accept_mixed_aware_and_naive_times(client, register_owner):
+    headers, group_id = register_owner()
+    created = client.post(
+        f"/schedules/group/{group_id}",
+        json={"start_time": "2031-10-20T08:00:00", "end_time": "2031-10-20T10:00:00"},
+        headers=headers,
+    ).json()
+
+    updated = client.put(
+        f"/schedules/group/{created['id']}",
+        json={"end_time": "2031-10-20T12:00:00-05:00"},
+        headers=headers,
+    )
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["end_time"] == "2031-10-20T12:00:00"
+
+    replaced = client.put(
+        f"/schedules/group/{group_id}/bulk",
+        json={
+            "group_schedules": [
+                {"start_time": "2031-10-21T13:00:00Z", "end_time": "2031-10-21T15:00:00"}
+            ]
+        },
+        headers=headers,
+    )
+    assert replaced.status_code == 200, replaced.text
+    assert replaced.json()["group_schedules"][0]["start_time"] == "2031-10-21T08:00:00"
+
+
+def test_individual_schedule_with_utc_times_uses_device_group_zone(
+    client, register_owner
+):
+    headers, group_id = register_owner()
+    device = client.post(
+        "/devices/",
+        json={"device_uid": "caja-1", "working_group_id": group_id},
+        headers=headers,
+    ).json()
+    response = client.post(
+        "/schedules/individual",
+        json={
+            "device_id": device["id"],
+            "start_time": "2031-10-20T21:00:00Z",
+            "end_time": "2031-10-20T23:00:00Z",
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["start_time"] == "2031-10-20T16:00:00"
+
+
+def test_inverted_range_is_rejected(client, register_owner):
+    headers, group_id = register_owner()
+    response = client.post(
+        f"/schedules/group/{group_id}",
+        json={"start_time": "2031-10-20T10:00:00", "end_time": "2031-10-20T08:00:00"},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+def test_assignment_schedule_conflicts_across_device_and_user(client, register_owner):
+    headers, group_id = register_owner()
+    member_id = client.post(
+        "/auth/create-member",
+        json={"username": "cajero", "password": "pw", "working_group_id": group_id},
+        headers=headers,
+    ).json()["id"]
+    device_id = client.post(
+        "/devices/",
+        json={"device_uid": "caja-1", "working_group_id": group_id},
+        headers=headers,
+    ).json()["id"]
+    assignment_id = client.post(
+        "/devices/assign-user",
+        json={"user_id": member_id, "device_id": device_id},
+        headers=headers,
+    ).json()["id"]
+
+    def create(target, start, end):
+        return client.post(
+            "/schedules/individual",
+            json={
+                **target,
+                "start_time": f"2031-10-20T{start}:00:00",
+                "end_time": f"2031-10-20T{end}:00:00",
+            },
+            headers=headers,
+        )
+
+    assignment = {"device_user_id": assignment_id}
+    assert create({"device_id": device_id}, "08", "10").status_code == 200
+    assert create({"user_id": member_id}, "12", "14").status_code == 200
+    # La asignación ocupa el dispositivo y el usuario
+    assert create(assignment, "09", "11").status_code == 409
+    assert create(assignment, "13", "15").status_code == 409
+    assert create(assignment, "10", "12").status_code == 200
+
+    # Filas previas a la validación: la auditoría las informa por objetivo
+    with SessionLocal() as db:
+        legacy = DBIndividualSchedule(
+            device_user_id=assignment_id,
+            start_time=datetime(2031, 10, 20, 13),
+            end_time=datetime(2031, 10, 20, 15),
+        )
+        db.add(legacy)
+        db.commit()
+        legacy_id = legacy.id
+    conflicts = client.get(
+        f"/schedules/group/{group_id}/conflicts",
+        params={"start": "2031-10-20T00:00:00", "end": "2031-10-21T00:00:00"},
+        headers=headers,
+    ).json()
+    assert [(c["target"], c["target_id"], c["overlaps"]) for c in conflicts] == [
+        ("user", member_id, 1)
+    ]
+    assert legacy_id in conflicts[0]["schedule_ids"]
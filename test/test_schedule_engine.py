@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.schedule_engine import (
+    OccurrenceCache,
+    all_day_bounds,
+    expand,
+    last_occurrence_start,
+    parse_rule,
+    recurrence_columns,
+)
+
+MONDAY = datetime(2031, 10, 20, 9)  # Lunes
+WEDNESDAY = datetime(2031, 10, 22, 9)
+HOUR = timedelta(hours=1)
+FAR = datetime(2035, 1, 1)
+
+
+def starts(start, rule, exceptions=None, window=(datetime(2031, 1, 1), FAR)):
+    return [s for s, _ in expand(start, start + HOUR, rule, exceptions, *window)]
+
+
+def days(*values):
+    return [datetime(2031, month, day, 9) for month, day in values]
+
+
+# --- Reglas ---
+
+
+def test_daily_and_weekly():
+    assert starts(MONDAY, "FREQ=DAILY;COUNT=3") == days((10, 20), (10, 21), (10, 22))
+    # Sin BYDAY, el día de la semana del inicio
+    assert starts(MONDAY, "FREQ=WEEKLY;COUNT=3") == days((10, 20), (10, 27), (11, 3))
+
+
+def test_byday_skips_days_before_start_in_the_first_week():
+    rule = "FREQ=WEEKLY;BYDAY=FR,MO,WE;COUNT=5"
+    assert starts(WEDNESDAY, rule) == days(
+        (10, 22), (10, 24), (10, 27), (10, 29), (10, 31)
+    )
+
+
+def test_interval():
+    assert starts(MONDAY, "FREQ=DAILY;INTERVAL=3;COUNT=3") == days(
+        (10, 20), (10, 23), (10, 26)
+    )
+    assert starts(MONDAY, "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TU;COUNT=4") == days(
+        (10, 20), (10, 21), (11, 3), (11, 4)
+    )
+
+
+def test_until_versus_count():
+    # UNTIL solo con fecha incluye todo ese día; con hora, corta en ella
+    assert starts(MONDAY, "FREQ=DAILY;UNTIL=20311022") == days(
+        (10, 20), (10, 21), (10, 22)
+    )
+    assert starts(MONDAY, "FREQ=DAILY;UNTIL=20311022T080000") == days(
+        (10, 20), (10, 21)
+    )
+    assert recurrence_columns(MONDAY, MONDAY + HOUR, "FREQ=DAILY;COUNT=3")[
+        "series_end"
+    ] == datetime(2031, 10, 22, 10)
+    assert recurrence_columns(MONDAY, MONDAY + HOUR, "FREQ=DAILY")["series_end"] is None
+    with pytest.raises(ValueError):
+        parse_rule("FREQ=DAILY;COUNT=3;UNTIL=20311022")
+
+
+def test_exceptions_are_skipped_but_count_against_count():
+    assert starts(MONDAY, "FREQ=DAILY;COUNT=4", "2031-10-21") == days(
+        (10, 20), (10, 22), (10, 23)
+    )
+
+
+@pytest.mark.parametrize(
+    "start, rule",
+    [
+        (MONDAY, "FREQ=DAILY;COUNT=40"),
+        (MONDAY, "FREQ=DAILY;INTERVAL=3;COUNT=17"),
+        (WEDNESDAY, "FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=25"),
+        (WEDNESDAY, "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,SU;COUNT=9"),
+        (WEDNESDAY, "FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20311201"),
+    ],
+)
+def test_window_starting_mid_series_matches_full_expansion(start, rule):
+    # El salto directo al periodo de la ventana (descontando COUNT) debe dar lo mismo
+    # que expandir desde el inicio y filtrar
+    full = starts(start, rule)
+    for days_in in range(0, 80, 3):
+        window_start = start + timedelta(days=days_in, hours=-1)
+        window_end = window_start + timedelta(days=10)
+        expected = [s for s in full if window_start - HOUR < s < window_end]
+        assert starts(start, rule, window=(window_start, window_end)) == expected
+    if "COUNT" in rule:
+        assert last_occurrence_start(start, parse_rule(rule)) == full[-1]
+
+
+def test_occurrence_in_progress_at_window_start_is_included():
+    start = datetime(2031, 10, 20, 22)
+    occurrences = expand(
+        start,
+        start + timedelta(hours=4),  # Cruza la medianoche
+        "FREQ=DAILY",
+        None,
+        datetime(2031, 10, 25, 1),
+        datetime(2031, 10, 25, 23),
+    )
+    assert occurrences == [
+        (datetime(2031, 10, 24, 22), datetime(2031, 10, 25, 2)),
+        (datetime(2031, 10, 25, 22), datetime(2031, 10, 26, 2)),
+    ]
+
+
+# --- Todo el día ---
+
+
+def test_all_day_bounds_cover_whole_local_days():
+    midnight = datetime(2031, 10, 20)
+    day = timedelta(days=1)
+    assert all_day_bounds(MONDAY, MONDAY + HOUR) == (midnight, midnight + day)
+    # Termina justo a medianoche: no suma otro día
+    assert all_day_bounds(MONDAY, midnight + 2 * day) == (midnight, midnight + 2 * day)
+    assert all_day_bounds(midnight, midnight) == (midnight, midnight + day)
+
+
+def test_all_day_recurrence_in_a_window_inside_one_day():
+    occurrences = expand(
+        MONDAY,
+        MONDAY + HOUR,
+        "FREQ=DAILY;COUNT=5",
+        None,
+        datetime(2031, 10, 21, 12),
+        datetime(2031, 10, 21, 13),
+        all_day=True,
+    )
+    assert occurrences == [(datetime(2031, 10, 21), datetime(2031, 10, 22))]
+
+
+# --- Caché ---
+
+
+class Schedule:
+    __tablename__ = "group_schedules"
+
+    def __init__(self, rule, schedule_id=1):
+        self.id = schedule_id
+        self.start_time = MONDAY
+        self.end_time = MONDAY + HOUR
+        self.all_day = False
+        self.recurrence_rule = rule
+        self.recurrence_exceptions = None
+
+
+def test_occurrence_cache_serves_later_windows_from_one_expansion():
+    cache = OccurrenceCache(window_days=7, max_entries=2)
+    schedule = Schedule("FREQ=DAILY")
+    first_day = (datetime(2031, 10, 21), datetime(2031, 10, 22))
+    assert [s for s, _ in cache.get(schedule, *first_day)] == days((10, 21))
+
+    # Dentro de los 7 días ya expandidos: misma entrada
+    later = (datetime(2031, 10, 25), datetime(2031, 10, 27))
+    assert [s for s, _ in cache.get(schedule, *later)] == days((10, 25), (10, 26))
+    assert len(cache._entries) == 1
+    [(window_start, window_end, _)] = cache._entries.values()
+    assert (window_start, window_end) == (datetime(2031, 10, 21), datetime(2031, 10, 28))
+
+    # Antes del rango guardado: se vuelve a expandir desde ahí
+    earlier = (datetime(2031, 10, 20), datetime(2031, 10, 21))
+    assert [s for s, _ in cache.get(schedule, *earlier)] == days((10, 20))
+
+
+def test_occurrence_cache_keys_on_the_rule_and_evicts_least_recent():
+    cache = OccurrenceCache(window_days=7, max_entries=2)
+    window = (datetime(2031, 10, 20), datetime(2031, 10, 27))
+    daily = Schedule("FREQ=DAILY")
+    cache.get(daily, *window)
+
+    # Editar la regla cambia la clave: nunca se sirve la expansión vieja
+    daily.recurrence_rule = "FREQ=DAILY;INTERVAL=2"
+    assert [s for s, _ in cache.get(daily, *window)] == days(
+        (10, 20), (10, 22), (10, 24), (10, 26)
+    )
+    cache.get(Schedule("FREQ=WEEKLY", schedule_id=2), *window)
+    assert len(cache._entries) == 2
+    assert all(key[5] != "FREQ=DAILY" for key in cache._entries)
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from app.services.recent_codes import recent_codes
+
+
+def post_payment(client, headers, amount, timestamp, code="123"):
+    response = client.post(
+        "/notifications/incoming",
+        json={
+            "raw_notification": "Yape",
+            "name": "Juan",
+            "amount": amount,
+            "security_code": code,
+            "notification_timestamp": timestamp.isoformat(),
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def verify(client, headers, **params):
+    response = client.get("/notifications/verify", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_old_payment_with_the_same_code_does_not_verify(client, register_owner):
+    headers, _ = register_owner()
+    old = datetime.utcnow() - timedelta(days=2)
+    post_payment(client, headers, "25.00", old)
+
+    # Ni desde memoria ni desde la DB
+    assert not verify(client, headers, security_code="123", amount="25")["verified"]
+    recent_codes.clear()
+    assert not verify(client, headers, security_code="123", amount="25")["verified"]
+
+    since = (old - timedelta(hours=1)).isoformat()
+    assert verify(client, headers, security_code="123", since=since)["verified"] is True
+
+
+def test_memory_and_database_paths_agree(client, register_owner):
+    headers, _ = register_owner()
+    now = datetime.utcnow()
+    ids = [
+        post_payment(client, headers, "1.00", now - timedelta(minutes=minutes))
+        for minutes in (30, 10, 10, 20)
+    ]
+
+    from_memory = verify(client, headers, security_code="123", limit=3)
+    recent_codes.clear()
+    from_database = verify(client, headers, security_code="123", limit=3)
+
+    expected = [ids[2], ids[1], ids[3]]  # Más recientes primero; empate por id
+    assert [m["id"] for m in from_memory["matches"]] == expected
+    assert [m["id"] for m in from_database["matches"]] == expected